@@ -1,101 +1,174 @@
 import os
 import re
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
+from amazon_parser import parse_review_page
+from splash_fetcher import SplashFetcher
+from streaming_pipeline import run_streaming_pipeline, ChunkedCsvWriter
 from datetime import datetime
-from transformers import pipeline
-
-# Function to clean the review text
-def clean_text(text):
-    # Replace newline characters and strip leading/trailing whitespace
-    text = text.replace("\n", " ").strip()
-
-    # Remove non-ASCII characters and emojis
-    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
-
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s+', ' ', text)
-
-    return text
-
-def get_soup(url):
-    splash_url = 'http://localhost:8050/render.html'
-    params = {'url': url, 'wait': 2}
-    r = requests.get(splash_url, params=params)
-    return BeautifulSoup(r.text, 'html.parser')
-
-def get_reviews(soup, asin):
-    reviews = soup.find_all('div', {'data-hook': 'review'})
-    review_batch = []
-    for item in reviews:
-        try:
-            review_date = item.find('span', {'data-hook': 'review-date'}).text.strip()
-            review_date = review_date.replace("Reviewed in India on ", "").strip()
-            review_date = datetime.strptime(review_date, '%d %B %Y').strftime('%d-%m-%Y')
-            year = datetime.strptime(review_date, '%d-%m-%Y').year
-            product_name = soup.find('a', {'data-hook': 'product-link'}).text.split('|')[0].strip()
-            body = item.find('span', {'data-hook': 'review-body'}).text.strip()
-            cleaned_body = clean_text(body)
-            review = {
-                'asin': asin,
-                'product_name': product_name,
-                'year': year,
-                'date': review_date,
-                'rating': float(item.find('i', {'data-hook': 'review-star-rating'}).text.replace('out of 5 stars', '').strip()),
-                'body': body,
-                'cleaned_body': cleaned_body
-            }
-            review_batch.append(review)
-        except Exception as e:
-            print(f"An error occurred: {e}")
-    return review_batch
-
-# Initialize the transformer sentiment analysis pipeline
-sentiment_analyzer = pipeline("sentiment-analysis")
-
-def categorize_sentiment(sentiment_result):
-    if sentiment_result['label'] == 'POSITIVE':
-        return "Positive"
-    elif sentiment_result['label'] == 'NEGATIVE':
-        return "Negative"
-    else:
-        return "Neutral"
-
-reviewlist = []
-asins = ['B0CW5YZ6VV' , 'B096NTB9XT', 'B0CJTXNYVN', 'B09VS25ZX7', 'B0CJJ2CPXX']
-#
-for asin in asins:
-    for x in range(10):  # Fetch up to 50 pages of reviews for each ASIN
-        soup = get_soup(f'https://www.amazon.co.in/product-reviews/{asin}/ref=cm_cr_arp_d_viewopt_srt?ie=UTF8&reviewerType=all_reviews&pageNumber={x+1}&sortBy=recent')
+from transformer_scoring import TransformerScorer, score_with_cache, long_review_options
+from transformer_pool import ParallelTransformerScorer
+from result_cache import open_result_cache
+from scoring_daemon import remote_scorer
+from review_store import open_review_store, ReviewStoreWriter
+from run_metrics import open_run_metrics
+
+
+def main():
+    # Per-stage timers, counters and cache hit rates, reported at exit (SENTIMENT_METRICS,
+    # SENTIMENT_METRICS_PROM and SENTIMENT_PROFILE configure the outputs, see run_metrics.py)
+    run_metrics = open_run_metrics('amazon_transformer')
+
+    # Function to clean the review text
+    def clean_text(text):
+        # Replace newline characters and strip leading/trailing whitespace
+        text = text.replace("\n", " ").strip()
+
+        # Remove non-ASCII characters and emojis
+        text = re.sub(r'[^\x00-\x7F]+', ' ', text)
+
+        # Replace multiple spaces with a single space
+        text = re.sub(r'\s+', ' ', text)
+
+        return text
+
+    clean_text = run_metrics.timed('clean', clean_text)
+
+    # Fetch review pages through Splash concurrently (SPLASH_MAX_IN_FLIGHT requests at a time,
+    # at most SPLASH_REQUESTS_PER_SECOND per host), retrying transient failures with backoff
+    splash_fetcher = SplashFetcher(
+        max_in_flight=int(os.environ.get('SPLASH_MAX_IN_FLIGHT', 4)),
+        requests_per_second=float(os.environ.get('SPLASH_REQUESTS_PER_SECOND', 2)),
+    )
+
+    # Parse one review page with the lxml parser (precompiled selectors, one date parse per review)
+    def get_reviews(page_html, asin):
+        return parse_review_page(page_html, asin, clean_text)
+
+    get_reviews = run_metrics.timed('parse', get_reviews)
+
+    # Initialize the batched transformer scoring engine (batch size can be set via SENTIMENT_BATCH_SIZE).
+    # Set SENTIMENT_WORKERS > 1 to shard scoring across that many worker processes, and
+    # TRANSFORMER_LONG_REVIEWS=window to score reviews over 512 tokens as overlapping windows.
+    batch_size = int(os.environ.get('SENTIMENT_BATCH_SIZE', 32))
+    num_workers = int(os.environ.get('SENTIMENT_WORKERS', 1))
+    long_reviews = long_review_options()
+    # With SENTIMENT_DAEMON_URL set, reviews are scored by the warm local scoring daemon
+    # (scoring_daemon.py) instead of loading the model in this process
+    daemon_url = os.environ.get('SENTIMENT_DAEMON_URL')
+    with run_metrics.stage('load_model'):
+        if daemon_url:
+            sentiment_scorer = remote_scorer(daemon_url, 'transformer')
+        elif num_workers > 1:
+            sentiment_scorer = ParallelTransformerScorer(num_workers, batch_size=batch_size, **long_reviews)
+        else:
+            sentiment_scorer = TransformerScorer(batch_size=batch_size, **long_reviews)
+
+    # Persistent result cache: only reviews without a cached result reach the model
+    # (SENTIMENT_CACHE sets the cache file or 'off', SENTIMENT_CACHE_MAX_MB its size limit)
+    result_cache = open_result_cache()
+    run_metrics.watch_cache('result_cache', result_cache.stats)
+
+    # Scored reviews are appended to the partitioned Parquet review store
+    # (SENTIMENT_STORE sets its directory or 'off')
+    review_store = open_review_store()
+
+    def categorize_sentiment(sentiment_result):
+        if sentiment_result['label'] == 'POSITIVE':
+            return "Positive"
+        elif sentiment_result['label'] == 'NEGATIVE':
+            return "Negative"
+        else:
+            return "Neutral"
+
+    reviewlist = []
+    asins = ['B0CW5YZ6VV' , 'B096NTB9XT', 'B0CJTXNYVN', 'B09VS25ZX7', 'B0CJJ2CPXX']
+
+    pages = [(asin, x) for asin in asins for x in range(10)]  # Fetch up to 10 pages of reviews for each ASIN
+    page_urls = [
+        f'https://www.amazon.co.in/product-reviews/{asin}/ref=cm_cr_arp_d_viewopt_srt?ie=UTF8&reviewerType=all_reviews&pageNumber={x+1}&sortBy=recent'
+        for asin, x in pages
+    ]
+    review_columns = ['asin', 'product_name', 'year', 'date', 'rating', 'body', 'cleaned_body']
+
+    # Streaming mode (SENTIMENT_STREAMING=1): reviews flow page by page through cleaning, scoring and
+    # CSV output in chunks of SENTIMENT_CHUNK_SIZE, so memory stays flat however many pages are pulled
+    if os.environ.get('SENTIMENT_STREAMING') == '1':
+        def review_stream():
+            for (asin, x), html in zip(pages, splash_fetcher.iter_pages(page_urls)):
+                print(f'Getting page: {x + 1} for ASIN: {asin}')
+                yield from get_reviews(html, asin)
+
+        def score_chunk(records):
+            chunk = pd.DataFrame(records, columns=review_columns)
+            with run_metrics.stage('score', items=len(chunk)):
+                scores, labels = score_with_cache(sentiment_scorer, chunk['cleaned_body'], result_cache)
+            chunk['sentiment_result'] = [{'label': label, 'score': score} for label, score in zip(labels, scores.tolist())]
+            chunk['sentiment_category'] = chunk['sentiment_result'].apply(categorize_sentiment)
+            return chunk
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        final_file_path = os.path.join(os.getcwd(), f'amazon_product_reviews_with_transformer_sentiment_{timestamp}.csv')
+        writers = [ReviewStoreWriter(review_store, 'amazon', 'transformer', model=sentiment_scorer.model_id)]
+        if os.environ.get('SENTIMENT_CSV') == '1':
+            writers.append(ChunkedCsvWriter(final_file_path))
+        total = run_streaming_pipeline(review_stream(), score_chunk, writers,
+                                       chunk_size=int(os.environ.get('SENTIMENT_CHUNK_SIZE', 500)), metrics=run_metrics)
+        result_cache.report()
+        if daemon_url:
+            sentiment_scorer.report()
+        run_metrics.count('reviews', total)
+        print(f'{total} reviews with sentiment streamed to the review store')
+        return
+
+    with run_metrics.stage('fetch', items=len(page_urls)):
+        page_html = splash_fetcher.fetch_all(page_urls)
+
+    # Parse the pages in (asin, page) order
+    for (asin, x), html in zip(pages, page_html):
         print(f'Getting page: {x + 1} for ASIN: {asin}')
-        review_batch = get_reviews(soup, asin)
+        review_batch = get_reviews(html, asin)
         reviewlist.extend(review_batch)
+        run_metrics.count('reviews', len(review_batch))
         print(f'Total reviews collected so far: {len(reviewlist)}')
 
-# Convert the list of reviews into a DataFrame
-df = pd.DataFrame(reviewlist, columns=['asin', 'product_name', 'year', 'date', 'rating', 'body', 'cleaned_body'])
+    # Convert the list of reviews into a DataFrame
+    df = pd.DataFrame(reviewlist, columns=review_columns)
+
+    # Display the first 5 and last 5 reviews before sentiment analysis
+    print("First 5 Reviews Before Sentiment Analysis:")
+    print(df.head(5).to_string(index=False))
+    print("\nLast 5 Reviews Before Sentiment Analysis:")
+    print(df.tail(5).to_string(index=False))
+
+    # Perform sentiment analysis using the transformer model, scoring the whole column in micro-batches
+    with run_metrics.stage('score', items=len(df)):
+        scores, labels = score_with_cache(sentiment_scorer, df['cleaned_body'], result_cache)
+    result_cache.report()
+    if daemon_url:
+        sentiment_scorer.report()
+    df['sentiment_result'] = [{'label': label, 'score': score} for label, score in zip(labels, scores.tolist())]
+    df['sentiment_category'] = df['sentiment_result'].apply(categorize_sentiment)
 
-# Display the first 5 and last 5 reviews before sentiment analysis
-print("First 5 Reviews Before Sentiment Analysis:")
-print(df.head(5).to_string(index=False))
-print("\nLast 5 Reviews Before Sentiment Analysis:")
-print(df.tail(5).to_string(index=False))
+    # Display the first 5 and last 5 reviews after sentiment analysis
+    print("\nFirst 5 Reviews After Sentiment Analysis:")
+    print(df.head(5)[['asin', 'product_name', 'year', 'date', 'rating', 'cleaned_body', 'sentiment_category']].to_string(index=False))
+    print("\nLast 5 Reviews After Sentiment Analysis:")
+    print(df.tail(5)[['asin', 'product_name', 'year', 'date', 'rating', 'cleaned_body', 'sentiment_category']].to_string(index=False))
 
-# Perform sentiment analysis using the transformer model
-df['sentiment_result'] = df['cleaned_body'].apply(lambda x: sentiment_analyzer(x)[0])
-df['sentiment_category'] = df['sentiment_result'].apply(categorize_sentiment)
+    # Append to the review store; SENTIMENT_CSV=1 also writes the timestamped CSV dump
+    with run_metrics.stage('write', items=len(df)):
+        review_store.append(df, 'amazon', 'transformer', model=sentiment_scorer.model_id)
+        if os.environ.get('SENTIMENT_CSV') == '1':
+            # Get the current date and time
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-# Display the first 5 and last 5 reviews after sentiment analysis
-print("\nFirst 5 Reviews After Sentiment Analysis:")
-print(df.head(5)[['asin', 'product_name', 'year', 'date', 'rating', 'cleaned_body', 'sentiment_category']].to_string(index=False))
-print("\nLast 5 Reviews After Sentiment Analysis:")
-print(df.tail(5)[['asin', 'product_name', 'year', 'date', 'rating', 'cleaned_body', 'sentiment_category']].to_string(index=False))
+            # Save the final CSV with sentiment analysis
+            final_file_path = os.path.join(os.getcwd(), f'amazon_product_reviews_with_transformer_sentiment_{timestamp}.csv')
+            df.to_csv(final_file_path, index=False)
+            print(f'Reviews with sentiment saved to {final_file_path}')
 
-# Get the current date and time
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-# Save the final CSV with sentiment analysis
-final_file_path = os.path.join(os.getcwd(), f'amazon_product_reviews_with_transformer_sentiment_{timestamp}.csv')
-df.to_csv(final_file_path, index=False)
-print(f'Reviews with sentiment saved to {final_file_path}')
+# Only run as a script: with SENTIMENT_WORKERS > 1 the transformer worker processes are
+# spawned (see transformer_pool.py) and import this module again
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,22 @@
 import os
-import re
 import nltk
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
-import requests
-from bs4 import BeautifulSoup
+from text_normalizer import TextNormalizer
+from vader_scoring import VaderBulkScorer, categorize_sentiment_array, score_with_cache
+from result_cache import open_result_cache
+from scoring_daemon import remote_scorer
+from review_store import open_review_store, ReviewStoreWriter
+from amazon_parser import parse_review_page
+from splash_fetcher import SplashFetcher
+from streaming_pipeline import run_streaming_pipeline, ChunkedCsvWriter
+from run_metrics import open_run_metrics
 import pandas as pd
 from datetime import datetime
 
+# Per-stage timers, counters and cache hit rates, reported at exit (SENTIMENT_METRICS,
+# SENTIMENT_METRICS_PROM and SENTIMENT_PROFILE configure the outputs, see run_metrics.py)
+run_metrics = open_run_metrics('amazon_vader')
+
 # Ensure NLTK data path includes the custom path
 nltk_data_path = '/Users/adwivedi/nltk_data'
 nltk.data.path.append(nltk_data_path)
@@ -27,104 +34,110 @@ for resource, path in required_paths.items():
     if not os.path.exists(full_path):
         raise FileNotFoundError(f"Expected {resource} file not found at: {full_path}")
 
-# Initialize the SentimentIntensityAnalyzer with the local vader_lexicon.txt
-sia = SentimentIntensityAnalyzer(lexicon_file=os.path.join(nltk_data_path, required_paths['vader_lexicon']))
+# With SENTIMENT_DAEMON_URL set, reviews are scored by the warm local scoring daemon
+# (scoring_daemon.py) instead of loading the model in this process
+daemon_url = os.environ.get('SENTIMENT_DAEMON_URL')
+with run_metrics.stage('load_model'):
+    if daemon_url:
+        vader_scorer = remote_scorer(daemon_url, 'vader')
+    else:
+        # Initialize the SentimentIntensityAnalyzer with the local vader_lexicon.txt
+        sia = SentimentIntensityAnalyzer(lexicon_file=os.path.join(nltk_data_path, required_paths['vader_lexicon']))
+
+        # Bulk VADER scorer reusing the loaded lexicon (compound scores only, float32)
+        vader_scorer = VaderBulkScorer(analyzer=sia)
+
+# Persistent result cache: only reviews without a cached score reach VADER
+# (SENTIMENT_CACHE sets the cache file or 'off', SENTIMENT_CACHE_MAX_MB its size limit)
+result_cache = open_result_cache()
+run_metrics.watch_cache('result_cache', result_cache.stats)
+
+# Scored reviews are appended to the partitioned Parquet review store
+# (SENTIMENT_STORE sets its directory or 'off')
+review_store = open_review_store()
+
+# Shared text normalizer: the stopword set, lemmatizer and regex patterns are built once.
+# Lemmas and short reviews are memoized; cache sizes (entries) are capped via
+# LEMMA_CACHE_SIZE and TEXT_CACHE_SIZE (0 disables a cache).
+text_normalizer = TextNormalizer(
+    lemma_cache_size=int(os.environ.get('LEMMA_CACHE_SIZE', 50000)),
+    text_cache_size=int(os.environ.get('TEXT_CACHE_SIZE', 20000)),
+)
+run_metrics.watch_cache('text_normalizer', text_normalizer.cache_stats)
 
 # Function to clean the review text
 def clean_text(text):
-    # Convert to lowercase
-    text = text.lower()
-
-    # Replace newline characters and strip leading/trailing whitespace
-    text = text.replace("\n", " ").strip()
-
-    # Remove non-ASCII characters and emojis
-    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
-
-    # Remove unwanted punctuation (keeping periods and commas)
-    text = re.sub(r'[^\w\s.,]', '', text)
-
-    # Remove numbers (optional, depending on if you want to keep numeric context)
-    text = re.sub(r'\d+', '', text)
-
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s+', ' ', text)
+    return text_normalizer.normalize(text)
 
-    # Replace multiple periods with a single period
-    text = re.sub(r'\.+', '.', text)
+clean_text = run_metrics.timed('clean', clean_text)
 
-    # Tokenize the text
-    words = word_tokenize(text)
+# Fetch review pages through Splash concurrently (SPLASH_MAX_IN_FLIGHT requests at a time,
+# at most SPLASH_REQUESTS_PER_SECOND per host), retrying transient failures with backoff
+splash_fetcher = SplashFetcher(
+    max_in_flight=int(os.environ.get('SPLASH_MAX_IN_FLIGHT', 4)),
+    requests_per_second=float(os.environ.get('SPLASH_REQUESTS_PER_SECOND', 2)),
+)
 
-    # Use a less aggressive stopword removal (retain some stopwords for context)
-    stop_words = set(stopwords.words('english')) - {'no', 'not', 'up', 'down', 'few', 'more'}
+# Parse one review page with the lxml parser (precompiled selectors, one date parse per review)
+def get_reviews(page_html, asin):
+    return parse_review_page(page_html, asin, clean_text)
 
-    # Remove stopwords, but retain some key ones for context
-    words = [word for word in words if word not in stop_words]
-
-    # Lemmatize the words
-    lemmatizer = WordNetLemmatizer()
-    words = [lemmatizer.lemmatize(word) for word in words]
-
-    # Join words back to a single string
-    cleaned_text = ' '.join(words)
-
-    return cleaned_text
-
-# Categorize the sentiment into three categories
-def categorize_sentiment(score):
-    if score > 0.05:
-        return "Positive"
-    elif score < -0.05:
-        return "Negative"
-    else:
-        return "Neutral"
-
-def get_soup(url):
-    splash_url = 'http://localhost:8050/render.html'
-    params = {'url': url, 'wait': 2}
-    r = requests.get(splash_url, params=params)
-    return BeautifulSoup(r.text, 'html.parser')
-
-def get_reviews(soup, asin):
-    reviews = soup.find_all('div', {'data-hook': 'review'})
-    review_batch = []
-    for item in reviews:
-        try:
-            review_date = item.find('span', {'data-hook': 'review-date'}).text.strip()
-            review_date = review_date.replace("Reviewed in India on ", "").strip()
-            review_date = datetime.strptime(review_date, '%d %B %Y').strftime('%d-%m-%Y')
-            year = datetime.strptime(review_date, '%d-%m-%Y').year
-            product_name = soup.find('a', {'data-hook': 'product-link'}).text.split('|')[0].strip()
-            body = item.find('span', {'data-hook': 'review-body'}).text.strip()
-            cleaned_body = clean_text(body)
-            review = {
-                'asin': asin,
-                'product_name': product_name,
-                'year': year,
-                'date': review_date,
-                'rating': float(item.find('i', {'data-hook': 'review-star-rating'}).text.replace('out of 5 stars', '').strip()),
-                'body': body,
-                'cleaned_body': cleaned_body
-            }
-            review_batch.append(review)
-        except Exception as e:
-            print(f"An error occurred: {e}")
-    return review_batch
+get_reviews = run_metrics.timed('parse', get_reviews)
 
 reviewlist = []
 asins = ['B0CW5YZ6VV', 'B096NTB9XT', 'B0CJTXNYVN', 'B09VS25ZX7', 'B0CJJ2CPXX' ]
 
-for asin in asins:
-    for x in range(2):  # Fetch up to 50 pages of reviews for each ASIN
-        soup = get_soup(f'https://www.amazon.co.in/product-reviews/{asin}/ref=cm_cr_arp_d_viewopt_srt?ie=UTF8&reviewerType=all_reviews&pageNumber={x+1}&sortBy=recent')
-        print(f'Getting page: {x + 1} for ASIN: {asin}')
-        review_batch = get_reviews(soup, asin)
-        reviewlist.extend(review_batch)
-        print(f'Total reviews collected so far: {len(reviewlist)}')
+pages = [(asin, x) for asin in asins for x in range(2)]  # Fetch up to 2 pages of reviews for each ASIN
+page_urls = [
+    f'https://www.amazon.co.in/product-reviews/{asin}/ref=cm_cr_arp_d_viewopt_srt?ie=UTF8&reviewerType=all_reviews&pageNumber={x+1}&sortBy=recent'
+    for asin, x in pages
+]
+review_columns = ['asin', 'product_name', 'year', 'date', 'rating', 'body', 'cleaned_body']
+
+# Streaming mode (SENTIMENT_STREAMING=1): reviews flow page by page through cleaning, scoring and
+# CSV output in chunks of SENTIMENT_CHUNK_SIZE, so memory stays flat however many pages are pulled
+if os.environ.get('SENTIMENT_STREAMING') == '1':
+    def review_stream():
+        for (asin, x), html in zip(pages, splash_fetcher.iter_pages(page_urls)):
+            print(f'Getting page: {x + 1} for ASIN: {asin}')
+            yield from get_reviews(html, asin)
+
+    def score_chunk(records):
+        chunk = pd.DataFrame(records, columns=review_columns)
+        with run_metrics.stage('score', items=len(chunk)):
+            chunk['sentiment_score'] = score_with_cache(vader_scorer, chunk['cleaned_body'], result_cache)
+        chunk['sentiment_category'] = categorize_sentiment_array(chunk['sentiment_score'])
+        return chunk
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    final_file_path = os.path.join(os.getcwd(), f'amazon_product_reviews_with_sentiment_{timestamp}.csv')
+    writers = [ReviewStoreWriter(review_store, 'amazon', 'vader', model=vader_scorer.model_id)]
+    if os.environ.get('SENTIMENT_CSV') == '1':
+        writers.append(ChunkedCsvWriter(final_file_path))
+    total = run_streaming_pipeline(review_stream(), score_chunk, writers,
+                                   chunk_size=int(os.environ.get('SENTIMENT_CHUNK_SIZE', 500)), metrics=run_metrics)
+    result_cache.report()
+    if daemon_url:
+        vader_scorer.report()
+    run_metrics.count('reviews', total)
+    print(f'{total} reviews with sentiment streamed to the review store')
+    raise SystemExit(0)
+
+with run_metrics.stage('fetch', items=len(page_urls)):
+    page_html = splash_fetcher.fetch_all(page_urls)
+
+# Parse the pages in (asin, page) order
+for (asin, x), html in zip(pages, page_html):
+    print(f'Getting page: {x + 1} for ASIN: {asin}')
+    review_batch = get_reviews(html, asin)
+    reviewlist.extend(review_batch)
+    run_metrics.count('reviews', len(review_batch))
+    print(f'Total reviews collected so far: {len(reviewlist)}')
+
+print(f'Text normalizer cache stats: {text_normalizer.cache_stats()}')
 
 # Convert the list of reviews into a DataFrame
-df = pd.DataFrame(reviewlist, columns=['asin', 'product_name', 'year', 'date', 'rating', 'body', 'cleaned_body'])
+df = pd.DataFrame(reviewlist, columns=review_columns)
 
 # Display the first 5 and last 5 reviews before sentiment analysis
 print("First 5 Reviews Before Sentiment Analysis:")
@@ -133,8 +146,12 @@ print("\nLast 5 Reviews Before Sentiment Analysis:")
 print(df.tail(5).to_string(index=False))
 
 # Perform sentiment analysis and categorize sentiment
-df['sentiment_score'] = df['cleaned_body'].apply(lambda x: sia.polarity_scores(x)['compound'])
-df['sentiment_category'] = df['sentiment_score'].apply(categorize_sentiment)
+with run_metrics.stage('score', items=len(df)):
+    df['sentiment_score'] = score_with_cache(vader_scorer, df['cleaned_body'], result_cache)
+result_cache.report()
+if daemon_url:
+    vader_scorer.report()
+df['sentiment_category'] = categorize_sentiment_array(df['sentiment_score'])
 
 # Display the first 5 and last 5 reviews after sentiment analysis
 print("\nFirst 5 Reviews After Sentiment Analysis:")
@@ -142,10 +159,14 @@ print(df.head(5)[['asin', 'product_name', 'year', 'date', 'rating', 'cleaned_bod
 print("\nLast 5 Reviews After Sentiment Analysis:")
 print(df.tail(5)[['asin', 'product_name', 'year', 'date', 'rating', 'cleaned_body', 'sentiment_score', 'sentiment_category']].to_string(index=False))
 
-# Get the current date and time
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-# Save the final CSV with sentiment analysis
-final_file_path = os.path.join(os.getcwd(), f'amazon_product_reviews_with_sentiment_{timestamp}.csv')
-df.to_csv(final_file_path, index=False)
-print(f'Reviews with sentiment saved to {final_file_path}')
+# Append to the review store; SENTIMENT_CSV=1 also writes the timestamped CSV dump
+with run_metrics.stage('write', items=len(df)):
+    review_store.append(df, 'amazon', 'vader', model=vader_scorer.model_id)
+    if os.environ.get('SENTIMENT_CSV') == '1':
+        # Get the current date and time
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # Save the final CSV with sentiment analysis
+        final_file_path = os.path.join(os.getcwd(), f'amazon_product_reviews_with_sentiment_{timestamp}.csv')
+        df.to_csv(final_file_path, index=False)
+        print(f'Reviews with sentiment saved to {final_file_path}')
@@ -2,87 +2,182 @@ import os
 import re
 from datetime import datetime
 from app_store_scraper import AppStore
+from app_store_ingest import AppStoreIngestor
+from streaming_pipeline import run_streaming_pipeline, ChunkedCsvWriter
 import pandas as pd
-from transformers import pipeline, AutoTokenizer, AutoModelForSequenceClassification
-
-# Function to clean the review text
-def clean_text(text):
-    # Replace newline characters and strip leading/trailing whitespace
-    text = text.replace("\n", " ").strip()
-
-    # Remove non-ASCII characters and emojis
-    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
-
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s+', ' ', text)
-
-    return text
-
-# Initialize the transformers pipeline for sentiment analysis with truncation and padding
-model_name = "distilbert-base-uncased-finetuned-sst-2-english"
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
-sentiment_pipeline = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
-
-# Define a function to analyze sentiment with explicit truncation and padding
-def analyze_sentiment(text):
-    # Ensure text is a string
-    if isinstance(text, str):
-        # Tokenize with truncation and padding, ensuring max_length is 512
-        inputs = tokenizer(text, truncation=True, padding='max_length', max_length=512, return_tensors="pt")
-        
-        # Pass the inputs to the model and get the output
-        outputs = model(**inputs)
-        
-        # Extract sentiment
-        scores = outputs.logits.softmax(dim=1)
-        score = scores.max().item()
-        label = 'POSITIVE' if scores.argmax().item() == 1 else 'NEGATIVE'
-        
-        return score, label
-    else:
-        return 0, 'Neutral'
-
-
-# Fetch reviews from Apple App Store
-app_name = 'eureka-forbes-aquaguard'
-store_reviews = AppStore(country="in", app_name=app_name, app_id='1463742085')
-store_reviews.review(how_many=5000)
-
-# Convert reviews to DataFrame
-df = pd.DataFrame(store_reviews.reviews)
-
-# Select necessary columns and rename them
-mydata = df[['date', 'rating', 'review']]
-mydata.columns = ['date', 'app_rating', 'review']
-
-# Add a new column 'year' by extracting it from the 'date' column
-mydata['year'] = pd.to_datetime(mydata['date']).dt.year
-
-# Reorder columns to place 'year' as the first column
-mydata = mydata[['year', 'date', 'app_rating', 'review']]
-
-# Format the date from "DD/MM/YY HH:MM" to "DD/MM/YY"
-mydata['date'] = pd.to_datetime(mydata['date']).dt.strftime('%d/%m/%y')
-
-# Clean the review text
-mydata['cleaned_review'] = mydata['review'].apply(clean_text)
-
-# Apply sentiment analysis using the transformers pipeline
-mydata[['sentiment', 'sentiment_category']] = mydata['cleaned_review'].apply(lambda x: pd.Series(analyze_sentiment(x)))
-
-# Get the current date and time
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-# Save the reviews with sentiment analysis to a separate CSV file
-sentiment_reviews_file_path = os.path.join(os.getcwd(), f'apple_store_reviews_with_sentiment_transformers_{timestamp}.csv')
-
-mydata.to_csv(sentiment_reviews_file_path, index=False)
-print(f'Reviews with sentiment analysis saved to {sentiment_reviews_file_path}')
-
-# Display the first 5 and last 5 reviews after sentiment analysis
-print("First 5 Reviews After Sentiment Analysis:")
-print(mydata.head(5).to_string(index=False))
-
-print("Last 5 Reviews After Sentiment Analysis:")
-print(mydata.tail(5).to_string(index=False))
+from transformer_scoring import TransformerScorer, score_with_cache, long_review_options, DEFAULT_MODEL_NAME
+from transformer_pool import ParallelTransformerScorer
+from result_cache import open_result_cache
+from scoring_daemon import remote_scorer
+from review_store import open_review_store, ReviewStoreWriter
+from run_metrics import open_run_metrics
+
+
+def main():
+    # Per-stage timers, counters and cache hit rates, reported at exit (SENTIMENT_METRICS,
+    # SENTIMENT_METRICS_PROM and SENTIMENT_PROFILE configure the outputs, see run_metrics.py)
+    run_metrics = open_run_metrics('appstore_transformer')
+
+    # Function to clean the review text
+    def clean_text(text):
+        # Replace newline characters and strip leading/trailing whitespace
+        text = text.replace("\n", " ").strip()
+
+        # Remove non-ASCII characters and emojis
+        text = re.sub(r'[^\x00-\x7F]+', ' ', text)
+
+        # Replace multiple spaces with a single space
+        text = re.sub(r'\s+', ' ', text)
+
+        return text
+
+    # Initialize the batched transformer scoring engine (batch size can be set via SENTIMENT_BATCH_SIZE).
+    # Set SENTIMENT_WORKERS > 1 to shard scoring across that many worker processes, or
+    # TRANSFORMER_RUNTIME=onnx to serve the model from a cached, int8-quantized ONNX export.
+    # TRANSFORMER_LONG_REVIEWS=window scores reviews over 512 tokens as overlapping windows.
+    model_name = DEFAULT_MODEL_NAME
+    batch_size = int(os.environ.get('SENTIMENT_BATCH_SIZE', 32))
+    num_workers = int(os.environ.get('SENTIMENT_WORKERS', 1))
+    long_reviews = long_review_options()
+    # With SENTIMENT_DAEMON_URL set, reviews are scored by the warm local scoring daemon
+    # (scoring_daemon.py) instead of loading the model in this process
+    daemon_url = os.environ.get('SENTIMENT_DAEMON_URL')
+    with run_metrics.stage('load_model'):
+        if daemon_url:
+            sentiment_scorer = remote_scorer(daemon_url, 'transformer')
+        elif os.environ.get('TRANSFORMER_RUNTIME', 'torch') == 'onnx':
+            from onnx_backend import OnnxTransformerScorer
+            sentiment_scorer = OnnxTransformerScorer(model_name, batch_size=batch_size, **long_reviews)
+        elif num_workers > 1:
+            sentiment_scorer = ParallelTransformerScorer(num_workers, model_name=model_name, batch_size=batch_size, **long_reviews)
+        else:
+            sentiment_scorer = TransformerScorer(model_name, batch_size=batch_size, **long_reviews)
+
+    # Persistent result cache: only reviews without a cached result reach the model
+    # (SENTIMENT_CACHE sets the cache file or 'off', SENTIMENT_CACHE_MAX_MB its size limit)
+    result_cache = open_result_cache()
+    run_metrics.watch_cache('result_cache', result_cache.stats)
+
+    # Scored reviews are appended to the partitioned Parquet review store
+    # (SENTIMENT_STORE sets its directory or 'off')
+    review_store = open_review_store()
+
+    # Define a function to analyze sentiment for a whole column with explicit truncation.
+    # Returns (score, label) per review, or (0, 'Neutral') for non-text entries
+    def analyze_sentiment(texts):
+        # Truncate at 512 tokens (or split longer reviews into windows with TRANSFORMER_LONG_REVIEWS=window),
+        # sort reviews into length buckets and pad each bucket only to its longest member
+        # instead of padding every review to 512 tokens
+        scores, labels = score_with_cache(sentiment_scorer, texts, result_cache, bucket_by_length=True)
+        return list(zip(scores.tolist(), labels))
+
+
+    # Fetch reviews from Apple App Store. With APPSTORE_INCREMENTAL=1 only reviews newer than
+    # the stored watermark are fetched, one page at a time until known reviews
+    app_name = 'eureka-forbes-aquaguard'
+    app_id = '1463742085'
+    incremental = os.environ.get('APPSTORE_INCREMENTAL') == '1'
+
+    # Streaming mode (SENTIMENT_STREAMING=1): each fetched page flows straight through cleaning, scoring
+    # and CSV output in chunks of SENTIMENT_CHUNK_SIZE instead of holding all reviews in memory
+    def score_chunk(records):
+        chunk = pd.DataFrame(records)[['date', 'rating', 'review']]
+        chunk.columns = ['date', 'app_rating', 'review']
+        chunk['year'] = pd.to_datetime(chunk['date']).dt.year
+        chunk = chunk[['year', 'date', 'app_rating', 'review']]
+        chunk['date'] = pd.to_datetime(chunk['date']).dt.strftime('%d/%m/%y')
+        with run_metrics.stage('clean', items=len(chunk)):
+            chunk['cleaned_review'] = chunk['review'].apply(clean_text)
+        with run_metrics.stage('score', items=len(chunk)):
+            chunk[['sentiment', 'sentiment_category']] = pd.DataFrame(analyze_sentiment(chunk['cleaned_review']), index=chunk.index)
+        return chunk
+
+    if os.environ.get('SENTIMENT_STREAMING') == '1':
+        ingestor = AppStoreIngestor(app_name, app_id, max_count=5000, incremental=incremental)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        sentiment_reviews_file_path = os.path.join(os.getcwd(), f'apple_store_reviews_with_sentiment_transformers_{timestamp}.csv')
+        review_stream = (review for page in ingestor.pages() for review in page)
+        writers = [ReviewStoreWriter(review_store, 'appstore', 'transformer', model=sentiment_scorer.model_id)]
+        if os.environ.get('SENTIMENT_CSV') == '1':
+            writers.append(ChunkedCsvWriter(sentiment_reviews_file_path))
+        total = run_streaming_pipeline(review_stream, score_chunk, writers,
+                                       chunk_size=int(os.environ.get('SENTIMENT_CHUNK_SIZE', 500)), metrics=run_metrics)
+        result_cache.report()
+        if daemon_url:
+            sentiment_scorer.report()
+        run_metrics.count('reviews', total)
+        print(f'{total} reviews with sentiment streamed to the review store')
+        # Advance the watermark only once the delta has been saved
+        if incremental:
+            ingestor.commit()
+        return
+
+    with run_metrics.stage('fetch'):
+        if incremental:
+            ingestor = AppStoreIngestor(app_name, app_id, max_count=5000)
+            result = ingestor.fetch_new()
+            if not result:
+                print(f'No new reviews for {app_name} since the last run')
+                return
+        else:
+            store_reviews = AppStore(country="in", app_name=app_name, app_id=app_id)
+            store_reviews.review(how_many=5000)
+            result = store_reviews.reviews
+
+    # Convert reviews to DataFrame
+    df = pd.DataFrame(result)
+    run_metrics.count('reviews', len(df))
+
+    # Select necessary columns and rename them
+    mydata = df[['date', 'rating', 'review']]
+    mydata.columns = ['date', 'app_rating', 'review']
+
+    # Add a new column 'year' by extracting it from the 'date' column
+    mydata['year'] = pd.to_datetime(mydata['date']).dt.year
+
+    # Reorder columns to place 'year' as the first column
+    mydata = mydata[['year', 'date', 'app_rating', 'review']]
+
+    # Format the date from "DD/MM/YY HH:MM" to "DD/MM/YY"
+    mydata['date'] = pd.to_datetime(mydata['date']).dt.strftime('%d/%m/%y')
+
+    # Clean the review text
+    with run_metrics.stage('clean', items=len(mydata)):
+        mydata['cleaned_review'] = mydata['review'].apply(clean_text)
+
+    # Apply sentiment analysis using the batched transformer scoring engine
+    with run_metrics.stage('score', items=len(mydata)):
+        mydata[['sentiment', 'sentiment_category']] = pd.DataFrame(analyze_sentiment(mydata['cleaned_review']), index=mydata.index)
+    result_cache.report()
+    if daemon_url:
+        sentiment_scorer.report()
+
+    # Append to the review store; SENTIMENT_CSV=1 also writes the timestamped CSV dump
+    with run_metrics.stage('write', items=len(mydata)):
+        review_store.append(mydata, 'appstore', 'transformer', model=sentiment_scorer.model_id)
+        if os.environ.get('SENTIMENT_CSV') == '1':
+            # Get the current date and time
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+            # Save the reviews with sentiment analysis to a separate CSV file
+            sentiment_reviews_file_path = os.path.join(os.getcwd(), f'apple_store_reviews_with_sentiment_transformers_{timestamp}.csv')
+
+            mydata.to_csv(sentiment_reviews_file_path, index=False)
+            print(f'Reviews with sentiment analysis saved to {sentiment_reviews_file_path}')
+
+    # Advance the watermark only once the delta has been saved
+    if incremental:
+        ingestor.commit()
+
+    # Display the first 5 and last 5 reviews after sentiment analysis
+    print("First 5 Reviews After Sentiment Analysis:")
+    print(mydata.head(5).to_string(index=False))
+
+    print("Last 5 Reviews After Sentiment Analysis:")
+    print(mydata.tail(5).to_string(index=False))
+
+
+# Only run as a script: with SENTIMENT_WORKERS > 1 the transformer worker processes are
+# spawned (see transformer_pool.py) and import this module again
+if __name__ == '__main__':
+    main()
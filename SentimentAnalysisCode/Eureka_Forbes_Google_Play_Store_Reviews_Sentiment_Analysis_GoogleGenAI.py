@@ -1,36 +1,69 @@
 import os
 import re
-import json
-import time
 from datetime import datetime
 from google_play_scraper import Sort, reviews
+from play_store_ingest import PlayStoreIngestor
 import pandas as pd
-import google.generativeai as genai
-
-
-# Configure the Google Gemini API
-GOOGLE_API_KEY = 'kAJSFGKFGAJKHSGFASGFGASGF'  # Replace with your actual API key
-genai.configure(api_key=GOOGLE_API_KEY)
-
-# List available models and select the Gemini model
-for m in genai.list_models():
-    if 'generateContent' in m.supported_generation_methods:
-        print(m.name)
-
-model = genai.GenerativeModel('gemini-1.0-pro')  # Replace with the correct model name if different
-
-# Fetch reviews from Google Play Store
+from gemini_scoring import GeminiScorer, open_gemini_model, score_with_cache, SENTIMENT_MAPPING
+from result_cache import open_result_cache
+from scoring_daemon import remote_scorer
+from review_store import open_review_store
+from run_metrics import open_run_metrics
+
+
+# Per-stage timers, counters and cache hit rates, reported at exit (SENTIMENT_METRICS,
+# SENTIMENT_METRICS_PROM and SENTIMENT_PROFILE configure the outputs, see run_metrics.py)
+run_metrics = open_run_metrics('playstore_gemini')
+
+gemini_model_name = 'gemini-1.0-pro'  # Replace with the correct model name if different
+
+# With SENTIMENT_DAEMON_URL set, reviews are scored by the warm local scoring daemon
+# (scoring_daemon.py) instead of loading the model in this process
+daemon_url = os.environ.get('SENTIMENT_DAEMON_URL')
+with run_metrics.stage('load_model'):
+    if daemon_url:
+        gemini_scorer = remote_scorer(daemon_url, 'gemini')
+    else:
+        # Configure the Google Gemini API (GOOGLE_API_KEY) and list the available models;
+        # GEMINI_STUB=1 swaps in the local stub model for testing
+        model = open_gemini_model(gemini_model_name, list_models=True)
+
+        # Concurrent, quota-aware, ID-keyed Gemini scoring (GEMINI_RPM, GEMINI_TPM, GEMINI_CONCURRENCY,
+        # GEMINI_BATCH_TOKENS and GEMINI_FOLLOWUP_ROUNDS tune the dispatcher)
+        gemini_scorer = GeminiScorer(gemini_model_name, model=model)
+
+# Persistent result cache: only reviews without a cached label are sent to Gemini
+# (SENTIMENT_CACHE sets the cache file or 'off', SENTIMENT_CACHE_MAX_MB its size limit)
+result_cache = open_result_cache()
+run_metrics.watch_cache('result_cache', result_cache.stats)
+
+# Scored reviews are appended to the partitioned Parquet review store
+# (SENTIMENT_STORE sets its directory or 'off')
+review_store = open_review_store()
+
+# Fetch reviews from Google Play Store. With PLAYSTORE_INCREMENTAL=1 only reviews newer than
+# the stored watermark are fetched, paging with the continuation token until known reviews
 app_id = 'com.efl.eurekaforbes'
-result, continuation_token = reviews(
-    app_id,
-    lang='en',  # language
-    country='in',  # country
-    sort=Sort.NEWEST,  # Sort order, 'newest' first
-    count=10,  # Number of reviews
-)
+incremental = os.environ.get('PLAYSTORE_INCREMENTAL') == '1'
+with run_metrics.stage('fetch'):
+    if incremental:
+        ingestor = PlayStoreIngestor(app_id, max_count=10)
+        result = ingestor.fetch_new()
+        if not result:
+            print(f'No new reviews for {app_id} since the last run')
+            raise SystemExit(0)
+    else:
+        result, continuation_token = reviews(
+            app_id,
+            lang='en',  # language
+            country='in',  # country
+            sort=Sort.NEWEST,  # Sort order, 'newest' first
+            count=10,  # Number of reviews
+        )
 
 # Convert reviews to DataFrame
 df = pd.DataFrame(result)
+run_metrics.count('reviews', len(df))
 
 # Select necessary columns and rename them
 mydata = df[['at', 'score', 'content']]
@@ -59,82 +92,40 @@ def clean_text(text):
     return text
 
 
-mydata['cleaned_review'] = mydata['review'].apply(clean_text)
-mydata['sentiment_category'] = ''  # Placeholder for sentiment
-
-# Batch processing for Gemini API
-batch_size = 25
-batches = [mydata[i:i + batch_size] for i in range(0, mydata.shape[0], batch_size)]
-
-def gemini_completion_function(batch, current_batch, total_batch):
-    print(f"Now processing batch#: {current_batch+1} of {total_batch}")
-
-    json_data = batch[['cleaned_review', 'sentiment_category']].to_json(orient='records')
-
-    prompt = f"""
-    You are an expert in linguistic analysis specializing in sentiment classification. Your task is to classify the sentiment of customer reviews into two categories: Positive (label=1) and Negative (label=0).
-
-    Below is a JSON object containing customer reviews under the key 'cleaned_review'. Your job is to update the 'sentiment_category' field within the JSON with either 1 (Positive) or 0 (Negative) based on the sentiment expressed in the review.
-
-    Please follow these rules:
-    1. Only return the updated JSON object as output.
-    2. Do not alter the structure or format of the JSON object.
-    3. If a review violates API policy or contains any content issues, assign it a sentiment of 0 (Negative).
-
-    Reviews are provided between three backticks below:
+with run_metrics.stage('clean', items=len(mydata)):
+    mydata['cleaned_review'] = mydata['review'].apply(clean_text)
 
-    {json_data}
-    """
-
-    try:
-        response = model.generate_content(prompt)
-        time.sleep(5)
-
-        # Check if the response contains valid content
-        if response.candidates and 'text' in response.candidates[0]:
-            return response.candidates[0]['text'].strip("`")
-        else:
-            print("Response blocked or invalid; assigning Negative sentiment.")
-            return json_data.replace('"sentiment_category": ""', '"sentiment_category": 0')
-
-    except Exception as e:
-        print(f"Error during API call: {e}")
-        return json_data.replace('"sentiment_category": ""', '"sentiment_category": 0')
-
-
-responses = [gemini_completion_function(batches[i], i, len(batches)) for i in range(len(batches))]
-
-# Process responses and update DataFrame
-df_total = pd.DataFrame()
-
-for response in responses:
-    try:
-        data = json.loads(response)
-        df_temp = pd.DataFrame(data)
-        df_total = pd.concat([df_total, df_temp], ignore_index=True)
-    except json.JSONDecodeError as e:
-        print(f"Error parsing JSON response: {e}")
-
-# Ensure the lengths match by slicing the DataFrame if necessary
-if len(df_total) != len(mydata):
-    print(f"Warning: Length mismatch. Trimming to minimum length of {min(len(df_total), len(mydata))}")
-    mydata = mydata.iloc[:min(len(df_total), len(mydata))]
-    df_total = df_total.iloc[:min(len(df_total), len(mydata))]
-
-# Merge the updated sentiment data back into the original DataFrame
-mydata['sentiment'] = df_total['sentiment_category'].values
+# Merge the sentiment labels back into the original DataFrame, scoring only uncached reviews
+with run_metrics.stage('score', items=len(mydata)):
+    mydata['sentiment'] = score_with_cache(gemini_scorer, mydata['cleaned_review'], result_cache)
+result_cache.report()
+if daemon_url:
+    gemini_scorer.report()
 
 # Map the sentiment values to the sentiment_category
-sentiment_mapping = {0: "Negative", 1: "Positive"}
-mydata['sentiment_category'] = mydata['sentiment'].map(sentiment_mapping)
-
-# Get the current date and time
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-
-# Save the reviews with sentiment analysis to a separate CSV file
-sentiment_reviews_file_path = os.path.join(os.getcwd(), f'google_playstore_reviews_with_gemini_sentiment_{timestamp}.csv')
-mydata.to_csv(sentiment_reviews_file_path, index=False)
-print(f'Reviews with sentiment analysis saved to {sentiment_reviews_file_path}')
+mydata['sentiment_category'] = mydata['sentiment'].map(SENTIMENT_MAPPING)
+
+# Reviews Gemini left unlabelled are not stored (the store would keep them unscored for good);
+# the watermark stays put below so they are fetched and scored again on the next run
+unlabelled = mydata['sentiment'].isna()
+if unlabelled.any():
+    print(f'{unlabelled.sum()} reviews got no Gemini label and are left for the next run')
+
+# Append to the review store; SENTIMENT_CSV=1 also writes the timestamped CSV dump
+with run_metrics.stage('write', items=len(mydata)):
+    review_store.append(mydata[~unlabelled].assign(review_id=df['reviewId']), 'playstore', 'gemini', model=gemini_model_name)
+    if os.environ.get('SENTIMENT_CSV') == '1':
+        # Get the current date and time
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # Save the reviews with sentiment analysis to a separate CSV file
+        sentiment_reviews_file_path = os.path.join(os.getcwd(), f'google_playstore_reviews_with_gemini_sentiment_{timestamp}.csv')
+        mydata.to_csv(sentiment_reviews_file_path, index=False)
+        print(f'Reviews with sentiment analysis saved to {sentiment_reviews_file_path}')
+
+# Advance the watermark only once the whole delta has been labelled and saved
+if incremental and not unlabelled.any():
+    ingestor.commit()
 
 # Display the first 5 and last 5 reviews after sentiment analysis
 print("First 5 Reviews After Sentiment Analysis:")
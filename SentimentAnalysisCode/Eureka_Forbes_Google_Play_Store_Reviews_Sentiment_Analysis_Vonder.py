@@ -1,14 +1,22 @@
 import os
 import pandas as pd
-import re
 from google_play_scraper import Sort, reviews
+from play_store_ingest import PlayStoreIngestor
+from streaming_pipeline import run_streaming_pipeline, ChunkedCsvWriter
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from text_normalizer import TextNormalizer
+from vader_scoring import VaderBulkScorer, categorize_sentiment_array, score_with_cache
+from result_cache import open_result_cache
+from scoring_daemon import remote_scorer
+from review_store import open_review_store, ReviewStoreWriter
+from run_metrics import open_run_metrics
 import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from nltk.tokenize import word_tokenize
 from datetime import datetime
 
+# Per-stage timers, counters and cache hit rates, reported at exit (SENTIMENT_METRICS,
+# SENTIMENT_METRICS_PROM and SENTIMENT_PROFILE configure the outputs, see run_metrics.py)
+run_metrics = open_run_metrics('playstore_vader')
+
 # Ensure NLTK data path includes the custom path
 nltk_data_path = '/Users/adwivedi/nltk_data'
 nltk.data.path.append(nltk_data_path)
@@ -18,8 +26,27 @@ vader_lexicon_path = os.path.join(nltk_data_path, 'sentiment/vader_lexicon', 'va
 if not os.path.exists(vader_lexicon_path):
     raise FileNotFoundError(f"Expected VADER lexicon file not found at: {vader_lexicon_path}")
 
-# Manually load the VADER lexicon
-sia = SentimentIntensityAnalyzer(lexicon_file=vader_lexicon_path)
+# With SENTIMENT_DAEMON_URL set, reviews are scored by the warm local scoring daemon
+# (scoring_daemon.py) instead of loading the model in this process
+daemon_url = os.environ.get('SENTIMENT_DAEMON_URL')
+with run_metrics.stage('load_model'):
+    if daemon_url:
+        vader_scorer = remote_scorer(daemon_url, 'vader')
+    else:
+        # Manually load the VADER lexicon
+        sia = SentimentIntensityAnalyzer(lexicon_file=vader_lexicon_path)
+
+        # Bulk VADER scorer reusing the loaded lexicon (compound scores only, float32)
+        vader_scorer = VaderBulkScorer(analyzer=sia)
+
+# Persistent result cache: only reviews without a cached score reach VADER
+# (SENTIMENT_CACHE sets the cache file or 'off', SENTIMENT_CACHE_MAX_MB its size limit)
+result_cache = open_result_cache()
+run_metrics.watch_cache('result_cache', result_cache.stats)
+
+# Scored reviews are appended to the partitioned Parquet review store
+# (SENTIMENT_STORE sets its directory or 'off')
+review_store = open_review_store()
 
 # Verify the punkt tokenizer exists
 punkt_path = os.path.join(nltk_data_path, 'tokenizers/punkt/english.pickle')
@@ -31,68 +58,78 @@ stopwords_path = os.path.join(nltk_data_path, 'corpora/stopwords/english')
 if not os.path.exists(stopwords_path):
     raise FileNotFoundError(f"Expected stopwords corpus not found at: {stopwords_path}")
 
+# Shared text normalizer: the stopword set, lemmatizer and regex patterns are built once.
+# Lemmas and short reviews are memoized; cache sizes (entries) are capped via
+# LEMMA_CACHE_SIZE and TEXT_CACHE_SIZE (0 disables a cache).
+text_normalizer = TextNormalizer(
+    lemma_cache_size=int(os.environ.get('LEMMA_CACHE_SIZE', 50000)),
+    text_cache_size=int(os.environ.get('TEXT_CACHE_SIZE', 20000)),
+)
+run_metrics.watch_cache('text_normalizer', text_normalizer.cache_stats)
+
 # Function to clean the review text
 def clean_text(text):
-    # Convert to lowercase
-    text = text.lower()
-
-    # Replace newline characters and strip leading/trailing whitespace
-    text = text.replace("\n", " ").strip()
-
-    # Remove non-ASCII characters and emojis
-    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
-
-    # Remove unwanted punctuation (keeping periods and commas)
-    text = re.sub(r'[^\w\s.,]', '', text)
-
-    # Remove numbers (optional, depending on if you want to keep numeric context)
-    text = re.sub(r'\d+', '', text)
-
-    # Replace multiple spaces with a single space
-    text = re.sub(r'\s+', ' ', text)
+    return text_normalizer.normalize(text)
 
-    # Replace multiple periods with a single period
-    text = re.sub(r'\.+', '.', text)
-
-    # Tokenize the text
-    words = word_tokenize(text)
-
-    # Use a less aggressive stopword removal (retain some stopwords for context)
-    stop_words = set(stopwords.words('english')) - {'no', 'not', 'up', 'down', 'few', 'more'}
-
-    # Remove stopwords, but retain some key ones for context
-    words = [word for word in words if word not in stop_words]
-
-    # Lemmatize the words
-    lemmatizer = WordNetLemmatizer()
-    words = [lemmatizer.lemmatize(word) for word in words]
-
-    # Join words back to a single string
-    cleaned_text = ' '.join(words)
-
-    return cleaned_text
-
-# Categorize the sentiment
-def categorize_sentiment(score):
-    if score > 0.05:
-        return "Positive"
-    elif score < -0.05:
-        return "Negative"
-    else:
-        return "Neutral"
-
-# Fetch reviews from Google Play Store
+# Fetch reviews from Google Play Store. With PLAYSTORE_INCREMENTAL=1 only reviews newer than
+# the stored watermark are fetched, paging with the continuation token until known reviews
 app_id = 'com.efl.eurekaforbes'
-result, continuation_token = reviews(
-    app_id,
-    lang='en',  # language
-    country='in',  # country
-    sort=Sort.NEWEST,  # Sort order, 'newest' first
-    count=5000,  # Number of reviews
-)
+incremental = os.environ.get('PLAYSTORE_INCREMENTAL') == '1'
+
+# Streaming mode (SENTIMENT_STREAMING=1): each fetched page flows straight through cleaning, scoring
+# and CSV output in chunks of SENTIMENT_CHUNK_SIZE instead of holding all reviews in memory
+def score_chunk(records):
+    chunk = pd.DataFrame(records)[['at', 'score', 'content', 'reviewId']]
+    chunk.columns = ['date', 'app_rating', 'review', 'review_id']
+    chunk['year'] = pd.to_datetime(chunk['date']).dt.year
+    chunk = chunk[['year', 'date', 'app_rating', 'review', 'review_id']]
+    chunk['date'] = pd.to_datetime(chunk['date']).dt.strftime('%d/%m/%y')
+    with run_metrics.stage('clean', items=len(chunk)):
+        chunk['cleaned_review'] = text_normalizer.normalize_many(chunk['review'])
+    with run_metrics.stage('score', items=len(chunk)):
+        chunk['sentiment'] = score_with_cache(vader_scorer, chunk['cleaned_review'], result_cache)
+    chunk['sentiment_category'] = categorize_sentiment_array(chunk['sentiment'])
+    return chunk
+
+if os.environ.get('SENTIMENT_STREAMING') == '1':
+    ingestor = PlayStoreIngestor(app_id, max_count=5000, incremental=incremental)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    sentiment_reviews_file_path = os.path.join(os.getcwd(), f'google_playstore_reviews_with_sentiment_vonder_{timestamp}.csv')
+    review_stream = (review for page in ingestor.pages() for review in page)
+    writers = [ReviewStoreWriter(review_store, 'playstore', 'vader', model=vader_scorer.model_id)]
+    if os.environ.get('SENTIMENT_CSV') == '1':
+        writers.append(ChunkedCsvWriter(sentiment_reviews_file_path))
+    total = run_streaming_pipeline(review_stream, score_chunk, writers,
+                                   chunk_size=int(os.environ.get('SENTIMENT_CHUNK_SIZE', 500)), metrics=run_metrics)
+    result_cache.report()
+    if daemon_url:
+        vader_scorer.report()
+    run_metrics.count('reviews', total)
+    print(f'{total} reviews with sentiment streamed to the review store')
+    # Advance the watermark only once the delta has been saved
+    if incremental:
+        ingestor.commit()
+    raise SystemExit(0)
+
+with run_metrics.stage('fetch'):
+    if incremental:
+        ingestor = PlayStoreIngestor(app_id, max_count=5000)
+        result = ingestor.fetch_new()
+        if not result:
+            print(f'No new reviews for {app_id} since the last run')
+            raise SystemExit(0)
+    else:
+        result, continuation_token = reviews(
+            app_id,
+            lang='en',  # language
+            country='in',  # country
+            sort=Sort.NEWEST,  # Sort order, 'newest' first
+            count=5000,  # Number of reviews
+        )
 
 # Convert reviews to DataFrame
 df = pd.DataFrame(result)
+run_metrics.count('reviews', len(df))
 
 # Select necessary columns and rename them
 mydata = df[['at', 'score', 'content']]
@@ -115,22 +152,36 @@ print("Last 5 Reviews Before Sentiment Analysis:")
 print(mydata.tail(5).to_string(index=False))
 
 # Clean the review text
-mydata['cleaned_review'] = mydata['review'].apply(clean_text)
+with run_metrics.stage('clean', items=len(mydata)):
+    mydata['cleaned_review'] = text_normalizer.normalize_many(mydata['review'])
+print(f'Text normalizer cache stats: {text_normalizer.cache_stats()}')
 
 # Apply sentiment analysis
-mydata['sentiment'] = mydata['cleaned_review'].apply(lambda x: sia.polarity_scores(x)['compound'])
+with run_metrics.stage('score', items=len(mydata)):
+    mydata['sentiment'] = score_with_cache(vader_scorer, mydata['cleaned_review'], result_cache)
+result_cache.report()
+if daemon_url:
+    vader_scorer.report()
 
 # Apply the categorization function
-mydata['sentiment_category'] = mydata['sentiment'].apply(categorize_sentiment)
+mydata['sentiment_category'] = categorize_sentiment_array(mydata['sentiment'])
+
+# Append to the review store; SENTIMENT_CSV=1 also writes the timestamped CSV dump
+with run_metrics.stage('write', items=len(mydata)):
+    review_store.append(mydata.assign(review_id=df['reviewId']), 'playstore', 'vader', model=vader_scorer.model_id)
+    if os.environ.get('SENTIMENT_CSV') == '1':
+        # Get the current date and time
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
 
-# Get the current date and time
-timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Save the reviews with sentiment analysis to a separate CSV file
+        sentiment_reviews_file_path = os.path.join(os.getcwd(), f'google_playstore_reviews_with_sentiment_vonder_{timestamp}.csv')
 
-# Save the reviews with sentiment analysis to a separate CSV file
-sentiment_reviews_file_path = os.path.join(os.getcwd(), f'google_playstore_reviews_with_sentiment_vonder_{timestamp}.csv')
+        mydata.to_csv(sentiment_reviews_file_path, index=False)
+        print(f'Reviews with sentiment analysis saved to {sentiment_reviews_file_path}')
 
-mydata.to_csv(sentiment_reviews_file_path, index=False)
-print(f'Reviews with sentiment analysis saved to {sentiment_reviews_file_path}')
+# Advance the watermark only once the delta has been saved
+if incremental:
+    ingestor.commit()
 
 # Display the first 5 and last 5 reviews after sentiment analysis
 print("First 5 Reviews After Sentiment Analysis:")
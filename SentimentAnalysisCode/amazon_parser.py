@@ -0,0 +1,55 @@
+from datetime import datetime
+from lxml import etree, html as lxml_html
+
+# Precompiled selectors for the Amazon review page
+_REVIEWS = etree.XPath('//div[@data-hook="review"]')
+_PRODUCT_LINK = etree.XPath('(//a[@data-hook="product-link"])[1]')
+_REVIEW_DATE = etree.XPath('(.//span[@data-hook="review-date"])[1]')
+_REVIEW_BODY = etree.XPath('(.//span[@data-hook="review-body"])[1]')
+_STAR_RATING = etree.XPath('(.//i[@data-hook="review-star-rating"])[1]')
+
+
+# Text of the first element matched by a selector, like BeautifulSoup's find(...).text
+def _first_text(selector, node):
+    found = selector(node)
+    if not found:
+        raise AttributeError("'NoneType' object has no attribute 'text'")
+    return found[0].text_content()
+
+
+# lxml-based replacement for get_reviews(soup, asin): parses the page once, reads the
+# page-level product name once and parses each review date once. Returns the same
+# review dicts, and like get_reviews prints and skips reviews it cannot read.
+def parse_review_page(page_html, asin, clean_text):
+    if not page_html:
+        return []
+    document = lxml_html.fromstring(page_html)
+
+    product_name = None
+    product_links = _PRODUCT_LINK(document)
+    if product_links:
+        product_name = product_links[0].text_content().split('|')[0].strip()
+
+    review_batch = []
+    for item in _REVIEWS(document):
+        try:
+            review_date = _first_text(_REVIEW_DATE, item).strip()
+            review_date = review_date.replace("Reviewed in India on ", "").strip()
+            parsed_date = datetime.strptime(review_date, '%d %B %Y')
+            if product_name is None:
+                raise AttributeError("'NoneType' object has no attribute 'text'")
+            body = _first_text(_REVIEW_BODY, item).strip()
+            cleaned_body = clean_text(body)
+            review = {
+                'asin': asin,
+                'product_name': product_name,
+                'year': parsed_date.year,
+                'date': parsed_date.strftime('%d-%m-%Y'),
+                'rating': float(_first_text(_STAR_RATING, item).replace('out of 5 stars', '').strip()),
+                'body': body,
+                'cleaned_body': cleaned_body
+            }
+            review_batch.append(review)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+    return review_batch
@@ -0,0 +1,126 @@
+import os
+import hashlib
+from datetime import datetime
+from app_store_scraper import AppStore
+from play_store_ingest import load_watermarks, save_watermarks
+
+# Per-app watermarks (newest ingested review) are kept in this JSON file
+DEFAULT_STATE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'eureka_forbes_sentiment', 'appstore_watermarks.json')
+
+# The App Store review API returns 20 reviews per page; how many review hashes are
+# remembered at the watermark
+PAGE_SIZE = 20
+WATERMARK_HASHES = 50
+
+
+# App Store reviews carry no id, so a review is identified by a hash of its content
+def review_hash(review):
+    key = '\x1f'.join(str(review.get(field, '')) for field in ('date', 'userName', 'title', 'review'))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+# Incremental App Store ingestion. Instead of one review(how_many=...) call that pages
+# through the whole history, review() is called for one page at a time (the scraper keeps
+# its page offset between calls, and how_many counts the reviews of the current call) with
+# the newest reviews first, and paging stops at the first review that was already ingested.
+# The watermark is advanced by commit(), once the caller has stored the delta, and only if
+# the fetch was not cut short, by a failed request or by reaching max_count before the
+# watermark (the reviews in between were never fetched). With incremental=False the watermark is
+# ignored and pages() yields the newest max_count reviews. throttle, if given, is called
+# before every request.
+class AppStoreIngestor:
+    def __init__(self, app_name, app_id, state_path=DEFAULT_STATE_PATH, country='in',
+                 max_count=9000, incremental=True, store=None, throttle=None):
+        self.app_id = str(app_id)
+        self.state_path = state_path
+        self.max_count = max_count
+        self.throttle = throttle
+        self.store = store if store is not None else AppStore(country=country, app_name=app_name, app_id=app_id)
+        # The review API's default order is not by date
+        self.store._request_params['sort'] = 'recent'
+        self.watermark = load_watermarks(state_path).get(self.app_id) if incremental else None
+        self.pages_fetched = 0
+        self.newest = []
+        self.truncated = False
+
+    # True once we reach a review at or behind the stored watermark
+    def _is_ingested(self, review):
+        if not self.watermark:
+            return False
+        watermark_date = datetime.fromisoformat(self.watermark['date'])
+        return review['date'] < watermark_date or review_hash(review) in self.watermark['review_hashes']
+
+    # Keep the reviews with the latest date seen so far (the next watermark)
+    def _track_newest(self, reviews):
+        for review in reviews:
+            if not self.newest or review['date'] > self.newest[0]['date']:
+                self.newest = [review]
+            elif review['date'] == self.newest[0]['date'] and len(self.newest) < WATERMARK_HASHES:
+                self.newest.append(review)
+
+    # Yield lists of new reviews, one per fetched page, newest first. Paging goes on to the
+    # review after the max_count-th to tell whether the cap cut the delta short.
+    def pages(self):
+        fetched = 0
+        while True:
+            remaining = self.max_count - fetched
+            if self.throttle is not None:
+                self.throttle()
+            self.store.review(how_many=PAGE_SIZE)
+            page = list(self.store.reviews)
+            # Empty the scraper's list so memory stays flat however far we page
+            self.store.reviews.clear()
+            self.pages_fetched += 1
+
+            # review() logs and swallows request errors, leaving the offset on the failed page
+            if len(page) < PAGE_SIZE and self.store._request_offset is not None:
+                print(f'App Store app {self.app_id}: page {self.pages_fetched} came back short, stopping')
+                self.truncated = True
+
+            new_reviews = []
+            reached_watermark = False
+            capped = False
+            for review in page:
+                if self._is_ingested(review):
+                    reached_watermark = True
+                    break
+                if len(new_reviews) == remaining:
+                    capped = True
+                    break
+                new_reviews.append(review)
+
+            if new_reviews:
+                self._track_newest(new_reviews)
+                fetched += len(new_reviews)
+                yield new_reviews
+
+            if capped and self.watermark:
+                print(f'App Store app {self.app_id}: stopped at {self.max_count} reviews before reaching the last run\'s watermark')
+                self.truncated = True
+            # The scraper clears its page offset after the last page; another review()
+            # call would start over from the newest review
+            if reached_watermark or capped or self.truncated or not page or self.store._request_offset is None:
+                break
+
+    # Fetch all new reviews as one list
+    def fetch_new(self):
+        result = [review for page in self.pages() for review in page]
+        print(f'Fetched {len(result)} new reviews for App Store app {self.app_id} in {self.pages_fetched} page(s)')
+        return result
+
+    # Persist the newest fetched review as the watermark for the next run. A fetch cut
+    # short keeps the old watermark, so the missed reviews are fetched again next time.
+    def commit(self):
+        if not self.newest:
+            return
+        if self.truncated:
+            print(f'App Store app {self.app_id}: fetch was incomplete, watermark not advanced')
+            return
+        newest_date = self.newest[0]['date']
+        watermarks = load_watermarks(self.state_path)
+        watermarks[self.app_id] = {
+            'date': newest_date.isoformat(),
+            'review_hashes': [review_hash(review) for review in self.newest],
+        }
+        save_watermarks(watermarks, self.state_path)
+        self.watermark = watermarks[self.app_id]
@@ -0,0 +1,78 @@
+import os
+import re
+import glob
+import time
+from datetime import datetime
+from bs4 import BeautifulSoup
+from amazon_parser import parse_review_page
+
+# Compares pages/sec of the lxml review parser against the BeautifulSoup get_reviews
+# path on the saved review page fixtures, and checks both return the same review dicts.
+# review_page_*.html are synthetic pages in Amazon's review markup; saved_*.html are real
+# review pages saved from amazon.co.in and scrubbed of personal data with scrub_amazon_page.py
+fixture_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'amazon')
+pages = []
+real_pages = 0
+for path in sorted(glob.glob(os.path.join(fixture_dir, '*.html'))):
+    with open(path, encoding='utf-8') as f:
+        pages.append(f.read())
+    real_pages += os.path.basename(path).startswith('saved_')
+rounds = int(os.environ.get('BENCHMARK_ROUNDS', 50))
+
+
+# clean_text from the Amazon Transformer script
+def clean_text(text):
+    text = text.replace("\n", " ").strip()
+    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text
+
+
+# The BeautifulSoup get_reviews the Amazon scripts used, kept verbatim as the reference
+def get_reviews(soup, asin):
+    reviews = soup.find_all('div', {'data-hook': 'review'})
+    review_batch = []
+    for item in reviews:
+        try:
+            review_date = item.find('span', {'data-hook': 'review-date'}).text.strip()
+            review_date = review_date.replace("Reviewed in India on ", "").strip()
+            review_date = datetime.strptime(review_date, '%d %B %Y').strftime('%d-%m-%Y')
+            year = datetime.strptime(review_date, '%d-%m-%Y').year
+            product_name = soup.find('a', {'data-hook': 'product-link'}).text.split('|')[0].strip()
+            body = item.find('span', {'data-hook': 'review-body'}).text.strip()
+            cleaned_body = clean_text(body)
+            review = {
+                'asin': asin,
+                'product_name': product_name,
+                'year': year,
+                'date': review_date,
+                'rating': float(item.find('i', {'data-hook': 'review-star-rating'}).text.replace('out of 5 stars', '').strip()),
+                'body': body,
+                'cleaned_body': cleaned_body
+            }
+            review_batch.append(review)
+        except Exception as e:
+            print(f"An error occurred: {e}")
+    return review_batch
+
+
+def run(parse):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        results = [parse(page) for page in pages]
+    return results, time.perf_counter() - start
+
+
+expected, soup_time = run(lambda page: get_reviews(BeautifulSoup(page, 'html.parser'), 'B0CW5YZ6VV'))
+actual, lxml_time = run(lambda page: parse_review_page(page, 'B0CW5YZ6VV', clean_text))
+
+if expected != actual:
+    raise AssertionError('lxml parser returned different review dicts than get_reviews')
+
+total_pages = len(pages) * rounds
+print(f'{len(pages)} fixture pages ({real_pages} real) x {rounds} rounds, {sum(len(batch) for batch in expected)} reviews per round')
+if not real_pages:
+    print('No real saved pages in fixtures/amazon, parity is only checked on synthetic markup (see scrub_amazon_page.py)')
+print(f'BeautifulSoup html.parser {total_pages / soup_time:9.1f} pages/sec')
+print(f'lxml precompiled XPath    {total_pages / lxml_time:9.1f} pages/sec')
+print(f'Speedup {soup_time / lxml_time:.2f}x, review dicts identical')
@@ -0,0 +1,87 @@
+import os
+import ast
+import time
+import numpy as np
+import pandas as pd
+from scoring_backends import load_scorer, transformer_category
+from cascade_scoring import CascadeScorer
+
+# Escalation rate and agreement of the VADER->transformer cascade against a
+# transformer-only run, per uncertainty band, on the shipped datasets. The datasets
+# already hold the distilbert results of a transformer-only run, so by default those
+# stored labels stand in for the transformer and the sweep needs no model. With
+# CASCADE_LIVE=1 the real TransformerScorer is used and both runs are timed.
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+datasets = {
+    'amazon': ('amazon_product_reviews_with_sentiment_analysis.xlsx', 'cleaned_body', 'rating'),
+    'apple': ('apple_store_reviews_sentiment_analysis.xlsx', 'cleaned_review', 'app_rating'),
+    'google_play': ('google_playstore_reviews_with_sentiment_analysis.xlsx', 'cleaned_review', 'app_rating'),
+}
+bands = [float(band) for band in os.environ.get('CASCADE_BANDS', '0,0.05,0.1,0.2,0.3,0.5').split(',')]
+live = os.environ.get('CASCADE_LIVE') == '1'
+
+
+# (probability, label) of the stored transformer-only run: the Amazon export keeps the
+# pipeline's result dict, the App Store and Play Store exports a score and a category
+def stored_results(frame):
+    if 'sentiment_result' in frame:
+        results = [ast.literal_eval(result) for result in frame['sentiment_result']]
+        return [(result['score'], result['label']) for result in results]
+    return list(zip(frame['sentiment'], frame['sentiment_category'].str.upper()))
+
+
+# Transformer scorer answering from the stored results of the same reviews
+class StoredTransformer:
+    model_id = 'stored-transformer-results'
+
+    def __init__(self, texts, results):
+        self.results = dict(zip(texts, results))
+
+    def score(self, texts):
+        results = [self.results[text] for text in texts]
+        return np.array([score for score, _ in results], dtype=np.float64), [label for _, label in results]
+
+
+def main():
+    vader_scorer = load_scorer('vader')
+    transformer_scorer = load_scorer('transformer') if live else None
+
+    for name, (file_name, column, rating_column) in datasets.items():
+        frame = pd.read_excel(os.path.join(repo_dir, file_name))
+        frame = frame[frame[column].apply(lambda text: isinstance(text, str))]
+        texts = frame[column].tolist()
+        ratings = frame[rating_column].tolist()
+
+        if live:
+            start = time.perf_counter()
+            reference_scores, reference_labels = transformer_scorer.score(texts)
+            transformer_only_seconds = time.perf_counter() - start
+            transformer = transformer_scorer
+        else:
+            results = stored_results(frame)
+            reference_labels = [label for _, label in results]
+            transformer = StoredTransformer(texts, results)
+        reference = np.array([transformer_category(label) for label in reference_labels])
+
+        vader_only = CascadeScorer(vader_scorer, transformer, band=-1, check_rating=False, audit_rate=0)
+        _, vader_categories, _ = vader_only.score(texts)
+        print(f'{name}: {len(texts)} reviews, VADER alone agrees with the transformer on '
+              f'{(np.array(vader_categories) == reference).mean():.1%}')
+
+        for band in bands:
+            cascade = CascadeScorer(vader_scorer, transformer, band=band, audit_rate=0)
+            _, categories, _ = cascade.score(texts, ratings=ratings)
+            stats = cascade.stats()
+            line = (f'  band {band:<5} escalated {stats["escalated_fraction"]:6.1%} '
+                    f'({stats["escalated_band"]} band, {stats["escalated_rating"]} rating)   '
+                    f'agreement {(np.array(categories) == reference).mean():6.1%}')
+            if live:
+                cascade_seconds = stats['vader_seconds'] + stats['transformer_seconds']
+                line += f'   {cascade_seconds:7.2f}s vs {transformer_only_seconds:7.2f}s transformer-only'
+            print(line)
+
+
+# Only run as a script: with CASCADE_LIVE=1 and SENTIMENT_WORKERS > 1 the transformer worker
+# processes are spawned (see transformer_pool.py) and import this module again
+if __name__ == '__main__':
+    main()
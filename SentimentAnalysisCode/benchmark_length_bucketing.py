@@ -0,0 +1,32 @@
+import os
+import time
+import pandas as pd
+from transformer_scoring import TransformerScorer
+
+# Compare fixed 512-token padding against length-bucketed dynamic padding on the
+# shipped Apple App Store dataset
+data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'apple_store_reviews_sentiment_analysis.xlsx')
+reviews = pd.read_excel(data_path)['cleaned_review'].tolist()
+batch_size = int(os.environ.get('SENTIMENT_BATCH_SIZE', 32))
+
+scorer = TransformerScorer(batch_size=batch_size)
+
+# Warm up the model so the first timed run does not pay for lazy initialization
+scorer.score(reviews[:batch_size])
+
+def timed(label, **kwargs):
+    start = time.perf_counter()
+    scores, labels = scorer.score(reviews, **kwargs)
+    elapsed = time.perf_counter() - start
+    print(f'{label:<40} {elapsed:8.2f} s {len(reviews) / elapsed:10.1f} reviews/sec')
+    return elapsed, labels
+
+print(f'Scoring {len(reviews)} Apple App Store reviews (batch size {batch_size})')
+fixed_time, fixed_labels = timed('Fixed padding to 512 tokens', padding='max_length')
+dynamic_time, dynamic_labels = timed('Dynamic padding, input order', bucket_by_length=False)
+bucketed_time, bucketed_labels = timed('Dynamic padding, length buckets', bucket_by_length=True)
+
+agreement = sum(a == b for a, b in zip(fixed_labels, bucketed_labels)) / len(reviews)
+print(f'\nThroughput gain of length buckets over fixed padding: {fixed_time / bucketed_time:.2f}x')
+print(f'Throughput gain of length buckets over input-order batches: {dynamic_time / bucketed_time:.2f}x')
+print(f'Label agreement with fixed padding: {agreement:.2%}')
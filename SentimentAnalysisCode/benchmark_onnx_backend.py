@@ -0,0 +1,49 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from transformer_scoring import TransformerScorer
+from onnx_backend import OnnxTransformerScorer
+
+# Parity check and speed comparison of the quantized ONNX backend against the
+# PyTorch path, using the scored datasets shipped with the repo
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+datasets = {
+    'amazon': ('amazon_product_reviews_with_sentiment_analysis.xlsx', 'cleaned_body'),
+    'apple': ('apple_store_reviews_sentiment_analysis.xlsx', 'cleaned_review'),
+    'google_play': ('google_playstore_reviews_with_sentiment_analysis.xlsx', 'cleaned_review'),
+}
+batch_size = int(os.environ.get('SENTIMENT_BATCH_SIZE', 32))
+latency_samples = int(os.environ.get('LATENCY_SAMPLES', 200))
+
+backends = {
+    'pytorch fp32': TransformerScorer(batch_size=batch_size),
+    'onnx int8': OnnxTransformerScorer(batch_size=batch_size),
+}
+
+# Per-review latency percentiles, scoring one review per call
+def measure_latency(scorer, texts):
+    timings = []
+    for text in texts:
+        start = time.perf_counter()
+        scorer.score([text])
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, [50, 95, 99])
+
+for name, (file_name, column) in datasets.items():
+    texts = pd.read_excel(os.path.join(repo_dir, file_name))[column].tolist()
+    print(f'\n{name}: {len(texts)} reviews')
+
+    results = {}
+    for backend, scorer in backends.items():
+        scorer.score(texts[:batch_size])
+        start = time.perf_counter()
+        scores, labels = scorer.score(texts)
+        elapsed = time.perf_counter() - start
+        p50, p95, p99 = measure_latency(scorer, texts[:latency_samples])
+        results[backend] = labels
+        print(f'  {backend:<14} {len(texts) / elapsed:9.1f} reviews/sec   latency p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  p99 {p99:6.1f} ms')
+
+    reference, candidate = results['pytorch fp32'], results['onnx int8']
+    agreement = sum(a == b for a, b in zip(reference, candidate)) / len(texts)
+    print(f'  label agreement onnx int8 vs pytorch fp32: {agreement:.2%}')
@@ -0,0 +1,317 @@
+import os
+import re
+import sys
+import glob
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+import subprocess
+import queue
+import multiprocessing
+from datetime import datetime
+from importlib import metadata
+import pandas as pd
+from streaming_pipeline import peak_rss_mb
+
+# Offline stage-level benchmarks on the shipped xlsx datasets and the saved Amazon
+# review pages. Each stage runs in a fresh process so its peak memory is its own:
+#   python benchmark_suite.py                                   # all stages -> benchmark_results/*.json
+#   python benchmark_suite.py --stages vader_scoring --compare benchmark_results/<old>.json
+# Throughput is rows/sec of the best of --rounds timed runs after one untimed warm-up
+# run. Memory is the child's RSS once its inputs are loaded (rss_baseline_mb) and its peak
+# RSS over building the stage (model and lexicon loading) and all runs (peak_rss_mb), their
+# difference being what the stage itself needs, plus the peak of Python-level allocations
+# during one run (tracemalloc, which does not see torch tensors).
+# With --compare, stages whose throughput drops by more than --tolerance are reported
+# and the exit status is 1.
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'amazon')
+
+# Dataset file, raw review column and cleaned review column
+DATASETS = {
+    'amazon': ('amazon_product_reviews_with_sentiment_analysis.xlsx', 'body', 'cleaned_body'),
+    'apple': ('apple_store_reviews_sentiment_analysis.xlsx', 'review', 'cleaned_review'),
+    'google_play': ('google_playstore_reviews_with_sentiment_analysis.xlsx', 'review', 'cleaned_review'),
+}
+
+STAGES = ['clean_text_simple', 'clean_text_vader', 'vader_scoring', 'transformer_scoring', 'amazon_html_parsing']
+
+# Libraries whose versions are recorded with the results
+LIBRARIES = ['numpy', 'pandas', 'nltk', 'lxml', 'torch', 'transformers', 'onnxruntime']
+
+
+# clean_text from the transformer and Gemini scripts
+def simple_clean_text(text):
+    text = text.replace("\n", " ").strip()
+    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text
+
+
+def load_texts(dataset, column):
+    file_name, raw_column, cleaned_column = DATASETS[dataset]
+    frame = pd.read_excel(os.path.join(REPO_DIR, file_name))
+    return [text for text in frame[raw_column if column == 'raw' else cleaned_column] if isinstance(text, str)]
+
+
+def load_pages():
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURE_DIR, '*.html'))):
+        with open(path, encoding='utf-8') as f:
+            pages.append(f.read())
+    return pages
+
+
+# Each stage builds (rows, run) from its inputs: run() processes all rows once.
+# Model and lexicon loading happens here, outside the timed runs.
+def clean_text_simple_stage(texts, options):
+    return len(texts), lambda: [simple_clean_text(text) for text in texts]
+
+
+def clean_text_vader_stage(texts, options):
+    from text_normalizer import TextNormalizer
+    TextNormalizer().normalize('warm up the nltk corpora')
+    # A fresh normalizer per run, so repeated runs do not hit the previous run's caches
+    return len(texts), lambda: TextNormalizer().normalize_many(texts)
+
+
+def vader_scoring_stage(texts, options):
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    from vader_scoring import VaderBulkScorer
+    lexicon_file = os.environ.get('VADER_LEXICON')
+    analyzer = SentimentIntensityAnalyzer(lexicon_file=lexicon_file) if lexicon_file else SentimentIntensityAnalyzer()
+    scorer = VaderBulkScorer(analyzer=analyzer)
+    return len(texts), lambda: scorer.score_many(texts)
+
+
+def transformer_scoring_stage(texts, options):
+    from transformer_scoring import TransformerScorer
+    texts = texts[:options['transformer_rows']]
+    scorer = TransformerScorer(batch_size=options['batch_size'])
+    return len(texts), lambda: scorer.score(texts)
+
+
+def amazon_html_parsing_stage(pages, options):
+    from amazon_parser import parse_review_page
+    return len(pages), lambda: [parse_review_page(page, 'B0CW5YZ6VV', simple_clean_text) for page in pages]
+
+
+# Stage function and its input: 'raw' or 'cleaned' review text, or the Amazon pages
+STAGE_INPUTS = {
+    'clean_text_simple': (clean_text_simple_stage, 'raw'),
+    'clean_text_vader': (clean_text_vader_stage, 'raw'),
+    'vader_scoring': (vader_scoring_stage, 'cleaned'),
+    'transformer_scoring': (transformer_scoring_stage, 'cleaned'),
+    'amazon_html_parsing': (amazon_html_parsing_stage, 'pages'),
+}
+
+
+# ru_maxrss is a high-water mark, and in a spawned child it starts out at the parent's RSS
+# (Linux keeps the peak of the address space replaced on exec). On Linux the child's own
+# high-water mark (VmHWM) is read instead, after lowering it to the current RSS once the
+# inputs are loaded, so it covers the stage only; elsewhere ru_maxrss is all there is.
+def reset_peak_rss():
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def stage_peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def measure(stage, dataset, options):
+    build, source = STAGE_INPUTS[stage]
+    inputs = load_pages() if source == 'pages' else load_texts(dataset, source)
+    reset_peak_rss()
+    rss_baseline = stage_peak_rss_mb()
+    rows, run = build(inputs, options)
+    run()
+
+    timings = []
+    for _ in range(options['rounds']):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    rss_after = stage_peak_rss_mb()
+
+    tracemalloc.start()
+    run()
+    python_peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    tracemalloc.stop()
+
+    best = min(timings)
+    return {
+        'status': 'ok',
+        'rows': rows,
+        'rounds': len(timings),
+        'best_seconds': round(best, 6),
+        'mean_seconds': round(sum(timings) / len(timings), 6),
+        'rows_per_sec': round(rows / best, 1) if best else None,
+        'rss_baseline_mb': round(rss_baseline, 1),
+        'peak_rss_mb': round(rss_after, 1),
+        'rss_growth_mb': round(rss_after - rss_baseline, 1),
+        'python_alloc_peak_mb': round(python_peak, 1),
+    }
+
+
+# Runs in the child process; missing optional libraries or nltk corpora skip the stage
+def _child(stage, dataset, options, results):
+    try:
+        results.put(measure(stage, dataset, options))
+    except (ImportError, LookupError, OSError) as e:
+        # nltk's LookupError message opens with a banner of asterisks
+        message = next((line.strip() for line in str(e).splitlines() if re.search(r'\w', line)), '')
+        results.put({'status': 'skipped', 'reason': f'{type(e).__name__}: {message}'})
+    except Exception as e:
+        results.put({'status': 'error', 'reason': repr(e)})
+
+
+# A child that crashes or is killed (e.g. by the OOM killer) before reporting, or that runs
+# longer than timeout seconds, is recorded as a failed stage instead of hanging the suite
+def run_isolated(stage, dataset, options, timeout=None):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=_child, args=(stage, dataset, options, results))
+    process.start()
+    deadline = time.monotonic() + timeout if timeout else None
+    result = None
+    while result is None:
+        try:
+            result = results.get(timeout=1)
+        except queue.Empty:
+            if not process.is_alive():
+                # The child may have put its result just before exiting
+                try:
+                    result = results.get(timeout=1)
+                except queue.Empty:
+                    result = {'status': 'error', 'reason': f'child process exited with code {process.exitcode}'}
+            elif deadline is not None and time.monotonic() > deadline:
+                process.terminate()
+                result = {'status': 'error', 'reason': f'timed out after {timeout}s'}
+    process.join()
+    return result
+
+
+# (stage, dataset, options) for every benchmark: Amazon parsing runs once on the page
+# fixtures, transformer scoring once per batch size with a third of the rounds (it is
+# orders of magnitude slower than the other stages)
+def plan(stages, datasets, batch_sizes, rounds, transformer_rows):
+    for stage in stages:
+        for dataset in (['fixtures'] if stage == 'amazon_html_parsing' else datasets):
+            if stage == 'transformer_scoring':
+                for batch_size in batch_sizes:
+                    yield stage, dataset, {'rounds': max(1, rounds // 3), 'batch_size': batch_size,
+                                           'transformer_rows': transformer_rows}
+            else:
+                yield stage, dataset, {'rounds': rounds}
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, cwd=REPO_DIR).stdout.strip()
+    except OSError:
+        commit = ''
+    versions = {}
+    for library in LIBRARIES:
+        try:
+            versions[library] = metadata.version(library)
+        except metadata.PackageNotFoundError:
+            versions[library] = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': commit or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'libraries': versions,
+    }
+
+
+def benchmark_key(result):
+    return result['stage'], result['dataset'], result.get('batch_size')
+
+
+# Throughput ratio against a previous results file; returns the regressed benchmarks
+def compare(results, baseline_path, tolerance):
+    with open(baseline_path) as f:
+        baseline = {benchmark_key(result): result for result in json.load(f)['results']}
+    regressions = []
+    print(f'\nCompared with {baseline_path}:')
+    for result in results:
+        previous = baseline.get(benchmark_key(result))
+        if not previous or result['status'] != 'ok' or previous['status'] != 'ok':
+            continue
+        ratio = result['rows_per_sec'] / previous['rows_per_sec']
+        flag = ''
+        if ratio < 1 - tolerance:
+            flag = '  REGRESSION'
+            regressions.append(result)
+        print(f"  {_label(result):<44} {ratio:6.2f}x throughput   "
+              f"peak RSS {result['peak_rss_mb'] - previous['peak_rss_mb']:+8.1f} MB{flag}")
+    return regressions
+
+
+def _label(result):
+    label = f"{result['stage']} [{result['dataset']}]"
+    return label + (f" batch {result['batch_size']}" if result.get('batch_size') else '')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Stage-level benchmarks on the shipped review datasets')
+    parser.add_argument('--stages', default=','.join(STAGES), help='comma-separated stages to run')
+    parser.add_argument('--datasets', default=','.join(DATASETS), help='comma-separated datasets to run')
+    parser.add_argument('--rounds', type=int, default=int(os.environ.get('BENCHMARK_ROUNDS', 5)))
+    parser.add_argument('--batch-sizes', default=os.environ.get('BENCHMARK_BATCH_SIZES', '8,16,32,64'),
+                        help='transformer batch sizes')
+    parser.add_argument('--transformer-rows', type=int, default=1000, help='reviews per dataset for transformer scoring')
+    parser.add_argument('--output', help='results file (default benchmark_results/benchmark_<timestamp>.json)')
+    parser.add_argument('--compare', help='previous results file to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='throughput drop reported as a regression')
+    parser.add_argument('--timeout', type=float, default=float(os.environ.get('BENCHMARK_TIMEOUT', 3600)),
+                        help='seconds before a stage is stopped and reported as failed (0: no limit)')
+    args = parser.parse_args(argv)
+
+    stages = [stage for stage in args.stages.split(',') if stage]
+    datasets = [dataset for dataset in args.datasets.split(',') if dataset]
+    unknown = set(stages) - set(STAGES) | set(datasets) - set(DATASETS)
+    if unknown:
+        parser.error(f'unknown stages or datasets: {", ".join(sorted(unknown))}')
+    batch_sizes = [int(size) for size in args.batch_sizes.split(',') if size]
+
+    results = []
+    for stage, dataset, options in plan(stages, datasets, batch_sizes, args.rounds, args.transformer_rows):
+        result = {'stage': stage, 'dataset': dataset, 'batch_size': options.get('batch_size')}
+        result.update(run_isolated(stage, dataset, options, timeout=args.timeout))
+        results.append(result)
+        if result['status'] == 'ok':
+            print(f"{_label(result):<44} {result['rows']:6d} rows {result['rows_per_sec']:11.1f} rows/sec   "
+                  f"peak RSS {result['peak_rss_mb']:7.1f} MB (+{result['rss_growth_mb']:.1f})   "
+                  f"Python peak {result['python_alloc_peak_mb']:6.1f} MB")
+        else:
+            print(f"{_label(result):<44} {result['status']}: {result['reason']}")
+
+    output = args.output or os.path.join('benchmark_results', f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    if os.path.dirname(output):
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    print(f'Benchmark results saved to {output}')
+
+    if args.compare and compare(results, args.compare, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+import os
+import re
+import time
+import pandas as pd
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+from text_normalizer import TextNormalizer
+
+# Microbenchmark of TextNormalizer against the original VADER clean_text, on the raw
+# review text of the shipped datasets. Fails if any output differs by a single byte.
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+datasets = {
+    'amazon': ('amazon_product_reviews_with_sentiment_analysis.xlsx', 'body'),
+    'apple': ('apple_store_reviews_sentiment_analysis.xlsx', 'review'),
+    'google_play': ('google_playstore_reviews_with_sentiment_analysis.xlsx', 'review'),
+}
+
+
+# The clean_text the Vonder scripts used before TextNormalizer, kept verbatim as the reference
+def clean_text(text):
+    text = text.lower()
+    text = text.replace("\n", " ").strip()
+    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
+    text = re.sub(r'[^\w\s.,]', '', text)
+    text = re.sub(r'\d+', '', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'\.+', '.', text)
+    words = word_tokenize(text)
+    stop_words = set(stopwords.words('english')) - {'no', 'not', 'up', 'down', 'few', 'more'}
+    words = [word for word in words if word not in stop_words]
+    lemmatizer = WordNetLemmatizer()
+    words = [lemmatizer.lemmatize(word) for word in words]
+    return ' '.join(words)
+
+
+normalizer = TextNormalizer()
+# Same normalizer with memoization switched off, to show what the lemma/review caches add
+uncached_normalizer = TextNormalizer(lemma_cache_size=0, text_cache_size=0)
+
+for name, (file_name, column) in datasets.items():
+    texts = [text for text in pd.read_excel(os.path.join(repo_dir, file_name))[column] if isinstance(text, str)]
+
+    start = time.perf_counter()
+    expected = [clean_text(text) for text in texts]
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    uncached_normalizer.normalize_many(texts)
+    uncached_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = normalizer.normalize_many(texts)
+    normalizer_time = time.perf_counter() - start
+
+    mismatches = [text for text, a, b in zip(texts, expected, actual) if a.encode() != b.encode()]
+    if mismatches:
+        raise AssertionError(f'{name}: {len(mismatches)} outputs differ from clean_text, e.g. {mismatches[0]!r}')
+
+    print(f'{name:<12} {len(texts):6d} reviews   clean_text {len(texts) / legacy_time:9.1f}/s   '
+          f'uncached {len(texts) / uncached_time:9.1f}/s   cached {len(texts) / normalizer_time:9.1f}/s   speedup {legacy_time / normalizer_time:.2f}x   outputs identical')
+
+print(f'Cache stats: {normalizer.cache_stats()}')
@@ -0,0 +1,38 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+from vader_scoring import VaderBulkScorer, categorize_sentiment_array
+
+# Parity check and speed comparison of VaderBulkScorer against per-row
+# sia.polarity_scores(x)['compound'] on the shipped datasets
+repo_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+datasets = {
+    'amazon': ('amazon_product_reviews_with_sentiment_analysis.xlsx', 'cleaned_body'),
+    'apple': ('apple_store_reviews_sentiment_analysis.xlsx', 'cleaned_review'),
+    'google_play': ('google_playstore_reviews_with_sentiment_analysis.xlsx', 'cleaned_review'),
+}
+
+sia = SentimentIntensityAnalyzer(lexicon_file=os.environ.get('VADER_LEXICON', 'sentiment/vader_lexicon/vader_lexicon.txt'))
+vader_scorer = VaderBulkScorer(analyzer=sia)
+
+for name, (file_name, column) in datasets.items():
+    texts = [text for text in pd.read_excel(os.path.join(repo_dir, file_name))[column] if isinstance(text, str)]
+
+    start = time.perf_counter()
+    expected = pd.Series(texts).apply(lambda x: sia.polarity_scores(x)['compound'])
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = vader_scorer.score_many(texts)
+    categories = categorize_sentiment_array(actual)
+    bulk_time = time.perf_counter() - start
+
+    mismatches = int((expected.to_numpy(dtype=np.float32) != actual).sum())
+    if mismatches:
+        raise AssertionError(f'{name}: {mismatches} compound scores differ from polarity_scores')
+
+    print(f'{name:<12} {len(texts):6d} reviews   polarity_scores {len(texts) / legacy_time:9.1f}/s   '
+          f'bulk {len(texts) / bulk_time:9.1f}/s   speedup {legacy_time / bulk_time:.2f}x   '
+          f'{(categories == "Positive").sum()} positive / {(categories == "Negative").sum()} negative')
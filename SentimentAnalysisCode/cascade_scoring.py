@@ -0,0 +1,165 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from vader_scoring import categorize_sentiment_array, score_with_cache as vader_score_with_cache
+from scoring_backends import transformer_category
+
+# categorize_sentiment's thresholds: compound > 0.05 is Positive, < -0.05 Negative
+VADER_THRESHOLD = 0.05
+
+# Reviews whose compound score is within this distance of either threshold are escalated
+DEFAULT_BAND = 0.1
+
+# Share of the reviews VADER settles on its own that are also scored by the transformer,
+# to estimate how closely the cascade agrees with a transformer-only run
+DEFAULT_AUDIT_RATE = 0.02
+
+
+# Boolean arrays: compound inside the uncertain band, and VADER contradicting the star
+# rating (4-5 stars scored Negative, 1-2 stars scored Positive). Missing ratings never disagree.
+def escalation_masks(compound, ratings=None, band=DEFAULT_BAND):
+    # VADER's label comes from categorize_sentiment_array itself, so a review exactly on a
+    # threshold is Neutral here too and never disagrees with its rating
+    categories = categorize_sentiment_array(compound)
+    compound = np.asarray(compound, dtype=np.float64)
+    uncertain = np.minimum(np.abs(compound - VADER_THRESHOLD), np.abs(compound + VADER_THRESHOLD)) <= band
+    if ratings is None:
+        return uncertain, np.zeros(len(compound), dtype=bool)
+    ratings = pd.to_numeric(pd.Series(list(ratings)), errors='coerce').to_numpy(dtype=np.float64)
+    disagrees = ((ratings >= 4) & (categories == 'Negative')) | ((ratings <= 2) & (categories == 'Positive'))
+    return uncertain, disagrees
+
+
+# VADER first, distilbert only where VADER is unsure. Every review is scored with VADER;
+# reviews in the uncertain band around the +/-0.05 thresholds, or whose VADER sentiment
+# contradicts their star rating (check_rating), are re-scored by the transformer, which
+# then decides. Scores are VADER compound scores, or the transformer probability signed
+# by its label (-p for NEGATIVE) for escalated reviews. A random audit_rate sample of
+# the other reviews is also sent to the transformer to estimate agreement with a
+# transformer-only run; audited reviews keep their VADER result.
+class CascadeScorer:
+    def __init__(self, vader_scorer, transformer_scorer, band=DEFAULT_BAND, check_rating=True,
+                 audit_rate=DEFAULT_AUDIT_RATE, seed=0):
+        self.vader = vader_scorer
+        self.transformer = transformer_scorer
+        self.band = band
+        self.check_rating = check_rating
+        self.audit_rate = audit_rate
+        self.rng = np.random.default_rng(seed)
+        self.model_id = f'cascade(band={band},rating={int(check_rating)})[{vader_scorer.model_id}|{transformer_scorer.model_id}]'
+        self.rows = 0
+        self.escalated = 0
+        self.escalated_band = 0
+        self.escalated_rating = 0
+        self.audited = 0
+        self.audit_agreed = 0
+        self.vader_seconds = 0.0
+        self.transformer_seconds = 0.0
+        self.transformer_rows = 0
+
+    def _score_transformer(self, texts):
+        start = time.perf_counter()
+        scores, labels = self.transformer.score(texts)
+        self.transformer_seconds += time.perf_counter() - start
+        self.transformer_rows += len(texts)
+        return np.asarray(scores, dtype=np.float64), list(labels)
+
+    # Transformer results for texts, through the result cache when one is given (shares
+    # cache entries with transformer-only runs of the same model)
+    def _transformer_results(self, texts, cache):
+        if not texts:
+            return [], []
+        if cache is None:
+            return self._score_transformer(texts)
+
+        def score_pending(pending):
+            scores, labels = self._score_transformer(pending)
+            return [[score, label] for score, label in zip(scores.tolist(), labels)]
+
+        results = cache.score('transformer', self.transformer.model_id, texts, score_pending)
+        return np.array([result[0] for result in results], dtype=np.float64), [result[1] for result in results]
+
+    # Returns (scores, categories, scored_by) for texts, in input order; scored_by is
+    # 'vader' or 'transformer' per review
+    def score(self, texts, ratings=None, cache=None):
+        texts = list(texts)
+        start = time.perf_counter()
+        if cache is not None:
+            compound = vader_score_with_cache(self.vader, texts, cache)
+        else:
+            compound = self.vader.score_many(texts)
+        self.vader_seconds += time.perf_counter() - start
+
+        uncertain, disagrees = escalation_masks(compound, ratings if self.check_rating else None, self.band)
+        escalate = uncertain | disagrees
+        audit = ~escalate & (self.rng.random(len(texts)) < self.audit_rate)
+        positions = np.flatnonzero(escalate | audit)
+        t_scores, t_labels = self._transformer_results([texts[i] for i in positions], cache)
+
+        scores = compound.astype(np.float64)
+        categories = categorize_sentiment_array(compound).tolist()
+        scored_by = ['vader'] * len(texts)
+        for i, score, label in zip(positions.tolist(), t_scores, t_labels):
+            category = transformer_category(label)
+            if escalate[i]:
+                scores[i] = -score if label == 'NEGATIVE' else score
+                categories[i] = category
+                scored_by[i] = 'transformer'
+            else:
+                self.audited += 1
+                self.audit_agreed += category == categories[i]
+
+        self.rows += len(texts)
+        self.escalated += int(escalate.sum())
+        self.escalated_band += int(uncertain.sum())
+        self.escalated_rating += int((disagrees & ~uncertain).sum())
+        return scores, categories, scored_by
+
+    def stats(self):
+        stats = {
+            'rows': self.rows,
+            'escalated': self.escalated,
+            'escalated_fraction': round(self.escalated / self.rows, 4) if self.rows else 0.0,
+            'escalated_band': self.escalated_band,
+            'escalated_rating': self.escalated_rating,
+            'vader_seconds': round(self.vader_seconds, 3),
+            'transformer_rows': self.transformer_rows,
+            'transformer_seconds': round(self.transformer_seconds, 3),
+            'audited': self.audited,
+        }
+        # Transformer-only time is extrapolated from the measured per-review model time
+        if self.transformer_rows:
+            transformer_only = self.transformer_seconds / self.transformer_rows * self.rows
+            stats['transformer_only_seconds_estimate'] = round(transformer_only, 3)
+            stats['transformer_seconds_saved_estimate'] = round(transformer_only - self.transformer_seconds, 3)
+        # Escalated reviews agree with the transformer by construction; the rest agree at the audit rate
+        if self.audited:
+            audit_agreement = self.audit_agreed / self.audited
+            stats['audit_agreement'] = round(audit_agreement, 4)
+            stats['agreement_estimate'] = round((self.escalated + (self.rows - self.escalated) * audit_agreement) / self.rows, 4)
+        return stats
+
+    def report(self):
+        stats = self.stats()
+        print(f"Cascade: {stats['escalated']} of {stats['rows']} reviews escalated to the transformer "
+              f"({stats['escalated_fraction']:.1%}: {stats['escalated_band']} in the +/-{self.band} band, "
+              f"{stats['escalated_rating']} contradicting the star rating)")
+        if 'transformer_seconds_saved_estimate' in stats:
+            print(f"Cascade: transformer time {stats['transformer_seconds']}s, about "
+                  f"{stats['transformer_seconds_saved_estimate']}s saved against a transformer-only run")
+        if 'agreement_estimate' in stats:
+            print(f"Cascade: estimated {stats['agreement_estimate']:.1%} agreement with a transformer-only run "
+                  f"({stats['audited']} audited reviews)")
+
+
+# Cascade over already-loaded scorers, configured by CASCADE_BAND, CASCADE_RATING_CHECK
+# (0 disables the star-rating check) and CASCADE_AUDIT_RATE
+def open_cascade_scorer(vader_scorer, transformer_scorer):
+    return CascadeScorer(
+        vader_scorer,
+        transformer_scorer,
+        band=float(os.environ.get('CASCADE_BAND', DEFAULT_BAND)),
+        check_rating=os.environ.get('CASCADE_RATING_CHECK', '1') != '0',
+        audit_rate=float(os.environ.get('CASCADE_AUDIT_RATE', DEFAULT_AUDIT_RATE)),
+    )
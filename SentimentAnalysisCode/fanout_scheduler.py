@@ -0,0 +1,215 @@
+import os
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import pandas as pd
+import sentiment_cli
+from play_store_ingest import load_watermarks, save_watermarks
+from scoring_backends import BACKEND_NAMES, load_scorer, score_texts
+
+# Fan-out over a source manifest (see sources.json):
+#   python fanout_scheduler.py --manifest sources.json --backend vader [--incremental] [--csv]
+# Every enabled target (an Amazon ASIN, an App Store or Play Store app, a Twitter handle)
+# is one fetch job. Jobs run concurrently, at most max_concurrency per source, and the page
+# requests of a source share its requests_per_second limit. Within a source, targets that
+# produced the most new reviews over their last runs are fetched first. All fetched reviews
+# are cleaned and scored together and written as one consolidated output.
+
+# Recent new-review counts per target are kept in this JSON file
+DEFAULT_YIELD_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'eureka_forbes_sentiment', 'fanout_yields.json')
+
+# Runs remembered per target for prioritisation
+YIELD_HISTORY = 5
+
+DEFAULT_SOURCE_LIMITS = {'max_concurrency': 1, 'requests_per_second': 1.0}
+
+
+# Spaces out page requests of one source across all of its jobs
+class RateLimiter:
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_start)
+            self._next_start = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+def load_manifest(path):
+    with open(path) as f:
+        manifest = json.load(f)
+    sources = manifest.get('sources', {})
+    targets = [target for target in manifest['targets'] if target.get('enabled', True)]
+    for target in targets:
+        if target['source'] not in sentiment_cli.SOURCES:
+            raise ValueError(f"Unknown source {target['source']!r} for target {target.get('id')!r} in {path}")
+        if target['source'] == 'appstore' and 'app_name' not in target:
+            raise ValueError(f"App Store target {target['id']!r} in {path} needs an app_name")
+    return sources, targets
+
+
+def target_key(target):
+    return f"{target['source']}:{target['id']}"
+
+
+# Targets never run before come first, then the highest mean yield over the recent runs;
+# manifest order breaks ties
+def prioritize(targets, yields):
+    def priority(target):
+        history = yields.get(target_key(target))
+        return float('inf') if not history else sum(history) / len(history)
+    return sorted(targets, key=priority, reverse=True)
+
+
+def record_yields(yields, new_reviews):
+    for key, count in new_reviews.items():
+        yields[key] = (yields.get(key, []) + [count])[-YIELD_HISTORY:]
+    return yields
+
+
+# The fetcher's target argument for a manifest entry
+def fetch_target(target):
+    if target['source'] == 'amazon':
+        return [target['id']]
+    if target['source'] == 'appstore':
+        return (target['app_name'], target['id'])
+    return target['id']
+
+
+# One fetch job: returns the target's reviews (cleaned later, in the main thread) tagged
+# with source and product, the ingestor holding its watermark, and any error
+def run_job(target, limit, limiter, incremental):
+    source = target['source']
+    start = time.perf_counter()
+    records, ingestor, error = [], None, None
+    try:
+        reviews, ingestor = sentiment_cli.SOURCES[source](
+            limit, lambda text: text, incremental, target=fetch_target(target), throttle=limiter.wait)
+        for review in reviews:
+            review['source'] = source
+            review['product_id'] = review.pop('asin', target['id'])
+            review.setdefault('product_name', target.get('name'))
+            records.append(review)
+    except Exception as e:
+        error = repr(e)
+        print(f'{target_key(target)}: fetch failed: {error}')
+    seconds = time.perf_counter() - start
+    print(f'{target_key(target)}: {len(records)} reviews in {seconds:.1f}s')
+    return {'target': target, 'records': records, 'ingestor': ingestor, 'error': error, 'seconds': seconds}
+
+
+# Run every target's job, one thread pool per source sized to its max_concurrency, and
+# return the job results in manifest order
+def fan_out(sources, targets, yields, incremental):
+    pools = []
+    futures = {}
+    for source in sorted({target['source'] for target in targets}):
+        limits = {**DEFAULT_SOURCE_LIMITS, **sources.get(source, {})}
+        limiter = RateLimiter(limits['requests_per_second'])
+        pool = ThreadPoolExecutor(max_workers=limits['max_concurrency'], thread_name_prefix=f'fanout-{source}')
+        pools.append(pool)
+        ordered = prioritize([target for target in targets if target['source'] == source], yields)
+        print(f"{source}: {len(ordered)} target(s), {limits['max_concurrency']} at a time, "
+              f"{limits['requests_per_second']} requests/s, order {', '.join(target['id'] for target in ordered)}")
+        for target in ordered:
+            limit = target.get('limit', limits.get('limit', sentiment_cli.DEFAULT_COUNTS[source]))
+            futures[target_key(target)] = pool.submit(run_job, target, limit, limiter, incremental)
+    try:
+        return [futures[target_key(target)].result() for target in targets]
+    finally:
+        for pool in pools:
+            pool.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='fanout_scheduler', description='Fetch and score every target of a source manifest')
+    parser.add_argument('--manifest', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sources.json'))
+    parser.add_argument('--backend', required=True, choices=sorted(BACKEND_NAMES))
+    parser.add_argument('--incremental', action='store_true', help='App Store and Play Store: only reviews since the last run')
+    parser.add_argument('--csv', action='store_true', help='also write the consolidated timestamped CSV file')
+    args = parser.parse_args(argv)
+
+    from result_cache import open_result_cache
+    from review_store import open_review_store
+    from run_metrics import open_run_metrics
+    run_metrics = open_run_metrics(f'fanout_{args.backend}')
+    result_cache = open_result_cache()
+    run_metrics.watch_cache('result_cache', result_cache.stats)
+    review_store = open_review_store()
+
+    sources, targets = load_manifest(args.manifest)
+    yield_path = os.environ.get('FANOUT_YIELDS', DEFAULT_YIELD_PATH)
+    yields = load_watermarks(yield_path)
+    with run_metrics.stage('fetch', items=len(targets)):
+        jobs = fan_out(sources, targets, yields, args.incremental)
+    records = [record for job in jobs for record in job['records']]
+    for job in jobs:
+        run_metrics.count(f"reviews.{job['target']['source']}", len(job['records']))
+    print(f'Fetched {len(records)} reviews from {len(targets)} targets')
+
+    new_reviews = {}
+    pending = set()
+    if records:
+        df = pd.DataFrame(records)
+        clean_text = sentiment_cli.make_cleaner(args.backend)
+        with run_metrics.stage('clean', items=len(df)):
+            df['cleaned_review'] = [clean_text(text) if isinstance(text, str) else '' for text in df['review']]
+        with run_metrics.stage('load_model'):
+            scorer = load_scorer(args.backend)
+        with run_metrics.stage('score', items=len(df)):
+            ratings = df['app_rating'] if 'app_rating' in df else None
+            if 'rating' in df:
+                ratings = df['rating'] if ratings is None else ratings.fillna(df['rating'])
+            scores, _, categories = score_texts(args.backend, scorer, df['cleaned_review'], result_cache, ratings=ratings)
+        df['sentiment'], df['sentiment_category'] = scores, categories
+        # Reviews Gemini could not label are not stored, and their targets keep the old
+        # watermark so the reviews are fetched and scored again next run
+        unlabelled = df['sentiment'].isna()
+        pending = {f'{source}:{product_id}' for source, product_id in df.loc[unlabelled, ['source', 'product_id']].itertuples(index=False)}
+        if unlabelled.any():
+            print(f'{unlabelled.sum()} reviews got no sentiment label and are left for the next run')
+        result_cache.report()
+        if args.backend == 'cascade':
+            scorer.report()
+
+        # Stored per target so each target's yield is the number of reviews new to the store
+        with run_metrics.stage('write', items=len(df)):
+            for (source, product_id), group in df[~unlabelled].groupby(['source', 'product_id'], sort=False):
+                group = group.dropna(axis=1, how='all')
+                written = review_store.append(group, source, args.backend, model=scorer.model_id)
+                new_reviews[f'{source}:{product_id}'] = written if review_store.path else len(group)
+            if args.csv or os.environ.get('SENTIMENT_CSV') == '1':
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                path = os.path.join(os.getcwd(), f'fanout_reviews_with_{args.backend}_sentiment_{timestamp}.csv')
+                df.to_csv(path, index=False)
+                print(f'Reviews with sentiment analysis saved to {path}')
+
+    # Advance watermarks and yield history only for targets that were fetched without errors,
+    # and watermarks only where every review was labelled
+    completed = {}
+    for job in jobs:
+        if job['error'] is None:
+            key = target_key(job['target'])
+            completed[key] = new_reviews.get(key, 0)
+            if job['ingestor'] is not None and args.incremental and key not in pending:
+                job['ingestor'].commit()
+    save_watermarks(record_yields(yields, completed), yield_path)
+
+    print('Fan-out summary:')
+    for job in jobs:
+        key = target_key(job['target'])
+        status = f"failed: {job['error']}" if job['error'] else f'{new_reviews.get(key, 0)} new'
+        print(f"  {key:<40} {len(job['records']):6d} fetched {job['seconds']:8.1f}s  {status}")
+    run_metrics.finish()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+import json
+import asyncio
+import random
+
+# Error types worth retrying: quota/rate limiting and transient unavailability
+# (google.api_core exceptions, matched by name so the stub can raise look-alikes)
+RETRY_ERRORS = {'ResourceExhausted', 'TooManyRequests', 'ServiceUnavailable', 'DeadlineExceeded', 'InternalServerError'}
+
+
+# Rough prompt size; Gemini averages about 4 characters per token for English text
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+# Pack texts into batches whose estimated token count stays within max_batch_tokens
+# (at most max_batch_size texts each). Returns lists of indices in input order.
+def pack_batches(texts, max_batch_tokens=2000, max_batch_size=100, token_counter=estimate_tokens):
+    batches, batch, batch_tokens = [], [], 0
+    for i, text in enumerate(texts):
+        tokens = token_counter(text)
+        if batch and (batch_tokens + tokens > max_batch_tokens or len(batch) >= max_batch_size):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(i)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+# Token bucket refilled continuously at rate_per_minute, holding at most one minute's worth
+class TokenBucket:
+    def __init__(self, rate_per_minute):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = rate_per_minute
+        self.tokens = rate_per_minute
+        self.updated = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            while True:
+                now = loop.time()
+                if self.updated is not None:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return
+                await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+# Concurrent Gemini caller. Requests are admitted by a requests/min and a tokens/min bucket,
+# at most max_concurrency are outstanding, and quota errors are retried with jittered
+# exponential backoff. complete_all() returns the responses in prompt order, with None for
+# prompts that still failed after all retries.
+class GeminiDispatcher:
+    def __init__(self, model, requests_per_minute=60, tokens_per_minute=32000, max_concurrency=4,
+                 retries=5, backoff=2.0, token_counter=estimate_tokens):
+        self.model = model
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.token_counter = token_counter
+        self.retried = 0
+        self.failed = 0
+
+    async def _generate(self, prompt):
+        if hasattr(self.model, 'generate_content_async'):
+            return await self.model.generate_content_async(prompt)
+        return await asyncio.to_thread(self.model.generate_content, prompt)
+
+    async def _complete(self, semaphore, request_bucket, token_bucket, i, total, prompt):
+        tokens = self.token_counter(prompt)
+        for attempt in range(self.retries + 1):
+            await request_bucket.acquire()
+            await token_bucket.acquire(tokens)
+            try:
+                async with semaphore:
+                    print(f'Now processing batch#: {i + 1} of {total}')
+                    return await self._generate(prompt)
+            except Exception as e:
+                if type(e).__name__ not in RETRY_ERRORS or attempt == self.retries:
+                    print(f'Error during API call for batch#: {i + 1}: {e}')
+                    self.failed += 1
+                    return None
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                self.retried += 1
+                print(f'Retrying batch#: {i + 1} in {delay:.1f}s after {type(e).__name__}')
+                await asyncio.sleep(delay)
+
+    async def complete_all_async(self, prompts):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        request_bucket = TokenBucket(self.requests_per_minute)
+        token_bucket = TokenBucket(self.tokens_per_minute)
+        return await asyncio.gather(*(
+            self._complete(semaphore, request_bucket, token_bucket, i, len(prompts), prompt)
+            for i, prompt in enumerate(prompts)
+        ))
+
+    def complete_all(self, prompts):
+        return asyncio.run(self.complete_all_async(list(prompts)))
+
+
+# Labels keyed by review id from a JSON array response such as
+# [{"id": 3, "cleaned_review": "...", "sentiment_category": 1}, ...].
+# Records without a usable id or label are left out.
+def parse_keyed_labels(text, valid_labels=(0, 1)):
+    try:
+        records = json.loads(text[text.index('['):text.rindex(']') + 1])
+    except ValueError:
+        return {}
+    labels = {}
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        try:
+            review_id = int(record.get('id'))
+            label = int(record.get('sentiment_category'))
+        except (TypeError, ValueError):
+            continue
+        if label in valid_labels:
+            labels[review_id] = label
+    return labels
+
+
+# Score texts through ID-keyed prompts. build_prompt receives [(id, text), ...] and
+# read_text turns a response into its text ('' when blocked). Labels are joined back
+# by id, so a dropped or garbled record only affects itself; reviews that are missing
+# after a round are re-queued in smaller batches for up to followup_rounds more rounds.
+# Returns one label per text, None where no label was obtained.
+def score_keyed(dispatcher, texts, build_prompt, read_text, max_batch_tokens=2000, followup_rounds=2):
+    texts = list(texts)
+    labels = {}
+    pending = list(range(len(texts)))
+    calls = 0
+    for round_number in range(followup_rounds + 1):
+        if not pending:
+            break
+        batches = [[pending[j] for j in batch]
+                   for batch in pack_batches([texts[i] for i in pending], max_batch_tokens=max_batch_tokens)]
+        responses = dispatcher.complete_all(build_prompt([(i, texts[i]) for i in batch]) for batch in batches)
+        calls += len(batches)
+        for batch, response in zip(batches, responses):
+            parsed = parse_keyed_labels(read_text(response)) if response is not None else {}
+            for i in batch:
+                if i in parsed:
+                    labels[i] = parsed[i]
+        pending = [i for i in pending if i not in labels]
+        print(f'Gemini round {round_number + 1}: {len(batches)} batch(es), {len(pending)} review(s) still unlabelled')
+        max_batch_tokens = max(1, max_batch_tokens // 2)
+    print(f'Gemini labelled {len(labels)} of {len(texts)} reviews in {calls} call(s)')
+    return [labels.get(i) for i in range(len(texts))]
@@ -0,0 +1,75 @@
+import json
+import time
+from gemini_dispatcher import GeminiDispatcher, pack_batches, estimate_tokens, parse_keyed_labels, score_keyed
+from gemini_stub import StubGenerativeModel
+
+# Exercises GeminiDispatcher against the local stub model. The stub enforces a tight
+# quota (5 calls per half second) so some calls fail with ResourceExhausted and must be
+# retried, and records peak concurrency. Compares against the old sequential loop, which paid
+# API latency plus a fixed 5 s sleep per batch of 25. A second run has the stub block
+# some responses and drop single records, which ID-keyed scoring must re-queue.
+REVIEWS = [
+    f'review {i}: ' + ('great purifier, service was helpful' if i % 3 else 'water leaking and no response from service') * (1 + i % 7)
+    for i in range(400)
+]
+LATENCY = 0.1
+MAX_CONCURRENCY = 4
+BATCH_TOKENS = 1500
+
+
+def prompt_for(indices):
+    return json.dumps([{'id': i, 'cleaned_review': REVIEWS[i], 'sentiment_category': ''} for i in indices])
+
+
+def read_text(response):
+    try:
+        return response.text
+    except ValueError:
+        return ''
+
+
+def main():
+    model = StubGenerativeModel(latency=LATENCY, quota_rpm=5, quota_window=0.5)
+    dispatcher = GeminiDispatcher(model, requests_per_minute=600, tokens_per_minute=10 ** 6,
+                                  max_concurrency=MAX_CONCURRENCY, retries=6, backoff=0.05)
+    batches = pack_batches(REVIEWS, max_batch_tokens=BATCH_TOKENS)
+    prompts = [prompt_for(indices) for indices in batches]
+
+    start = time.perf_counter()
+    responses = dispatcher.complete_all(prompts)
+    elapsed = time.perf_counter() - start
+
+    labels = [label for response in responses for _, label in sorted(parse_keyed_labels(response.text).items())]
+    expected = [model._label(review) for review in REVIEWS]
+    sequential = -(-len(REVIEWS) // 25) * (LATENCY + 5)
+    checks = {
+        'labels returned in review order': labels == expected,
+        'quota errors recovered by retry': model.quota_errors > 0 and dispatcher.failed == 0,
+        f'at most {MAX_CONCURRENCY} calls in flight': model.max_in_flight <= MAX_CONCURRENCY,
+        'calls overlapped': model.max_in_flight > 1,
+        f'batches within {BATCH_TOKENS} tokens': all(
+            len(b) == 1 or sum(estimate_tokens(REVIEWS[i]) for i in b) <= BATCH_TOKENS for b in batches),
+    }
+    print(f'{len(REVIEWS)} reviews in {len(batches)} token-packed batches, {model.quota_errors} quota errors, '
+          f'max {model.max_in_flight} in flight, {elapsed:.2f}s (sequential loop: ~{sequential:.0f}s)')
+
+    lossy_model = StubGenerativeModel(latency=LATENCY, block_rate=0.1, drop_rate=0.05, seed=7)
+    lossy_dispatcher = GeminiDispatcher(lossy_model, requests_per_minute=600, tokens_per_minute=10 ** 6,
+                                        max_concurrency=MAX_CONCURRENCY)
+    keyed_labels = score_keyed(lossy_dispatcher, REVIEWS, lambda records: prompt_for([i for i, _ in records]),
+                               read_text, max_batch_tokens=BATCH_TOKENS, followup_rounds=3)
+    calls = len(lossy_model.call_times)
+    checks.update({
+        'ID-keyed labels joined to the right reviews': all(
+            label is None or label == want for label, want in zip(keyed_labels, expected)),
+        'missing reviews recovered by follow-up batches': keyed_labels.count(None) == 0,
+    })
+    print(f'Lossy stub: {calls} calls for {len(batches)} batches ({calls - len(batches)} follow-up calls)')
+    for name, passed in checks.items():
+        print(f"{'PASS' if passed else 'FAIL'}: {name}")
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
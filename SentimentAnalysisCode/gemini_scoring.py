@@ -0,0 +1,91 @@
+import os
+import json
+import time
+from gemini_dispatcher import GeminiDispatcher, score_keyed
+
+DEFAULT_GEMINI_MODEL = 'gemini-1.0-pro'
+
+# Placeholder; set GOOGLE_API_KEY in the environment
+DEFAULT_API_KEY = 'kAJSFGKFGAJKHSGFASGFGASGF'
+
+# Gemini labels: 1 (Positive) and 0 (Negative)
+SENTIMENT_MAPPING = {0: "Negative", 1: "Positive"}
+
+
+def build_prompt(records):
+    json_data = json.dumps([{'id': review_id, 'cleaned_review': text, 'sentiment_category': ''} for review_id, text in records])
+
+    prompt = f"""
+    You are an expert in linguistic analysis specializing in sentiment classification. Your task is to classify the sentiment of customer reviews into two categories: Positive (label=1) and Negative (label=0).
+
+    Below is a JSON array of customer reviews. Each review has an 'id' and the review text under the key 'cleaned_review'. Your job is to update the 'sentiment_category' field of every review with either 1 (Positive) or 0 (Negative) based on the sentiment expressed in the review.
+
+    Please follow these rules:
+    1. Only return the updated JSON array as output.
+    2. Do not alter the structure or format of the JSON array, and copy every 'id' unchanged.
+    3. If a review violates API policy or contains any content issues, assign it a sentiment of 0 (Negative).
+
+    Reviews are provided between three backticks below:
+
+    ```{json_data}```
+    """
+    return prompt
+
+
+def read_response(response):
+    # Blocked responses have no text; their reviews are re-queued rather than labelled Negative
+    try:
+        return response.text
+    except (AttributeError, ValueError):
+        print("Response blocked or invalid; re-queuing its reviews.")
+        return ''
+
+
+# The Gemini model, or the local stub with GEMINI_STUB=1 (same generate_content interface).
+# google.generativeai is only imported when the real model is used.
+def open_gemini_model(model_name=DEFAULT_GEMINI_MODEL, list_models=False):
+    if os.environ.get('GEMINI_STUB') == '1':
+        from gemini_stub import StubGenerativeModel
+        return StubGenerativeModel()
+
+    import google.generativeai as genai
+    genai.configure(api_key=os.environ.get('GOOGLE_API_KEY', DEFAULT_API_KEY))
+    if list_models:
+        for m in genai.list_models():
+            if 'generateContent' in m.supported_generation_methods:
+                print(m.name)
+    return genai.GenerativeModel(model_name)
+
+
+# Gemini sentiment labelling. Batches are dispatched concurrently (GEMINI_CONCURRENCY at a
+# time) within the account quota (GEMINI_RPM requests/min, GEMINI_TPM tokens/min) and packed
+# to GEMINI_BATCH_TOKENS estimated prompt tokens. Each review carries an id through the
+# prompt and the response; reviews missing from a response are re-queued in smaller batches
+# for up to GEMINI_FOLLOWUP_ROUNDS extra rounds.
+class GeminiScorer:
+    def __init__(self, model_name=DEFAULT_GEMINI_MODEL, model=None):
+        self.model_id = model_name
+        self.model = model if model is not None else open_gemini_model(model_name)
+        self.dispatcher = GeminiDispatcher(
+            self.model,
+            requests_per_minute=int(os.environ.get('GEMINI_RPM', 60)),
+            tokens_per_minute=int(os.environ.get('GEMINI_TPM', 32000)),
+            max_concurrency=int(os.environ.get('GEMINI_CONCURRENCY', 4)),
+        )
+        self.batch_tokens = int(os.environ.get('GEMINI_BATCH_TOKENS', 2000))
+        self.followup_rounds = int(os.environ.get('GEMINI_FOLLOWUP_ROUNDS', 2))
+
+    # One 0/1 label per text; None where no label was obtained
+    def score(self, texts):
+        start = time.perf_counter()
+        labels = score_keyed(self.dispatcher, texts, build_prompt, read_response,
+                             max_batch_tokens=self.batch_tokens, followup_rounds=self.followup_rounds)
+        print(f'Gemini scoring took {time.perf_counter() - start:.1f}s '
+              f'({self.dispatcher.retried} retried, {self.dispatcher.failed} failed calls)')
+        return labels
+
+
+# Labels for every text, sending only reviews without a cached label to Gemini.
+# Unlabelled reviews come back as None and are not cached.
+def score_with_cache(scorer, texts, cache):
+    return cache.score('gemini', scorer.model_id, texts, scorer.score)
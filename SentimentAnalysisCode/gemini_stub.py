@@ -0,0 +1,75 @@
+import re
+import json
+import time
+import random
+import threading
+
+POSITIVE_WORDS = {'good', 'great', 'excellent', 'nice', 'best', 'happy', 'love', 'awesome', 'helpful', 'thanks'}
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+class StubResponse:
+    def __init__(self, text):
+        self._text = text
+        self.candidates = [{'text': text}] if text is not None else []
+
+    # Like the real response, .text raises ValueError when the prompt was blocked
+    @property
+    def text(self):
+        if self._text is None:
+            raise ValueError('Response was blocked')
+        return self._text
+
+
+# Local stand-in for genai.GenerativeModel: generate_content(prompt) sleeps for latency
+# seconds, raises ResourceExhausted once quota_rpm calls were accepted within the last
+# quota_window seconds (a minute by default), and answers the JSON review list embedded
+# in the prompt with 1/0 labels chosen by a keyword rule. Tracks call counts and peak
+# concurrency for the harnesses. block_rate blocks a whole response and drop_rate leaves
+# single records out of an answer, to exercise re-queuing of missing reviews.
+class StubGenerativeModel:
+    def __init__(self, latency=0.2, quota_rpm=None, quota_window=60.0, block_rate=0.0, drop_rate=0.0, seed=0):
+        self.latency = latency
+        self.quota_rpm = quota_rpm
+        self.quota_window = quota_window
+        self.block_rate = block_rate
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.call_times = []
+        self.quota_errors = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def _label(self, review):
+        words = set(re.findall(r'[a-z]+', str(review).lower()))
+        return 1 if words & POSITIVE_WORDS else 0
+
+    def _answer(self, prompt):
+        records = json.loads(prompt[prompt.index('['):prompt.rindex(']') + 1])
+        with self.lock:
+            if self.random.random() < self.block_rate:
+                return None
+            records = [record for record in records if self.random.random() >= self.drop_rate]
+        for record in records:
+            record['sentiment_category'] = self._label(record.get('cleaned_review'))
+        return '```json\n' + json.dumps(records) + '\n```'
+
+    def generate_content(self, prompt):
+        with self.lock:
+            now = time.monotonic()
+            if self.quota_rpm and sum(1 for t in self.call_times if now - t < self.quota_window) >= self.quota_rpm:
+                self.quota_errors += 1
+                raise ResourceExhausted('429 Quota exceeded for requests per minute')
+            self.call_times.append(now)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency)
+            return StubResponse(self._answer(prompt))
+        finally:
+            with self.lock:
+                self.in_flight -= 1
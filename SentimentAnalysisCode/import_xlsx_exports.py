@@ -0,0 +1,25 @@
+import os
+import pandas as pd
+from review_store import open_review_store
+
+# One-time import of the xlsx exports at the repository root into the Parquet review store.
+# All three were produced by the transformer scripts. Re-running is harmless: rows already
+# in the store are skipped by the store's deduplication.
+# The exports carry no review ids, so imported rows are keyed by content hash, while live
+# Play Store and Twitter runs are keyed by review id. The two never dedupe against each
+# other: a review that is both in an export and fetched again by a live run is stored twice.
+repo_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+legacy_exports = [
+    ('amazon_product_reviews_with_sentiment_analysis.xlsx', 'amazon', 'transformer'),
+    ('apple_store_reviews_sentiment_analysis.xlsx', 'appstore', 'transformer'),
+    ('google_playstore_reviews_with_sentiment_analysis.xlsx', 'playstore', 'transformer'),
+]
+
+review_store = open_review_store()
+for file_name, source, backend in legacy_exports:
+    df = pd.read_excel(os.path.join(repo_root, file_name))
+    print(f'Importing {len(df)} rows from {file_name}')
+    review_store.append(df, source, backend)
+
+print(f'Review store at {review_store.path}')
+print(review_store.read(['source', 'backend', 'year']).value_counts().sort_index().to_string())
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import numpy as np
+import onnxruntime as ort
+from onnxruntime.quantization import quantize_dynamic, QuantType
+from transformers import AutoConfig, AutoTokenizer
+from transformer_scoring import TransformerScorer, DEFAULT_MODEL_NAME, DEFAULT_BATCH_SIZE, DEFAULT_MAX_BATCH_TOKENS, DEFAULT_WINDOW_OVERLAP, model_identifier
+
+# Exported and quantized models are cached here, one directory per checkpoint
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'eureka_forbes_sentiment', 'onnx')
+
+
+# Export the checkpoint to ONNX once, apply dynamic int8 quantization and cache the
+# result on disk. Later calls return the cached artifact without importing torch.
+def export_quantized_model(model_name=DEFAULT_MODEL_NAME, cache_dir=DEFAULT_CACHE_DIR):
+    target_dir = os.path.join(cache_dir, model_name.replace('/', '--'))
+    quantized_path = os.path.join(target_dir, 'model.int8.onnx')
+    if os.path.exists(quantized_path):
+        return quantized_path
+
+    import torch
+    from transformers import AutoModelForSequenceClassification
+
+    os.makedirs(target_dir, exist_ok=True)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    sample = tokenizer("the water purifier works well", return_tensors="pt")
+
+    # Build in a scratch directory and move into place, so an interrupted export
+    # never leaves a half-written model in the cache
+    work_dir = tempfile.mkdtemp(dir=target_dir)
+    try:
+        fp32_path = os.path.join(work_dir, 'model.onnx')
+        torch.onnx.export(
+            model,
+            (sample['input_ids'], sample['attention_mask']),
+            fp32_path,
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['logits'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'logits': {0: 'batch'},
+            },
+            opset_version=14,
+        )
+        quantize_dynamic(fp32_path, os.path.join(work_dir, 'model.int8.onnx'), weight_type=QuantType.QInt8)
+        os.replace(os.path.join(work_dir, 'model.int8.onnx'), quantized_path)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    return quantized_path
+
+
+# ONNX Runtime version of TransformerScorer: same batching and the same
+# (scores, labels) output, served by the quantized int8 model
+class OnnxTransformerScorer(TransformerScorer):
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, cache_dir=DEFAULT_CACHE_DIR,
+                 batch_size=DEFAULT_BATCH_SIZE, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, max_length=512,
+                 long_reviews='truncate', window_overlap=DEFAULT_WINDOW_OVERLAP):
+        self._init_scoring(model_name, model_identifier(model_name, runtime='onnx-int8'), None, batch_size,
+                           max_batch_tokens, max_length, long_reviews, window_overlap)
+        self.id2label = AutoConfig.from_pretrained(model_name).id2label
+        self.model_path = export_quantized_model(model_name, cache_dir)
+        self.session = ort.InferenceSession(self.model_path, providers=['CPUExecutionProvider'])
+
+    def _forward_probs(self, encodings, padding):
+        inputs = self.tokenizer.pad(encodings, padding=padding, max_length=self.max_length, return_tensors="np")
+        logits = self.session.run(['logits'], {
+            'input_ids': inputs['input_ids'].astype(np.int64),
+            'attention_mask': inputs['attention_mask'].astype(np.int64),
+        })[0]
+        probs = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    # Single-review entry point with the same (score, label) contract as the
+    # Apple script's analyze_sentiment
+    def analyze_sentiment(self, text):
+        scores, labels = self.score([text])
+        return scores[0].item(), labels[0]
@@ -0,0 +1,123 @@
+import os
+import json
+from datetime import datetime
+from google_play_scraper import Sort, reviews
+
+# Per-app watermarks (newest ingested review) are kept in this JSON file
+DEFAULT_STATE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'eureka_forbes_sentiment', 'playstore_watermarks.json')
+
+# Reviews requested per page, and how many review ids are remembered at the watermark
+DEFAULT_PAGE_SIZE = 200
+WATERMARK_IDS = 50
+
+
+def load_watermarks(path=DEFAULT_STATE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+# Write the watermark file atomically so an interrupted run keeps the previous state
+def save_watermarks(watermarks, path=DEFAULT_STATE_PATH):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(watermarks, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+# Incremental Google Play ingestion. Pages through reviews newest-first with the
+# continuation token and stops at the first review that was already ingested, so a
+# run only downloads what is new since the previous one. The watermark is advanced
+# by commit(), once the caller has stored the delta, and only if paging reached it: a run
+# that stops at max_count first keeps the old watermark, since the reviews between the
+# cap and the watermark were never fetched. With incremental=False the watermark is
+# ignored and pages() simply yields the newest max_count reviews.
+class PlayStoreIngestor:
+    def __init__(self, app_id, state_path=DEFAULT_STATE_PATH, lang='en', country='in',
+                 page_size=DEFAULT_PAGE_SIZE, max_count=5000, incremental=True):
+        self.app_id = app_id
+        self.state_path = state_path
+        self.lang = lang
+        self.country = country
+        self.page_size = page_size
+        self.max_count = max_count
+        self.watermark = load_watermarks(state_path).get(app_id) if incremental else None
+        self.pages_fetched = 0
+        self.newest = []
+        self.truncated = False
+
+    # True once we reach a review at or behind the stored watermark
+    def _is_ingested(self, review):
+        if not self.watermark:
+            return False
+        watermark_at = datetime.fromisoformat(self.watermark['at'])
+        return review['at'] < watermark_at or review['reviewId'] in self.watermark['review_ids']
+
+    # Yield lists of new reviews, one per fetched page, newest first. One review past
+    # max_count is requested to tell whether the cap cut the delta short.
+    def pages(self):
+        token = None
+        fetched = 0
+        while True:
+            remaining = self.max_count - fetched
+            if token is None:
+                page, token = reviews(
+                    self.app_id,
+                    lang=self.lang,
+                    country=self.country,
+                    sort=Sort.NEWEST,
+                    count=min(self.page_size, remaining + 1),
+                )
+            else:
+                page, token = reviews(self.app_id, count=min(self.page_size, remaining + 1),
+                                      continuation_token=token)
+            self.pages_fetched += 1
+
+            new_reviews = []
+            reached_watermark = False
+            capped = False
+            for review in page:
+                if self._is_ingested(review):
+                    reached_watermark = True
+                    break
+                if len(new_reviews) == remaining:
+                    capped = True
+                    break
+                new_reviews.append(review)
+
+            if new_reviews:
+                if not self.newest:
+                    self.newest = new_reviews[:WATERMARK_IDS]
+                fetched += len(new_reviews)
+                yield new_reviews
+
+            if capped and self.watermark:
+                print(f'{self.app_id}: stopped at {self.max_count} reviews before reaching the last run\'s watermark')
+                self.truncated = True
+            if reached_watermark or capped or not page or token is None or token.token is None:
+                break
+
+    # Fetch all new reviews as one list
+    def fetch_new(self):
+        result = [review for page in self.pages() for review in page]
+        print(f'Fetched {len(result)} new reviews for {self.app_id} in {self.pages_fetched} page(s)')
+        return result
+
+    # Persist the newest fetched review as the watermark for the next run
+    def commit(self):
+        if not self.newest:
+            return
+        if self.truncated:
+            print(f'{self.app_id}: fetch was incomplete, watermark not advanced (raise the review count to catch up)')
+            return
+        newest_at = self.newest[0]['at']
+        watermarks = load_watermarks(self.state_path)
+        watermarks[self.app_id] = {
+            'at': newest_at.isoformat(),
+            'review_id': self.newest[0]['reviewId'],
+            'review_ids': [review['reviewId'] for review in self.newest if review['at'] == newest_at],
+        }
+        save_watermarks(watermarks, self.state_path)
+        self.watermark = watermarks[self.app_id]
@@ -0,0 +1,153 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from review_dedup import DuplicateCollapser
+
+# On-disk cache of sentiment results shared by every script and backend
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'eureka_forbes_sentiment', 'results.sqlite')
+DEFAULT_MAX_MB = 256
+
+# SQLite limits the number of bound parameters per statement
+_QUERY_CHUNK = 500
+
+# Backends whose reviews may be collapsed as near-duplicates. VADER scores the output of
+# the VADER cleaner, which has already dropped punctuation and emoticons; the transformer
+# and Gemini read those cues, so only exact duplicates are collapsed for them.
+NEAR_DEDUP_BACKENDS = {'vader'}
+
+
+# Content-addressed result cache keyed by hash(backend, model, cleaned text). Only texts
+# without a cached result reach the scoring function; everything else is read back
+# from SQLite. Least recently used rows are evicted once the payload exceeds max_mb.
+# Texts that do reach the scoring function are first collapsed by the collapser
+# (exact duplicates, plus near-duplicates when enabled), one scored text per group.
+# Results borrowed from a near-duplicate are returned but never cached, so they are
+# not served once near-duplicate collapsing is turned off.
+class SentimentResultCache:
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_mb=DEFAULT_MAX_MB, collapser=None):
+        self.path = path
+        self.collapser = collapser or DuplicateCollapser()
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.cached_rows = 0
+        self.scored_rows = 0
+        self.evicted_rows = 0
+        self.conn = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.conn = sqlite3.connect(path)
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS results ('
+                ' key TEXT PRIMARY KEY, backend TEXT, model TEXT, result TEXT,'
+                ' size INTEGER, last_used REAL)'
+            )
+            self.conn.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+            self.conn.commit()
+
+    @staticmethod
+    def make_key(backend, model, text):
+        return hashlib.sha256(f'{backend}\0{model}\0{text}'.encode('utf-8')).hexdigest()
+
+    # Fetch cached results for a list of keys, refreshing their last-used time
+    def _get_many(self, keys):
+        found = {}
+        now = time.time()
+        for start in range(0, len(keys), _QUERY_CHUNK):
+            chunk = keys[start:start + _QUERY_CHUNK]
+            marks = ','.join('?' * len(chunk))
+            rows = self.conn.execute(f'SELECT key, result FROM results WHERE key IN ({marks})', chunk).fetchall()
+            found.update((key, json.loads(result)) for key, result in rows)
+            self.conn.execute(f'UPDATE results SET last_used = ? WHERE key IN ({marks})', [now, *chunk])
+        return found
+
+    def _put_many(self, backend, model, items):
+        now = time.time()
+        rows = []
+        for key, result in items:
+            payload = json.dumps(result)
+            rows.append((key, backend, model, payload, len(key) + len(payload), now))
+        self.conn.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    # Drop least recently used rows until the cached payload fits the size limit
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+        excess = total - self.max_bytes
+        if excess <= 0:
+            return
+        freed = 0
+        doomed = []
+        for key, size in self.conn.execute('SELECT key, size FROM results ORDER BY last_used'):
+            doomed.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        self.conn.executemany('DELETE FROM results WHERE key = ?', doomed)
+        self.evicted_rows += len(doomed)
+
+    # Return one result per text, in input order. score_fn receives the list of texts
+    # that are not cached yet (one per duplicate group) and must return one
+    # JSON-serializable result per text; None results are returned but not cached.
+    # Non-string entries (e.g. NaN reviews) are always passed to score_fn.
+    def score(self, backend, model, texts, score_fn):
+        texts = list(texts)
+        if self.conn is None:
+            self.scored_rows += len(texts)
+            return self.collapser.score(texts, score_fn, allow_near=backend in NEAR_DEDUP_BACKENDS)
+
+        keys = [self.make_key(backend, model, text) if isinstance(text, str) else None for text in texts]
+        found = self._get_many(sorted({key for key in keys if key is not None}))
+
+        missing = [i for i, key in enumerate(keys) if key is None or key not in found]
+        fresh = {}
+        if missing:
+            results, exact = self.collapser.score_groups([texts[i] for i in missing], score_fn,
+                                                         allow_near=backend in NEAR_DEDUP_BACKENDS)
+            fresh = dict(zip(missing, results))
+            self._put_many(backend, model, [(keys[i], result) for i, result, own in zip(missing, results, exact)
+                                            if keys[i] is not None and result is not None and own])
+            self._evict()
+        self.conn.commit()
+
+        self.cached_rows += len(texts) - len(missing)
+        self.scored_rows += len(missing)
+        return [fresh[i] if i in fresh else found[key] for i, key in enumerate(keys)]
+
+    def stats(self):
+        stats = {
+            'cached_rows': self.cached_rows,
+            'newly_scored_rows': self.scored_rows,
+            'evicted_rows': self.evicted_rows,
+        }
+        if self.conn is not None:
+            count, size = self.conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+            stats.update({'entries': count, 'size_mb': round(size / 1024 / 1024, 2), 'max_mb': round(self.max_bytes / 1024 / 1024, 2)})
+        return stats
+
+    # Print how many rows of this run came from the cache and how many were scored
+    def report(self):
+        stats = self.stats()
+        total = stats['cached_rows'] + stats['newly_scored_rows']
+        share = stats['cached_rows'] / total if total else 0.0
+        print(f"Result cache: {stats['cached_rows']} cached, {stats['newly_scored_rows']} newly scored "
+              f"({share:.1%} from cache), {stats['evicted_rows']} evicted")
+        if 'entries' in stats:
+            print(f"Result cache size: {stats['entries']} entries, {stats['size_mb']} MB of {stats['max_mb']} MB")
+        self.collapser.report()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+# Open the cache configured for this run: SENTIMENT_CACHE sets the SQLite file
+# ('off' disables caching), SENTIMENT_CACHE_MAX_MB the eviction threshold and
+# SENTIMENT_NEAR_DEDUP=1 also collapses near-duplicate reviews before VADER scoring
+def open_result_cache():
+    path = os.environ.get('SENTIMENT_CACHE', DEFAULT_CACHE_PATH)
+    if path.lower() == 'off':
+        path = None
+    collapser = DuplicateCollapser(near=os.environ.get('SENTIMENT_NEAR_DEDUP') == '1')
+    return SentimentResultCache(path, max_mb=float(os.environ.get('SENTIMENT_CACHE_MAX_MB', DEFAULT_MAX_MB)),
+                                collapser=collapser)
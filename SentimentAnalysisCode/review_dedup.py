@@ -0,0 +1,131 @@
+import re
+import hashlib
+import numpy as np
+
+# SimHash fingerprints are 64 bits, split into bands of 16 bits for candidate lookup;
+# two fingerprints within 3 bits of each other always share at least one band
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+DEFAULT_MAX_DISTANCE = 3
+
+# Texts shorter than this many tokens only collapse on their normalized form
+MIN_SIMHASH_TOKENS = 4
+
+# Near-duplicates must agree on these words, so "good" never absorbs "not good"
+NEGATIONS = {'no', 'not', 'nor', 'never', 'none', 'nothing', 'dont', 'doesnt', 'didnt', 'isnt',
+             'wasnt', 'arent', 'werent', 'cant', 'cannot', 'couldnt', 'wont', 'wouldnt', 'without'}
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_BIT_WEIGHTS = np.uint64(1) << np.arange(SIMHASH_BITS, dtype=np.uint64)
+
+
+def _feature_hashes(tokens):
+    features = tokens + [f'{a} {b}' for a, b in zip(tokens, tokens[1:])]
+    return np.array([int.from_bytes(hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest(), 'little')
+                     for f in features], dtype=np.uint64)
+
+
+def simhash(tokens):
+    hashes = _feature_hashes(tokens)
+    bits = (hashes[:, None] >> np.arange(SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(hashes)
+    return int(_BIT_WEIGHTS[votes > 0].sum())
+
+
+# Groups texts before scoring so each distinct text is scored once. Exact duplicates
+# collapse on the text itself; with near=True, texts that match after lowercasing and
+# stripping punctuation collapse too, as do longer texts whose SimHash fingerprints are
+# within max_distance bits and that use the same negation words. Each group is scored
+# through its first member and the result is fanned out to every member. Near-duplicate
+# keys ignore punctuation and emoticons ("good :)" and "good :(" match), so callers pass
+# allow_near=False for backends that read those cues (see result_cache.py).
+class DuplicateCollapser:
+    def __init__(self, near=False, max_distance=DEFAULT_MAX_DISTANCE):
+        self.near = near
+        self.max_distance = max_distance
+        self.rows = 0
+        self.scored = 0
+        self.near_merged = 0
+
+    # Representative position for every text (non-string entries are never grouped)
+    def group(self, texts, allow_near=True):
+        near = self.near and allow_near
+        exact = {}
+        normalized = {}
+        bands = [{} for _ in range(SIMHASH_BANDS)]
+        band_width = SIMHASH_BITS // SIMHASH_BANDS
+        band_mask = (1 << band_width) - 1
+        representative = []
+        for i, text in enumerate(texts):
+            if not isinstance(text, str):
+                representative.append(i)
+                continue
+            if text in exact:
+                representative.append(exact[text])
+                continue
+            exact[text] = i
+            if not near:
+                representative.append(i)
+                continue
+
+            tokens = _TOKEN.findall(text.lower())
+            key = ' '.join(tokens)
+            if key in normalized:
+                exact[text] = normalized[key]
+                representative.append(normalized[key])
+                self.near_merged += 1
+                continue
+            normalized[key] = i
+            representative.append(i)
+            if len(tokens) < MIN_SIMHASH_TOKENS:
+                continue
+
+            fingerprint = simhash(tokens)
+            negations = NEGATIONS.intersection(tokens)
+            match = None
+            for band in range(SIMHASH_BANDS):
+                for j, other, other_negations in bands[band].get((fingerprint >> (band * band_width)) & band_mask, ()):
+                    if bin(fingerprint ^ other).count('1') <= self.max_distance and other_negations == negations:
+                        match = j
+                        break
+                if match is not None:
+                    break
+            if match is not None:
+                exact[text] = normalized[key] = representative[i] = match
+                self.near_merged += 1
+                continue
+            for band in range(SIMHASH_BANDS):
+                bands[band].setdefault((fingerprint >> (band * band_width)) & band_mask, []).append(
+                    (i, fingerprint, negations))
+        return representative
+
+    # Score each group once through score_fn (a list of texts -> a list of results)
+    # and return one result per text, in input order
+    def score(self, texts, score_fn, allow_near=True):
+        return self.score_groups(texts, score_fn, allow_near)[0]
+
+    # Like score(), also returning per text whether its result is exact: True when the
+    # text itself (or an identical copy) was scored, False when it was borrowed from a
+    # near-duplicate
+    def score_groups(self, texts, score_fn, allow_near=True):
+        texts = list(texts)
+        representative = self.group(texts, allow_near)
+        positions = sorted(set(representative))
+        results = dict(zip(positions, score_fn([texts[i] for i in positions])))
+        self.rows += len(texts)
+        self.scored += len(positions)
+        exact = [i == j or texts[i] == texts[j] for i, j in enumerate(representative)]
+        return [results[i] for i in representative], exact
+
+    def stats(self):
+        return {
+            'rows': self.rows,
+            'scored': self.scored,
+            'near_merged': self.near_merged,
+            'compression_ratio': round(self.rows / self.scored, 2) if self.scored else 1.0,
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f"Duplicate collapsing: {stats['rows']} reviews scored as {stats['scored']} "
+              f"({stats['compression_ratio']}x compression, {stats['near_merged']} near-duplicates merged)")
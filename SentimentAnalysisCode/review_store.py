@@ -0,0 +1,197 @@
+import os
+import ast
+import uuid
+import hashlib
+from datetime import datetime
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Parquet dataset holding every scored review, partitioned source=/backend=/year=
+DEFAULT_STORE_PATH = os.path.join(os.getcwd(), 'sentiment_store')
+
+PARTITION_COLUMNS = ['source', 'backend', 'year']
+
+# Column layout shared by all sources; per-source column names are mapped onto it
+SCHEMA = pa.schema([
+    ('source', pa.string()),
+    ('backend', pa.string()),
+    ('year', pa.int32()),
+    ('review_key', pa.string()),
+    ('review_id', pa.string()),
+    ('content_hash', pa.string()),
+    ('product_id', pa.string()),
+    ('product_name', pa.string()),
+    ('date', pa.timestamp('us')),
+    ('rating', pa.float64()),
+    ('review', pa.string()),
+    ('cleaned_review', pa.string()),
+    ('sentiment_score', pa.float64()),
+    ('sentiment_label', pa.string()),
+    ('sentiment_category', pa.string()),
+    ('model', pa.string()),
+    ('ingested_at', pa.timestamp('us')),
+])
+
+# Script column names -> store column names
+COLUMN_ALIASES = {
+    'asin': 'product_id',
+    'body': 'review',
+    'cleaned_body': 'cleaned_review',
+    'app_rating': 'rating',
+    'sentiment': 'sentiment_score',
+    'reviewId': 'review_id',
+}
+
+# Date formats written by the scripts (Amazon: DD-MM-YYYY, app stores: DD/MM/YY)
+DATE_FORMATS = ['%d-%m-%Y', '%d/%m/%y']
+
+
+def _parse_dates(dates):
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    parsed = pd.Series(pd.NaT, index=dates.index, dtype='datetime64[us]')
+    for date_format in DATE_FORMATS:
+        parsed = parsed.fillna(pd.to_datetime(dates, format=date_format, errors='coerce'))
+    return parsed
+
+
+# Amazon Transformer rows carry {'label': ..., 'score': ...} (a string once read back from a file)
+def _split_sentiment_result(results):
+    results = results.apply(lambda r: ast.literal_eval(r) if isinstance(r, str) else r)
+    scores = results.apply(lambda r: r.get('score') if isinstance(r, dict) else None)
+    labels = results.apply(lambda r: r.get('label') if isinstance(r, dict) else None)
+    return scores, labels
+
+
+def content_hash(source, product_id, date, rating, review):
+    return hashlib.sha256(f'{source}\0{product_id}\0{date}\0{rating}\0{review}'.encode('utf-8')).hexdigest()
+
+
+# Columnar output store. append() maps a script's DataFrame onto SCHEMA, drops reviews
+# already stored for the same source and backend (by review id when the source has one,
+# otherwise by a hash of product, date, rating and review text) and writes the rest as one new
+# Parquet file per partition. read() returns column-pruned, partition-filtered DataFrames.
+# Rows without an id that share a hash within one DataFrame are different reviews (e.g. two
+# "Good" 5-star reviews on the same day), so the n-th repeat gets the key '<hash>#n'. A run
+# that appends in chunks passes the same repeats dict to every append() (ReviewStoreWriter
+# does), so a repeat in a later chunk is numbered after those in the earlier ones; running
+# the same reviews again yields the same keys and they are skipped as duplicates.
+# The stored keys of a source and backend are read once per ReviewStore and then kept up
+# to date in memory, so concurrent writers to the same store are not seen.
+class ReviewStore:
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._keys = {}
+        if path:
+            os.makedirs(path, exist_ok=True)
+
+    def _to_table(self, df, source, backend, model, repeats=None):
+        df = df.rename(columns=COLUMN_ALIASES)
+        out = pd.DataFrame(index=df.index)
+        out['source'] = source
+        out['backend'] = backend
+        out['date'] = _parse_dates(df['date'])
+        out['year'] = df['year'] if 'year' in df else out['date'].dt.year
+        for column in ['review_id', 'product_id', 'product_name', 'review', 'cleaned_review']:
+            out[column] = df[column].astype('string') if column in df else None
+        out['rating'] = pd.to_numeric(df['rating'], errors='coerce') if 'rating' in df else None
+
+        if 'sentiment_result' in df:
+            out['sentiment_score'], out['sentiment_label'] = _split_sentiment_result(df['sentiment_result'])
+        else:
+            out['sentiment_score'] = pd.to_numeric(df['sentiment_score'], errors='coerce') if 'sentiment_score' in df else None
+            out['sentiment_label'] = None
+        out['sentiment_category'] = df['sentiment_category'].astype('string').str.title()
+        out['model'] = model
+
+        out['content_hash'] = [
+            content_hash(source, product_id, date.date() if pd.notna(date) else '', rating, review)
+            for product_id, date, rating, review in zip(out['product_id'], out['date'], out['rating'], out['review'])
+        ]
+        repeat = out.groupby('content_hash').cumcount()
+        if repeats:
+            repeat += out['content_hash'].map(repeats).fillna(0).astype(int)
+        ordinal_hash = out['content_hash'].where(repeat == 0, out['content_hash'] + '#' + repeat.astype(str))
+        out['review_key'] = out['review_id'].fillna(ordinal_hash)
+        out['ingested_at'] = pd.Timestamp(datetime.now())
+        return pa.Table.from_pandas(out[SCHEMA.names], schema=SCHEMA, preserve_index=False)
+
+    # Review keys already stored for one source and backend (reads only the key column,
+    # on first use; the returned set is updated by append())
+    def stored_keys(self, source, backend):
+        if (source, backend) in self._keys:
+            return self._keys[(source, backend)]
+        partition = os.path.join(self.path, f'source={source}', f'backend={backend}')
+        keys = set()
+        if os.path.isdir(partition):
+            table = ds.dataset(partition, format='parquet', partitioning='hive').to_table(columns=['review_key'])
+            keys = set(table.column('review_key').to_pylist())
+        self._keys[(source, backend)] = keys
+        return keys
+
+    # Append scored reviews; returns the number of new rows written. repeats counts the
+    # content hashes of earlier appends of the same run and is updated in place.
+    def append(self, df, source, backend, model=None, repeats=None):
+        if not self.path or df.empty:
+            return 0
+        table = self._to_table(df, source, backend, model, repeats)
+        if repeats is not None:
+            for row_hash in table.column('content_hash').to_pylist():
+                repeats[row_hash] = repeats.get(row_hash, 0) + 1
+        keys = table.column('review_key').to_pylist()
+        stored = self.stored_keys(source, backend)
+        keep = []
+        seen = set()
+        for i, key in enumerate(keys):
+            if key not in stored and key not in seen:
+                seen.add(key)
+                keep.append(i)
+        if keep:
+            pq.write_to_dataset(
+                table.take(keep),
+                self.path,
+                partition_cols=PARTITION_COLUMNS,
+                basename_template=f'part-{datetime.now():%Y%m%d_%H%M%S}-{uuid.uuid4().hex[:8]}-{{i}}.parquet',
+            )
+            stored.update(seen)
+        print(f'Review store: {len(keep)} new, {len(keys) - len(keep)} duplicate {source}/{backend} reviews')
+        return len(keep)
+
+    def dataset(self):
+        return ds.dataset(self.path, format='parquet', partitioning='hive')
+
+    # Read selected columns, e.g. read(['date', 'sentiment_category'], source='amazon', year=2024)
+    def read(self, columns=None, **partitions):
+        if not self.path or not os.path.isdir(self.path):
+            return pd.DataFrame(columns=columns or SCHEMA.names)
+        condition = None
+        for name, value in partitions.items():
+            clause = ds.field(name) == value
+            condition = clause if condition is None else condition & clause
+        return self.dataset().to_table(columns=columns, filter=condition).to_pandas()
+
+
+# Writer for run_streaming_pipeline that appends each chunk to the store
+class ReviewStoreWriter:
+    def __init__(self, store, source, backend, model=None):
+        self.store = store
+        self.source = source
+        self.backend = backend
+        self.model = model
+        self.rows = 0
+        self.repeats = {}
+
+    def write(self, df):
+        self.rows += self.store.append(df, self.source, self.backend, self.model, repeats=self.repeats)
+
+    def close(self):
+        pass
+
+
+def open_review_store():
+    path = os.environ.get('SENTIMENT_STORE', DEFAULT_STORE_PATH)
+    if path.lower() == 'off':
+        path = None
+    return ReviewStore(path)
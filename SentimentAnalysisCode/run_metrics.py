@@ -0,0 +1,235 @@
+import os
+import json
+import time
+import atexit
+import cProfile
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from streaming_pipeline import peak_rss_mb
+
+# Stage names used by the scripts: fetch (Splash, App Store, Play Store, Twitter),
+# parse (Amazon review pages), clean, load_model, score and write (store and CSV).
+# Stages may nest: Amazon clean_text runs inside parse. Stage CPU time is the CPU time of
+# the thread running the stage, so parse/clean in the streaming prefetch thread are not
+# charged to the score stage running alongside them on the main thread. It leaves out
+# threads the stage hands work to, torch's intra-op threads above all, so a transformer
+# score stage shows a fraction of the CPU it used. Stages on the main thread therefore also
+# record the process CPU time (all threads) spent while they ran, which includes those
+# threads but also whatever else ran alongside, e.g. the prefetch thread.
+DEFAULT_PROFILE_DIR = 'profiles'
+
+
+class StageStats:
+    def __init__(self):
+        self.calls = 0
+        self.items = 0
+        self.wall_seconds = 0.0
+        self.cpu_seconds = 0.0
+        self.process_cpu_seconds = 0.0
+
+    def as_dict(self):
+        return {
+            'calls': self.calls,
+            'items': self.items,
+            'wall_seconds': round(self.wall_seconds, 6),
+            'cpu_seconds': round(self.cpu_seconds, 6),
+            'process_cpu_seconds': round(self.process_cpu_seconds, 6),
+            'items_per_sec': round(self.items / self.wall_seconds, 1) if self.wall_seconds else None,
+        }
+
+
+# hits/misses of a cache from its stats(): BoundedCache style (hits, misses), the result
+# cache (cached_rows, newly_scored_rows) or TextNormalizer.cache_stats() (one dict per cache)
+def _cache_entries(name, stats):
+    if 'hits' in stats:
+        return {name: (stats['hits'], stats['misses'])}
+    if 'cached_rows' in stats:
+        return {name: (stats['cached_rows'], stats['newly_scored_rows'])}
+    entries = {}
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            entries.update(_cache_entries(f'{name}.{key}', value))
+    return entries
+
+
+# Per-run instrumentation: wall and CPU time, call and item counts per stage, named
+# counters, cache hit rates and peak RSS. finish() prints a summary and writes the JSON
+# run report and the Prometheus text file when configured. Stages listed in
+# profile_stages also run under cProfile, one .prof file per stage in profile_dir
+# (main thread only: cProfile and the nesting flag are per-thread state).
+class RunMetrics:
+    def __init__(self, run_name, report_path=None, prometheus_path=None, profile_stages=(), profile_dir=DEFAULT_PROFILE_DIR):
+        self.run_name = run_name
+        self.report_path = report_path
+        self.prometheus_path = prometheus_path
+        self.profile_stages = set(profile_stages)
+        self.profile_dir = profile_dir
+        self.started_at = datetime.now()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.stages = {}
+        self.counters = {}
+        self.caches = {}
+        self.profiles = {}
+        self._profiling = False
+        self._lock = threading.Lock()
+        self.finished = False
+        if self.profile_stages:
+            print(f"Profiling stages {', '.join(sorted(self.profile_stages))} (pid {os.getpid()})")
+
+    def _profile(self, name):
+        if self._profiling or not ({name, 'all'} & self.profile_stages):
+            return None
+        if threading.current_thread() is not threading.main_thread():
+            return None
+        return self.profiles.setdefault(name, cProfile.Profile())
+
+    @contextmanager
+    def stage(self, name, items=0):
+        with self._lock:
+            stats = self.stages.setdefault(name, StageStats())
+        profile = self._profile(name)
+        if profile is not None:
+            self._profiling = True
+            profile.enable()
+        main_thread = threading.current_thread() is threading.main_thread()
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        start_process_cpu = time.process_time()
+        try:
+            yield stats
+        finally:
+            with self._lock:
+                stats.wall_seconds += time.perf_counter() - start_wall
+                stats.cpu_seconds += time.thread_time() - start_cpu
+                if main_thread:
+                    stats.process_cpu_seconds += time.process_time() - start_process_cpu
+                stats.calls += 1
+                stats.items += items
+            if profile is not None:
+                profile.disable()
+                self._profiling = False
+
+    # Wrap a per-item function (clean_text, get_reviews) so every call is timed as one item
+    def timed(self, name, fn):
+        def timed_fn(*args, **kwargs):
+            with self.stage(name, items=1):
+                return fn(*args, **kwargs)
+        return timed_fn
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    # Register a cache whose stats() are read when the run finishes
+    def watch_cache(self, name, stats_fn):
+        self.caches[name] = stats_fn
+
+    def cache_rates(self):
+        rates = {}
+        for name, stats_fn in self.caches.items():
+            for entry, (hits, misses) in _cache_entries(name, stats_fn()).items():
+                lookups = hits + misses
+                rates[entry] = {'hits': hits, 'misses': misses, 'hit_rate': round(hits / lookups, 4) if lookups else 0.0}
+        return rates
+
+    def report(self):
+        return {
+            'run': self.run_name,
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'pid': os.getpid(),
+            'wall_seconds': round(time.perf_counter() - self.start_wall, 6),
+            'cpu_seconds': round(time.process_time() - self.start_cpu, 6),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+            'stages': {name: stats.as_dict() for name, stats in self.stages.items()},
+            'counters': dict(self.counters),
+            'caches': self.cache_rates(),
+        }
+
+    # Prometheus text exposition format, e.g. for the node_exporter textfile collector
+    def prometheus_text(self, report):
+        run = f'run="{self.run_name}"'
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            lines.extend(f'{name}{{{labels}}} {value}' for labels, value in samples)
+
+        stages = report['stages']
+        metric('sentiment_stage_wall_seconds', 'gauge', 'Wall-clock time spent in a pipeline stage.',
+               [(f'{run},stage="{s}"', v['wall_seconds']) for s, v in stages.items()])
+        metric('sentiment_stage_cpu_seconds', 'gauge',
+               'CPU time of the thread running a pipeline stage, without threads it hands work to (e.g. torch intra-op threads).',
+               [(f'{run},stage="{s}"', v['cpu_seconds']) for s, v in stages.items()])
+        metric('sentiment_stage_process_cpu_seconds', 'gauge',
+               'Process CPU time, all threads, while a pipeline stage ran on the main thread.',
+               [(f'{run},stage="{s}"', v['process_cpu_seconds']) for s, v in stages.items()])
+        metric('sentiment_stage_calls_total', 'counter', 'Times a pipeline stage was entered.',
+               [(f'{run},stage="{s}"', v['calls']) for s, v in stages.items()])
+        metric('sentiment_stage_items_total', 'counter', 'Items processed by a pipeline stage.',
+               [(f'{run},stage="{s}"', v['items']) for s, v in stages.items()])
+        metric('sentiment_items_total', 'counter', 'Named item counters of the run.',
+               [(f'{run},counter="{c}"', v) for c, v in report['counters'].items()])
+        metric('sentiment_cache_hit_ratio', 'gauge', 'Share of cache lookups that were hits.',
+               [(f'{run},cache="{c}"', v['hit_rate']) for c, v in report['caches'].items()])
+        metric('sentiment_run_wall_seconds', 'gauge', 'Wall-clock time of the run.', [(run, report['wall_seconds'])])
+        metric('sentiment_run_cpu_seconds', 'gauge', 'Process CPU time of the run.', [(run, report['cpu_seconds'])])
+        metric('sentiment_peak_rss_bytes', 'gauge', 'Peak resident set size of the run.',
+               [(run, int(report['peak_rss_mb'] * 1024 * 1024))])
+        return '\n'.join(lines) + '\n'
+
+    def summary(self, report):
+        print(f"Run metrics ({self.run_name}): {report['wall_seconds']:.2f}s wall, {report['cpu_seconds']:.2f}s CPU, "
+              f"peak RSS {report['peak_rss_mb']} MB")
+        for name, stats in report['stages'].items():
+            rate = f", {stats['items_per_sec']}/s" if stats['items_per_sec'] else ''
+            print(f"  {name:<12} {stats['wall_seconds']:9.3f}s wall {stats['cpu_seconds']:9.3f}s CPU "
+                  f"{stats['process_cpu_seconds']:9.3f}s process CPU {stats['calls']:7d} calls {stats['items']:7d} items{rate}")
+        for name, value in report['counters'].items():
+            print(f'  {name:<12} {value}')
+        for name, stats in report['caches'].items():
+            print(f"  {name:<12} {stats['hit_rate']:.1%} hit rate ({stats['hits']} hits, {stats['misses']} misses)")
+
+    # Called at exit, so runs that stop early (streaming mode, no new reviews) still report
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        report = self.report()
+        self.summary(report)
+        if self.report_path:
+            _write_atomic(self.report_path, json.dumps(report, indent=2))
+            print(f'Run report saved to {self.report_path}')
+        if self.prometheus_path:
+            _write_atomic(self.prometheus_path, self.prometheus_text(report))
+        if self.profiles:
+            os.makedirs(self.profile_dir, exist_ok=True)
+            for name, profile in self.profiles.items():
+                path = os.path.join(self.profile_dir, f"{self.run_name}_{name}_{self.started_at.strftime('%Y%m%d_%H%M%S')}.prof")
+                profile.dump_stats(path)
+                print(f'cProfile stats for {name} saved to {path}')
+
+
+def _write_atomic(path, text):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+# Metrics for this run, reported at exit: SENTIMENT_METRICS sets the JSON run report
+# (a .json file, or a directory for one timestamped report per run), SENTIMENT_METRICS_PROM
+# a Prometheus text file, SENTIMENT_PROFILE the stages to run under cProfile (comma-separated
+# or 'all') and SENTIMENT_PROFILE_DIR where their .prof files go
+def open_run_metrics(run_name):
+    report_path = os.environ.get('SENTIMENT_METRICS')
+    if report_path and not report_path.endswith('.json'):
+        report_path = os.path.join(report_path, f"{run_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    profile_stages = [stage for stage in os.environ.get('SENTIMENT_PROFILE', '').split(',') if stage]
+    metrics = RunMetrics(run_name, report_path=report_path, prometheus_path=os.environ.get('SENTIMENT_METRICS_PROM'),
+                         profile_stages=profile_stages, profile_dir=os.environ.get('SENTIMENT_PROFILE_DIR', DEFAULT_PROFILE_DIR))
+    atexit.register(metrics.finish)
+    return metrics
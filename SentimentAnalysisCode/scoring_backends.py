@@ -0,0 +1,86 @@
+import os
+import numpy as np
+
+# Scoring backends shared by sentiment_cli and the scoring daemon. Each backend's
+# libraries are imported only when that backend is loaded.
+BACKEND_NAMES = ['vader', 'transformer', 'gemini', 'cascade']
+
+
+def _load_vader():
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer
+    from vader_scoring import VaderBulkScorer
+    lexicon_file = os.environ.get('VADER_LEXICON')
+    analyzer = SentimentIntensityAnalyzer(lexicon_file=lexicon_file) if lexicon_file else SentimentIntensityAnalyzer()
+    return VaderBulkScorer(analyzer=analyzer)
+
+
+# Same runtime selection as the transformer scripts: SENTIMENT_BATCH_SIZE,
+# SENTIMENT_WORKERS > 1 for a process pool, TRANSFORMER_RUNTIME=onnx for the int8 export,
+# TRANSFORMER_LONG_REVIEWS=window for sliding-window scoring of long reviews
+def _load_transformer():
+    from transformer_scoring import TransformerScorer, long_review_options
+    batch_size = int(os.environ.get('SENTIMENT_BATCH_SIZE', 32))
+    num_workers = int(os.environ.get('SENTIMENT_WORKERS', 1))
+    if os.environ.get('TRANSFORMER_RUNTIME', 'torch') == 'onnx':
+        from onnx_backend import OnnxTransformerScorer
+        return OnnxTransformerScorer(batch_size=batch_size, **long_review_options())
+    if num_workers > 1:
+        from transformer_pool import ParallelTransformerScorer
+        return ParallelTransformerScorer(num_workers, batch_size=batch_size, **long_review_options())
+    return TransformerScorer(batch_size=batch_size, **long_review_options())
+
+
+def _load_gemini():
+    from gemini_scoring import GeminiScorer, DEFAULT_GEMINI_MODEL
+    return GeminiScorer(os.environ.get('GEMINI_MODEL', DEFAULT_GEMINI_MODEL))
+
+
+# VADER first, the transformer only for uncertain reviews (see cascade_scoring.py)
+def _load_cascade():
+    from cascade_scoring import open_cascade_scorer
+    return open_cascade_scorer(_load_vader(), _load_transformer())
+
+
+_LOADERS = {
+    'vader': _load_vader,
+    'transformer': _load_transformer,
+    'gemini': _load_gemini,
+    'cascade': _load_cascade,
+}
+
+
+def load_scorer(backend):
+    return _LOADERS[backend]()
+
+
+# Transformer labels to the categories of analyze_sentiment in the transformer scripts
+def transformer_category(label):
+    if label == 'POSITIVE':
+        return 'Positive'
+    if label == 'NEGATIVE':
+        return 'Negative'
+    return 'Neutral'
+
+
+# Score texts with a loaded scorer. Returns (scores, labels, categories) lists: VADER
+# compound scores, transformer (probability, label), Gemini 0/1 labels (None when
+# Gemini gave no label) or cascade (signed score, 'vader'/'transformer' as the deciding
+# backend), with categories as the scripts' categorize functions produce them. Star
+# ratings, when given, let the cascade escalate reviews VADER scores against their rating.
+# With a result cache only uncached texts reach the scorer.
+def score_texts(backend, scorer, texts, cache=None, ratings=None):
+    texts = list(texts)
+    if backend == 'cascade':
+        scores, categories, scored_by = scorer.score(texts, ratings=ratings, cache=cache)
+        return scores.tolist(), scored_by, categories
+    if backend == 'vader':
+        from vader_scoring import categorize_sentiment_array, score_with_cache
+        scores = score_with_cache(scorer, texts, cache) if cache is not None else scorer.score_many(texts)
+        return scores.tolist(), [None] * len(texts), categorize_sentiment_array(scores).tolist()
+    if backend == 'transformer':
+        from transformer_scoring import score_with_cache
+        scores, labels = score_with_cache(scorer, texts, cache) if cache is not None else scorer.score(texts)
+        return np.asarray(scores).tolist(), list(labels), [transformer_category(label) for label in labels]
+    from gemini_scoring import score_with_cache, SENTIMENT_MAPPING
+    labels = score_with_cache(scorer, texts, cache) if cache is not None else scorer.score(texts)
+    return list(labels), list(labels), [SENTIMENT_MAPPING.get(label) for label in labels]
@@ -0,0 +1,234 @@
+import json
+import time
+import argparse
+import threading
+from collections import deque
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit, parse_qs, quote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import numpy as np
+from scoring_backends import BACKEND_NAMES, load_scorer, score_texts
+
+# Long-lived local scoring service. Each backend is loaded once, on first use or at
+# startup with --preload, and stays warm between requests. Start it with
+#   python scoring_daemon.py --port 8765 --preload vader,transformer
+# and point the scripts at it with SENTIMENT_DAEMON_URL=http://127.0.0.1:8765.
+#
+#   POST /score  {"backend": "vader", "texts": [...]}  ("ratings": [...] optional, for the cascade)
+#     -> {"model_id": ..., "scores": [...], "labels": [...], "categories": [...]}
+#   GET  /model?backend=vader  -> {"model_id": ...}  (loads the backend, not counted in /stats)
+#   GET  /stats  -> request count and latency percentiles (ms) per backend
+# texts may hold null for missing reviews: the transformer labels them Neutral like the
+# local scorer, the other backends score them as empty text like the scripts' cleaners.
+DEFAULT_PORT = 8765
+
+LATENCY_PERCENTILES = [50, 90, 99]
+
+# Latencies kept per backend for the percentiles in /stats (the most recent requests)
+LATENCY_WINDOW = 10000
+
+
+def latency_summary(latencies, requests=None):
+    if not latencies:
+        return {'requests': requests or 0}
+    values = np.percentile(np.asarray(latencies) * 1000, LATENCY_PERCENTILES)
+    summary = {'requests': len(latencies) if requests is None else requests}
+    summary.update({f'p{p}_ms': round(float(v), 2) for p, v in zip(LATENCY_PERCENTILES, values)})
+    return summary
+
+
+class ScoringService:
+    def __init__(self):
+        self.scorers = {}
+        self.locks = {backend: threading.Lock() for backend in BACKEND_NAMES}
+        self.latencies = {backend: deque(maxlen=LATENCY_WINDOW) for backend in BACKEND_NAMES}
+        self.requests = {backend: 0 for backend in BACKEND_NAMES}
+        self.stats_lock = threading.Lock()
+
+    # Load a backend once; requests for one backend are scored one at a time
+    def _scorer(self, backend):
+        if backend not in self.scorers:
+            start = time.perf_counter()
+            self.scorers[backend] = load_scorer(backend)
+            print(f'Loaded {backend} backend in {time.perf_counter() - start:.2f}s')
+        return self.scorers[backend]
+
+    def preload(self, backends):
+        for backend in backends:
+            with self.locks[backend]:
+                self._scorer(backend)
+
+    def model_id(self, backend):
+        with self.locks[backend]:
+            return self._scorer(backend).model_id
+
+    def score(self, backend, texts, ratings=None):
+        if backend != 'transformer':
+            texts = ['' if text is None else text for text in texts]
+        start = time.perf_counter()
+        with self.locks[backend]:
+            scorer = self._scorer(backend)
+            scores, labels, categories = score_texts(backend, scorer, texts, ratings=ratings) if texts else ([], [], [])
+        with self.stats_lock:
+            self.latencies[backend].append(time.perf_counter() - start)
+            self.requests[backend] += 1
+        return {'model_id': scorer.model_id, 'scores': scores, 'labels': labels, 'categories': categories}
+
+    def stats(self):
+        with self.stats_lock:
+            return {backend: latency_summary(list(latencies), self.requests[backend])
+                    for backend, latencies in self.latencies.items()}
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == '/model':
+            backend = parse_qs(url.query).get('backend', [''])[0]
+            if backend not in BACKEND_NAMES:
+                self._reply(400, {'error': f'unknown backend {backend}'})
+                return
+            try:
+                self._reply(200, {'model_id': self.service.model_id(backend)})
+            except Exception as e:
+                self._reply(500, {'error': repr(e)})
+        elif self.path == '/stats':
+            self._reply(200, self.service.stats())
+        elif self.path == '/health':
+            self._reply(200, {'loaded': sorted(self.service.scorers)})
+        else:
+            self._reply(404, {'error': f'unknown path {self.path}'})
+
+    def do_POST(self):
+        if self.path != '/score':
+            self._reply(404, {'error': f'unknown path {self.path}'})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            backend = request['backend']
+            if backend not in BACKEND_NAMES:
+                raise ValueError(f'unknown backend {backend}')
+            texts, ratings = request['texts'], request.get('ratings')
+            if not isinstance(texts, list) or not all(text is None or isinstance(text, str) for text in texts):
+                raise ValueError('texts must be a list of strings (null for a missing review)')
+            if ratings is not None and (not isinstance(ratings, list) or len(ratings) != len(texts)):
+                raise ValueError('ratings must be a list with one entry per text')
+            self._reply(200, self.service.score(backend, texts, ratings))
+        except (KeyError, ValueError) as e:
+            self._reply(400, {'error': str(e)})
+        except Exception as e:
+            self._reply(500, {'error': repr(e)})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(host='127.0.0.1', port=DEFAULT_PORT, preload=()):
+    service = ScoringService()
+    service.preload(preload)
+    handler = type('BoundScoringHandler', (ScoringHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f'Scoring daemon listening on http://{host}:{server.server_address[1]}')
+    return server
+
+
+# Client side: the same interface as the local scorers (model_id plus score_many for VADER,
+# score for the transformer and Gemini), so score_with_cache and the result cache work
+# unchanged and only uncached reviews are sent to the daemon. Records per-request latency.
+class RemoteScorer:
+    def __init__(self, url, backend, timeout=600):
+        self.url = url.rstrip('/')
+        self.backend = backend
+        self.timeout = timeout
+        self.latencies = []
+        with urllib.request.urlopen(f'{self.url}/health', timeout=timeout):
+            pass
+        self._model_id = None
+
+    def request(self, texts):
+        texts = [text if isinstance(text, str) else None for text in texts]
+        body = json.dumps({'backend': self.backend, 'texts': texts}).encode('utf-8')
+        request = urllib.request.Request(f'{self.url}/score', data=body, headers={'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                reply = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f'Scoring daemon error ({self.backend}): {json.loads(e.read()).get("error")}') from None
+        self.latencies.append(time.perf_counter() - start)
+        self._model_id = reply['model_id']
+        return reply
+
+    # The model id keys the client's result cache; /model returns it without a scoring
+    # request, so the lookup stays out of the latency stats on both sides
+    @property
+    def model_id(self):
+        if self._model_id is None:
+            url = f'{self.url}/model?backend={quote(self.backend)}'
+            try:
+                with urllib.request.urlopen(url, timeout=self.timeout) as response:
+                    self._model_id = json.loads(response.read())['model_id']
+            except urllib.error.HTTPError as e:
+                raise RuntimeError(f'Scoring daemon error ({self.backend}): {json.loads(e.read()).get("error")}') from None
+        return self._model_id
+
+    def report(self):
+        print(f'Scoring daemon latency ({self.backend}): {latency_summary(self.latencies)}')
+
+
+class RemoteVaderScorer(RemoteScorer):
+    def score_many(self, texts):
+        return np.asarray(self.request(list(texts))['scores'], dtype=np.float32)
+
+
+class RemoteTransformerScorer(RemoteScorer):
+    def score(self, texts, **score_kwargs):
+        reply = self.request(list(texts))
+        return np.asarray(reply['scores'], dtype=np.float64), reply['labels']
+
+
+class RemoteGeminiScorer(RemoteScorer):
+    def score(self, texts):
+        return self.request(list(texts))['labels']
+
+
+REMOTE_SCORERS = {
+    'vader': RemoteVaderScorer,
+    'transformer': RemoteTransformerScorer,
+    'gemini': RemoteGeminiScorer,
+}
+
+
+def remote_scorer(url, backend):
+    return REMOTE_SCORERS[backend](url, backend)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Local scoring daemon that keeps sentiment backends warm')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--preload', default='', help='comma-separated backends to load at startup')
+    args = parser.parse_args(argv)
+    server = serve(args.host, args.port, [b for b in args.preload.split(',') if b])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(server.RequestHandlerClass.service.stats()))
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+import re
+import argparse
+from lxml import html as lxml_html
+from amazon_parser import parse_review_page
+
+# Prepares a review page saved from amazon.co.in (browser "Save page as", HTML only, or the
+# Splash response) as a parser fixture, with personal data removed:
+#   python scrub_amazon_page.py saved.html fixtures/amazon/saved_B0CW5YZ6VV_1.html --asin B0CW5YZ6VV
+# Fixtures named saved_*.html are real pages; review_page_*.html are synthetic. Both are
+# picked up by benchmark_amazon_parser.py and benchmark_suite.py. The scrubbed page must
+# still parse to the same reviews as the saved one, otherwise nothing is written.
+
+# Reviewer names are replaced with the name Amazon shows for anonymous reviewers
+ANONYMOUS = 'Amazon Customer'
+
+# Signed-in greeting and delivery address in the navigation bar
+_ACCOUNT_IDS = ['nav-link-accountList-nav-line-1', 'glow-ingress-line1', 'glow-ingress-line2']
+
+# Account and session ids inside attribute values (profile links, tracking attributes)
+_ACCOUNT_ID = re.compile(r'amzn1\.account\.[A-Z0-9]+')
+_SESSION_ID = re.compile(r'\b\d{3}-\d{7}-\d{7}\b')
+
+
+def scrub(page_html):
+    document = lxml_html.fromstring(page_html)
+    # Scripts and hidden form fields carry session ids, CSRF tokens and customer ids
+    for node in document.xpath('//script | //noscript | //iframe'):
+        node.drop_tree()
+    for node in document.xpath('//input[@type="hidden"]'):
+        node.set('value', '')
+    for node in document.xpath('//span[contains(@class, "a-profile-name")]'):
+        for child in list(node):
+            node.remove(child)
+        node.text = ANONYMOUS
+    for node in document.xpath('//a[contains(@class, "a-profile") or contains(@href, "/gp/profile/")]'):
+        node.set('href', '#')
+    for node in document.xpath('//div[contains(@class, "a-profile-avatar")]//img'):
+        for attribute in ('src', 'data-src', 'srcset'):
+            if attribute in node.attrib:
+                node.set(attribute, '')
+    for node_id in _ACCOUNT_IDS:
+        for node in document.xpath(f'//*[@id="{node_id}"]'):
+            for child in list(node):
+                node.remove(child)
+            node.text = ''
+    for node in document.iter():
+        if not isinstance(node.tag, str):
+            continue
+        for attribute, value in node.attrib.items():
+            scrubbed = _SESSION_ID.sub('000-0000000-0000000', _ACCOUNT_ID.sub('amzn1.account.SCRUBBED', value))
+            if scrubbed != value:
+                node.set(attribute, scrubbed)
+    return lxml_html.tostring(document, encoding='unicode', doctype='<!DOCTYPE html>')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Remove personal data from a saved Amazon review page')
+    parser.add_argument('source', help='review page saved from amazon.co.in')
+    parser.add_argument('target', help='scrubbed fixture, e.g. fixtures/amazon/saved_<asin>_<page>.html')
+    parser.add_argument('--asin', default='B0CW5YZ6VV')
+    args = parser.parse_args(argv)
+
+    with open(args.source, encoding='utf-8') as f:
+        page_html = f.read()
+    scrubbed = scrub(page_html)
+
+    expected = parse_review_page(page_html, args.asin, str.strip)
+    actual = parse_review_page(scrubbed, args.asin, str.strip)
+    if not expected:
+        parser.error(f'no reviews found in {args.source}')
+    if expected != actual:
+        parser.error('the scrubbed page parses to different reviews; not written')
+
+    with open(args.target, 'w', encoding='utf-8') as f:
+        f.write(scrubbed)
+    print(f'{len(actual)} reviews, scrubbed page saved to {args.target}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+import time
+
+_STARTED = time.perf_counter()
+
+import os
+import re
+import argparse
+import itertools
+from datetime import datetime
+import pandas as pd
+from scoring_backends import BACKEND_NAMES, load_scorer, score_texts
+
+# Single entry point for every source/backend pair:
+#   python -m sentiment_cli --source {amazon,appstore,playstore,twitter} --backend {vader,transformer,gemini,cascade}
+# Nothing heavy is imported up front: scrapers, nltk, torch/transformers and
+# google.generativeai are imported only by the source and backend that need them,
+# and reviews are fetched before the scoring backend is loaded.
+
+AMAZON_ASINS = ['B0CW5YZ6VV', 'B096NTB9XT', 'B0CJTXNYVN', 'B09VS25ZX7', 'B0CJJ2CPXX']
+APPSTORE_APP = ('eureka-forbes-aquaguard', '1463742085')
+PLAYSTORE_APP_ID = 'com.efl.eurekaforbes'
+TWITTER_HANDLE = 'EurekaForbes'
+
+# Default number of reviews (Amazon: pages per ASIN) fetched per source
+DEFAULT_COUNTS = {'amazon': 2, 'appstore': 9000, 'playstore': 5000, 'twitter': 100}
+
+
+# clean_text from the transformer and Gemini scripts
+def simple_clean_text(text):
+    text = text.replace("\n", " ").strip()
+    text = re.sub(r'[^\x00-\x7F]+', ' ', text)
+    text = re.sub(r'\s+', ' ', text)
+    return text
+
+
+def make_cleaner(backend):
+    if backend != 'vader':
+        return simple_clean_text
+    from text_normalizer import TextNormalizer
+    normalizer = TextNormalizer(
+        lemma_cache_size=int(os.environ.get('LEMMA_CACHE_SIZE', 50000)),
+        text_cache_size=int(os.environ.get('TEXT_CACHE_SIZE', 20000)),
+    )
+    return normalizer.normalize
+
+
+# Call throttle() before each page is requested from pages
+def throttled(pages, throttle):
+    pages = iter(pages)
+    while True:
+        if throttle is not None:
+            throttle()
+        try:
+            page = next(pages)
+        except StopIteration:
+            return
+        yield page
+
+
+# Sources: generators of review dicts, already cleaned. The App Store and Play Store also
+# return the ingestor so the watermark can be committed once the reviews are stored.
+# App Store reviews are read page by page, so cleaning starts with the first page.
+# target overrides the Eureka Forbes product, app or handle (Amazon: a list of ASINs,
+# App Store: (app name, app id)), and throttle is called before each page request
+# (see fanout_scheduler.py).
+def fetch_amazon(count, clean_text, incremental, target=None, throttle=None):
+    from amazon_parser import parse_review_page
+    from splash_fetcher import SplashFetcher
+    fetcher = SplashFetcher(
+        max_in_flight=int(os.environ.get('SPLASH_MAX_IN_FLIGHT', 4)),
+        requests_per_second=float(os.environ.get('SPLASH_REQUESTS_PER_SECOND', 2)),
+    )
+    pages = [(asin, x) for asin in (target or AMAZON_ASINS) for x in range(count)]
+    urls = [
+        f'https://www.amazon.co.in/product-reviews/{asin}/ref=cm_cr_arp_d_viewopt_srt?ie=UTF8&reviewerType=all_reviews&pageNumber={x+1}&sortBy=recent'
+        for asin, x in pages
+    ]
+
+    # The fetcher's event loop thread and HTTP session are closed once the reviews are read
+    # (or the generator is dropped), so fan-out runs do not leak one per Amazon job
+    def reviews():
+        try:
+            if throttle is None:
+                for (asin, x), html in zip(pages, fetcher.iter_pages(urls)):
+                    print(f'Getting page: {x + 1} for ASIN: {asin}')
+                    yield from page_reviews(html, asin)
+                return
+            # Throttled: one page at a time, skipping the rest of an ASIN after an empty page
+            exhausted = set()
+            for (asin, x), url in zip(pages, urls):
+                if asin in exhausted:
+                    continue
+                throttle()
+                print(f'Getting page: {x + 1} for ASIN: {asin}')
+                page = page_reviews(fetcher.fetch(url), asin)
+                if not page:
+                    exhausted.add(asin)
+                yield from page
+        finally:
+            fetcher.close()
+
+    def page_reviews(html, asin):
+        page = parse_review_page(html, asin, clean_text)
+        for review in page:
+            review['review'] = review.pop('body')
+            review['cleaned_review'] = review.pop('cleaned_body')
+        return page
+    return reviews(), None
+
+
+def fetch_appstore(count, clean_text, incremental, target=None, throttle=None):
+    from app_store_ingest import AppStoreIngestor
+    app_name, app_id = target or APPSTORE_APP
+    # The ingestor throttles each of its requests itself
+    ingestor = AppStoreIngestor(app_name, app_id, max_count=count, incremental=incremental, throttle=throttle)
+
+    def reviews():
+        for page in ingestor.pages():
+            for review in page:
+                yield {
+                    'year': review['date'].year,
+                    'date': review['date'].strftime('%d/%m/%y'),
+                    'app_rating': review['rating'],
+                    'review': review.get('review'),
+                    'cleaned_review': clean_text(review['review']) if isinstance(review.get('review'), str) else '',
+                }
+    return reviews(), ingestor
+
+
+def fetch_playstore(count, clean_text, incremental, target=None, throttle=None):
+    from play_store_ingest import PlayStoreIngestor
+    ingestor = PlayStoreIngestor(target or PLAYSTORE_APP_ID, max_count=count, incremental=incremental)
+
+    def reviews():
+        for page in throttled(ingestor.pages(), throttle):
+            for review in page:
+                yield {
+                    'review_id': review['reviewId'],
+                    'year': review['at'].year,
+                    'date': review['at'].strftime('%d/%m/%y'),
+                    'app_rating': review['score'],
+                    'review': review['content'],
+                    'cleaned_review': clean_text(review['content'] or ''),
+                }
+    return reviews(), ingestor
+
+
+def fetch_twitter(count, clean_text, incremental, target=None, throttle=None):
+    import tweepy
+    auth = tweepy.OAuthHandler(os.environ.get('TWITTER_CONSUMER_KEY', ''), os.environ.get('TWITTER_CONSUMER_SECRET', ''))
+    auth.set_access_token(os.environ.get('TWITTER_ACCESS_TOKEN', ''), os.environ.get('TWITTER_ACCESS_TOKEN_SECRET', ''))
+    api = tweepy.API(auth)
+
+    def reviews():
+        cursor = tweepy.Cursor(api.user_timeline, screen_name=target or TWITTER_HANDLE, tweet_mode='extended')
+        timeline = (tweet for page in throttled(cursor.pages(), throttle) for tweet in page)
+        for tweet in itertools.islice(timeline, count):
+            yield {
+                'review_id': str(tweet.id),
+                'year': tweet.created_at.year,
+                'date': tweet.created_at.strftime('%d/%m/%y'),
+                'review': tweet.full_text,
+                'cleaned_review': clean_text(tweet.full_text),
+            }
+    return reviews(), None
+
+
+SOURCES = {
+    'amazon': fetch_amazon,
+    'appstore': fetch_appstore,
+    'playstore': fetch_playstore,
+    'twitter': fetch_twitter,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='sentiment_cli', description='Fetch and score Eureka Forbes reviews')
+    parser.add_argument('--source', required=True, choices=sorted(SOURCES))
+    parser.add_argument('--backend', required=True, choices=sorted(BACKEND_NAMES))
+    parser.add_argument('--count', type=int, help='reviews to fetch (Amazon: pages per ASIN)')
+    parser.add_argument('--incremental', action='store_true', help='App Store and Play Store: only reviews since the last run')
+    parser.add_argument('--csv', action='store_true', help='also write a timestamped CSV file')
+    args = parser.parse_args(argv)
+    timings = {'startup': time.perf_counter() - _STARTED}
+
+    from result_cache import open_result_cache
+    from review_store import open_review_store
+    from run_metrics import open_run_metrics
+    run_metrics = open_run_metrics(f'{args.source}_{args.backend}')
+    result_cache = open_result_cache()
+    run_metrics.watch_cache('result_cache', result_cache.stats)
+    review_store = open_review_store()
+
+    clean_text = run_metrics.timed('clean', make_cleaner(args.backend))
+    reviews, ingestor = SOURCES[args.source](args.count or DEFAULT_COUNTS[args.source], clean_text, args.incremental)
+    records = []
+    # fetch includes the cleaning done while reviews are read
+    with run_metrics.stage('fetch') as fetch_stage:
+        for review in reviews:
+            if not records:
+                timings['first review'] = time.perf_counter() - _STARTED
+            records.append(review)
+        fetch_stage.items += len(records)
+    run_metrics.count('reviews', len(records))
+    timings['fetch done'] = time.perf_counter() - _STARTED
+    print(f'Fetched {len(records)} {args.source} reviews')
+
+    unlabelled = 0
+    if records:
+        with run_metrics.stage('load_model'):
+            scorer = load_scorer(args.backend)
+        timings['backend loaded'] = time.perf_counter() - _STARTED
+        df = pd.DataFrame(records)
+        with run_metrics.stage('score', items=len(df)):
+            ratings = df.get('app_rating', df.get('rating'))
+            scores, _, categories = score_texts(args.backend, scorer, df['cleaned_review'], result_cache, ratings=ratings)
+        df['sentiment'], df['sentiment_category'] = scores, categories
+        # Gemini leaves reviews it could not label as None; they are not stored, and the
+        # watermark is not advanced so they are fetched and scored again next run
+        labelled = df['sentiment'].notna()
+        unlabelled = int((~labelled).sum())
+        if unlabelled:
+            print(f'{unlabelled} reviews got no sentiment label and are left for the next run')
+        timings['scored'] = time.perf_counter() - _STARTED
+        result_cache.report()
+        if args.backend == 'cascade':
+            scorer.report()
+
+        print("First 5 Reviews After Sentiment Analysis:")
+        print(df.head(5).to_string(index=False))
+        print("Last 5 Reviews After Sentiment Analysis:")
+        print(df.tail(5).to_string(index=False))
+
+        with run_metrics.stage('write', items=len(df)):
+            review_store.append(df[labelled], args.source, args.backend, model=scorer.model_id)
+            if args.csv or os.environ.get('SENTIMENT_CSV') == '1':
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                path = os.path.join(os.getcwd(), f'{args.source}_reviews_with_{args.backend}_sentiment_{timestamp}.csv')
+                df.to_csv(path, index=False)
+                print(f'Reviews with sentiment analysis saved to {path}')
+    if ingestor is not None and args.incremental and not unlabelled:
+        ingestor.commit()
+
+    timings['total'] = time.perf_counter() - _STARTED
+    print('Timings (seconds since start): ' + ', '.join(f'{name} {value:.2f}' for name, value in timings.items()))
+    run_metrics.finish()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import os
+import glob
+import time
+import argparse
+import duckdb
+from review_store import DEFAULT_STORE_PATH
+
+# Grain of the materialized rollup; every standard report is a GROUP BY over it
+ROLLUP_COLUMNS = ['source', 'backend', 'year', 'product_id', 'product_name', 'rating', 'sentiment_category']
+
+# Standard reports: sentiment share by year, by product (Amazon ASIN) and by star rating
+REPORTS = {
+    'year': ['source', 'backend', 'year'],
+    'product': ['source', 'backend', 'product_id', 'product_name'],
+    'rating': ['source', 'backend', 'rating'],
+}
+
+
+# DuckDB query layer over the Parquet review store. The rollup table holds review counts
+# and score sums per ROLLUP_COLUMNS group; refresh() folds in only the Parquet files added
+# since the last refresh (the store never rewrites a file), so reports stay in milliseconds
+# however large the store grows. The database lives inside the store as _rollups.duckdb,
+# which the store's own dataset reader skips.
+class SentimentQueries:
+    def __init__(self, store_path=DEFAULT_STORE_PATH, db_path=None):
+        self.store_path = os.path.abspath(store_path)
+        self.db_path = db_path or os.path.join(self.store_path, '_rollups.duckdb')
+        os.makedirs(self.store_path, exist_ok=True)
+        self.conn = duckdb.connect(self.db_path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS rollup_files (path VARCHAR PRIMARY KEY)')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS rollup ('
+            ' source VARCHAR, backend VARCHAR, year BIGINT, product_id VARCHAR, product_name VARCHAR,'
+            ' rating DOUBLE, sentiment_category VARCHAR, reviews BIGINT, score_sum DOUBLE)'
+        )
+
+    def _store_files(self):
+        return sorted(glob.glob(os.path.join(self.store_path, 'source=*', '**', '*.parquet'), recursive=True))
+
+    # Fold new store files into the rollup; rebuilds from scratch if files were removed
+    def refresh(self, full=False):
+        files = self._store_files()
+        seen = {row[0] for row in self.conn.execute('SELECT path FROM rollup_files').fetchall()}
+        if full or not seen <= set(files):
+            self.conn.execute('DELETE FROM rollup')
+            self.conn.execute('DELETE FROM rollup_files')
+            seen = set()
+        new_files = [path for path in files if path not in seen]
+        if not new_files:
+            return 0
+
+        group = ', '.join(ROLLUP_COLUMNS)
+        self.conn.execute('BEGIN')
+        self.conn.execute(
+            f'INSERT INTO rollup SELECT {group}, count(*), sum(sentiment_score)'
+            ' FROM read_parquet(?, hive_partitioning = true, union_by_name = true)'
+            f' GROUP BY {group}',
+            [new_files],
+        )
+        # Merge the new partial groups into the existing ones
+        self.conn.execute(
+            f'CREATE OR REPLACE TABLE rollup AS SELECT {group}, sum(reviews)::BIGINT AS reviews,'
+            f' sum(score_sum) AS score_sum FROM rollup GROUP BY {group}'
+        )
+        self.conn.executemany('INSERT INTO rollup_files VALUES (?)', [[path] for path in new_files])
+        self.conn.execute('COMMIT')
+        return len(new_files)
+
+    # Sentiment share per group; source/backend narrow the rows
+    def report(self, name, source=None, backend=None):
+        group = ', '.join(REPORTS[name])
+        where, params = [], []
+        for column, value in [('source', source), ('backend', backend)]:
+            if value:
+                where.append(f'{column} = ?')
+                params.append(value)
+        where = f"WHERE {' AND '.join(where)}" if where else ''
+        return self.conn.execute(
+            f'SELECT {group}, sentiment_category, sum(reviews)::BIGINT AS reviews,'
+            f' round(100.0 * sum(reviews) / sum(sum(reviews)) OVER (PARTITION BY {group}), 2) AS share_pct,'
+            f' round(sum(score_sum) / sum(reviews), 4) AS mean_score'
+            f' FROM rollup {where} GROUP BY {group}, sentiment_category ORDER BY {group}, sentiment_category',
+            params,
+        ).df()
+
+    # Ad hoc SQL against the raw reviews (view `reviews`) or the rollup table
+    def sql(self, query):
+        pattern = os.path.join(self.store_path, 'source=*', '**', '*.parquet')
+        self.conn.execute(
+            'CREATE OR REPLACE TEMP VIEW reviews AS SELECT * FROM'
+            f" read_parquet('{pattern}', hive_partitioning = true, union_by_name = true)"
+        )
+        return self.conn.execute(query).df()
+
+    def close(self):
+        self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sentiment rollups over the Parquet review store')
+    parser.add_argument('--store', default=os.environ.get('SENTIMENT_STORE', DEFAULT_STORE_PATH))
+    commands = parser.add_subparsers(dest='command', required=True)
+    report = commands.add_parser('report', help='standard sentiment share report')
+    report.add_argument('name', choices=sorted(REPORTS))
+    report.add_argument('--source')
+    report.add_argument('--backend')
+    refresh = commands.add_parser('refresh', help='fold new store files into the rollup')
+    refresh.add_argument('--full', action='store_true', help='rebuild the rollup from scratch')
+    sql = commands.add_parser('sql', help='run SQL against the reviews view or the rollup table')
+    sql.add_argument('query')
+    args = parser.parse_args(argv)
+
+    queries = SentimentQueries(args.store)
+    start = time.perf_counter()
+    new_files = queries.refresh(full=getattr(args, 'full', False))
+    refreshed = time.perf_counter()
+    print(f'Rollup refresh: {new_files} new file(s) in {(refreshed - start) * 1000:.1f} ms')
+
+    if args.command == 'report':
+        result = queries.report(args.name, args.source, args.backend)
+    elif args.command == 'sql':
+        result = queries.sql(args.query)
+    else:
+        result = None
+    if result is not None:
+        print(result.to_string(index=False))
+        print(f'{len(result)} row(s) in {(time.perf_counter() - refreshed) * 1000:.1f} ms')
+    queries.close()
+
+
+if __name__ == '__main__':
+    main()
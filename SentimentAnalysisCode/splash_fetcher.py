@@ -0,0 +1,127 @@
+import atexit
+import asyncio
+import random
+import threading
+import itertools
+from collections import deque
+from urllib.parse import urlsplit
+import aiohttp
+
+# Local Splash instance that renders the review pages
+SPLASH_URL = 'http://localhost:8050/render.html'
+
+# Responses worth retrying: rate limiting and transient server/Splash errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# Spaces out request start times per target host
+class HostRateLimiter:
+    def __init__(self, requests_per_second):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._next_start = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, host):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            start = max(now, self._next_start.get(host, now))
+            self._next_start[host] = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+# Concurrent Splash fetcher: one pooled aiohttp session, a bounded number of requests
+# in flight, per-host rate limiting and retries with jittered exponential backoff.
+# The session lives on an event loop in a background thread that is started on first use
+# and reused by every later call, so connections are pooled across windows and calls.
+# fetch_all() returns the page HTML in the same order as the URLs it was given.
+class SplashFetcher:
+    def __init__(self, splash_url=SPLASH_URL, wait=2, max_in_flight=4, requests_per_second=2.0,
+                 retries=3, backoff=1.0, timeout=90):
+        self.splash_url = splash_url
+        self.wait = wait
+        self.max_in_flight = max_in_flight
+        self.requests_per_second = requests_per_second
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    async def _fetch(self, url):
+        host = urlsplit(url).netloc
+        for attempt in range(self.retries + 1):
+            await self._limiter.wait(host)
+            try:
+                async with self._semaphore:
+                    async with self._session.get(self.splash_url, params={'url': url, 'wait': self.wait}) as response:
+                        if response.status not in RETRY_STATUSES:
+                            return await response.text()
+                        error = f'HTTP {response.status}'
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = repr(e)
+
+            if attempt < self.retries:
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                print(f'Retrying {url} in {delay:.1f}s after {error}')
+                await asyncio.sleep(delay)
+
+        # Give up on this page; an empty page yields no reviews instead of aborting the run
+        print(f'Failed to fetch {url} after {self.retries + 1} attempts: {error}')
+        return ''
+
+    async def _open_session(self):
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._limiter = HostRateLimiter(self.requests_per_second)
+        connector = aiohttp.TCPConnector(limit=self.max_in_flight)
+        self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    # Start the background loop and the session on first use
+    def _start(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name='splash-fetcher', daemon=True)
+            thread.start()
+            asyncio.run_coroutine_threadsafe(self._open_session(), loop).result()
+            self._loop, self._thread = loop, thread
+            atexit.register(self.close)
+
+    # Schedule one page fetch; returns a concurrent.futures.Future of its HTML
+    def submit(self, url):
+        self._start()
+        return asyncio.run_coroutine_threadsafe(self._fetch(url), self._loop)
+
+    def fetch(self, url):
+        return self.submit(url).result()
+
+    def fetch_all(self, urls):
+        futures = [self.submit(url) for url in urls]
+        return [future.result() for future in futures]
+
+    # Yield page HTML in input order, keeping up to window pages in flight or waiting to be
+    # yielded: as each page is yielded the next URL is scheduled, so a slow page holds back
+    # only the yield order, never the other requests
+    def iter_pages(self, urls, window=None):
+        window = window or self.max_in_flight * 2
+        urls = iter(urls)
+        pending = deque(self.submit(url) for url in itertools.islice(urls, window))
+        while pending:
+            html = pending.popleft().result()
+            for url in itertools.islice(urls, 1):
+                pending.append(self.submit(url))
+            yield html
+
+    # Close the session and stop the background loop (also run at exit)
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._session.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = self._thread = None
@@ -0,0 +1,94 @@
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+from splash_fetcher import SplashFetcher
+
+# Exercises SplashFetcher against a local stub HTTP server standing in for Splash.
+# The stub echoes the requested URL after a short delay, fails the first request of
+# every third page with a 503, and records how many requests were in flight at once.
+ASINS = ['B0CW5YZ6VV', 'B096NTB9XT', 'B0CJTXNYVN']
+PAGES_PER_ASIN = 4
+MAX_IN_FLIGHT = 3
+RENDER_DELAY = 0.05
+
+
+class StubSplashState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requests = 0
+        self.failed_once = set()
+
+
+class StubSplashHandler(BaseHTTPRequestHandler):
+    state = StubSplashState()
+
+    def do_GET(self):
+        state = self.state
+        query = parse_qs(urlsplit(self.path).query)
+        url = query['url'][0]
+        page = int(parse_qs(urlsplit(url).query)['pageNumber'][0])
+
+        with state.lock:
+            state.requests += 1
+            state.in_flight += 1
+            state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            fail = page % 3 == 0 and url not in state.failed_once
+            if fail:
+                state.failed_once.add(url)
+        try:
+            time.sleep(RENDER_DELAY)
+            body = b'splash busy' if fail else f'<html><body data-url="{url}"></body></html>'.encode()
+            self.send_response(503 if fail else 200)
+            self.send_header('Content-Type', 'text/html')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+
+def page_url(asin, page):
+    return f'https://www.amazon.co.in/product-reviews/{asin}/ref=cm_cr_arp_d_viewopt_srt?ie=UTF8&reviewerType=all_reviews&pageNumber={page}&sortBy=recent'
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubSplashHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    splash_url = f'http://127.0.0.1:{server.server_address[1]}/render.html'
+
+    urls = [page_url(asin, x + 1) for asin in ASINS for x in range(PAGES_PER_ASIN)]
+    fetcher = SplashFetcher(splash_url=splash_url, wait=0, max_in_flight=MAX_IN_FLIGHT,
+                            requests_per_second=50, retries=2, backoff=0.05)
+    start = time.perf_counter()
+    pages = fetcher.fetch_all(urls)
+    elapsed = time.perf_counter() - start
+    # Second pass through the same session, streamed with a sliding window
+    streamed = list(fetcher.iter_pages(urls, window=4))
+    fetcher.close()
+    server.shutdown()
+
+    state = StubSplashHandler.state
+    checks = {
+        'pages returned in (asin, page) order': all(f'data-url="{url}"' in html for url, html in zip(urls, pages)),
+        'iter_pages yields pages in order': streamed == pages,
+        'failed pages recovered by retry': len(state.failed_once) > 0 and all(pages),
+        f'at most {MAX_IN_FLIGHT} requests in flight': state.max_in_flight <= MAX_IN_FLIGHT,
+        'requests overlapped': state.max_in_flight > 1,
+    }
+    print(f'{len(urls)} pages, {state.requests} requests ({len(state.failed_once)} retried), '
+          f'max {state.max_in_flight} in flight, {elapsed:.2f}s')
+    for name, passed in checks.items():
+        print(f"{'PASS' if passed else 'FAIL'}: {name}")
+    if not all(checks.values()):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+import os
+import sys
+import queue
+import resource
+import threading
+from contextlib import nullcontext
+
+# Reviews per chunk flowing through cleaning, scoring and output
+DEFAULT_CHUNK_SIZE = 500
+
+_DONE = object()
+
+
+# Group an iterable into lists of at most size items
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Drive an iterable from a background thread, keeping at most depth items buffered,
+# so that fetching the next chunk overlaps with scoring the current one
+def prefetch(iterable, depth=2):
+    buffer = queue.Queue(maxsize=depth)
+
+    def produce():
+        try:
+            for item in iterable:
+                buffer.put(item)
+        except BaseException as e:
+            buffer.put(e)
+        else:
+            buffer.put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+    while True:
+        item = buffer.get()
+        if item is _DONE:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+# Peak resident set size of this process in MB (ru_maxrss is bytes on macOS, KB on Linux)
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == 'darwin' else peak / 1024
+
+
+# Appends DataFrame chunks to one CSV file, writing the header only once
+class ChunkedCsvWriter:
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        if os.path.exists(path):
+            os.remove(path)
+
+    def write(self, df):
+        df.to_csv(self.path, mode='a', header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def close(self):
+        pass
+
+
+# Stream records through process_chunk (clean + score a list of records into a DataFrame)
+# and the writer (or list of writers) in fixed-size chunks. Peak memory stays proportional to the chunk size
+# rather than the number of reviews pulled. Returns the number of rows written.
+# Writes are timed as the 'write' stage of metrics (a RunMetrics) when given.
+def run_streaming_pipeline(records, process_chunk, writer, chunk_size=DEFAULT_CHUNK_SIZE, metrics=None):
+    writers = writer if isinstance(writer, (list, tuple)) else [writer]
+    total = 0
+    for chunk in prefetch(chunked(records, chunk_size)):
+        df = process_chunk(chunk)
+        with metrics.stage('write', items=len(df)) if metrics is not None else nullcontext():
+            for w in writers:
+                w.write(df)
+        total += len(df)
+        print(f'Streamed {total} reviews so far')
+    for w in writers:
+        w.close()
+    print(f'Peak RSS: {peak_rss_mb():.1f} MB')
+    return total
@@ -0,0 +1,121 @@
+import re
+from collections import OrderedDict
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+from nltk.tokenize import word_tokenize
+
+# Stopwords kept for context by the VADER clean_text
+KEPT_STOPWORDS = {'no', 'not', 'up', 'down', 'few', 'more'}
+
+# First scan: runs of non-ASCII characters (emojis etc.) become one space, and
+# punctuation other than periods/commas plus digits are dropped. Both are
+# character-level rewrites of disjoint classes, so one pass gives the same result
+# as the separate re.sub calls in clean_text.
+_NON_ASCII_OR_DROPPED = re.compile(r'([^\x00-\x7F]+)|[^\w\s.,]|\d')
+
+# Second scan: collapse whitespace runs to one space and period runs to one period.
+# Neither rewrite can create a new run of the other kind, so one pass is enough.
+_WHITESPACE_OR_PERIODS = re.compile(r'(\s+)|\.+')
+
+
+def _replace_non_ascii(match):
+    return ' ' if match.group(1) else ''
+
+
+def _collapse_runs(match):
+    return ' ' if match.group(1) else '.'
+
+
+# Default cache bounds: distinct tokens kept for lemmatization, whole reviews kept,
+# and the longest review (in characters) that is eligible for the whole-string cache
+DEFAULT_LEMMA_CACHE_SIZE = 50000
+DEFAULT_TEXT_CACHE_SIZE = 20000
+DEFAULT_TEXT_CACHE_MAX_LENGTH = 200
+
+# Sentinel for cache misses, since None could be a cached value
+_MISSING = object()
+
+
+# Size-bounded LRU cache with hit/miss counters. A maxsize of 0 disables caching.
+class BoundedCache:
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, key):
+        value = self._data.get(key, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        self._data[key] = value
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+# Text normalizer for the VADER scripts. Builds the stopword set, the lemmatizer
+# and the compiled patterns once; normalize() returns exactly what clean_text does.
+# Lemmas are memoized per token, and short reviews are memoized as whole strings;
+# both caches are LRU-bounded by entry count.
+class TextNormalizer:
+    def __init__(self, lemma_cache_size=DEFAULT_LEMMA_CACHE_SIZE, text_cache_size=DEFAULT_TEXT_CACHE_SIZE,
+                 text_cache_max_length=DEFAULT_TEXT_CACHE_MAX_LENGTH):
+        self.stop_words = set(stopwords.words('english')) - KEPT_STOPWORDS
+        self.lemmatizer = WordNetLemmatizer()
+        self.lemma_cache = BoundedCache(lemma_cache_size)
+        self.text_cache = BoundedCache(text_cache_size)
+        self.text_cache_max_length = text_cache_max_length
+
+    def _lemmatize(self, word):
+        lemma = self.lemma_cache.get(word)
+        if lemma is _MISSING:
+            lemma = self.lemmatizer.lemmatize(word)
+            self.lemma_cache.put(word, lemma)
+        return lemma
+
+    def normalize(self, text):
+        cacheable = self.text_cache.maxsize > 0 and len(text) <= self.text_cache_max_length
+        if cacheable:
+            cached = self.text_cache.get(text)
+            if cached is not _MISSING:
+                return cached
+
+        # Lowercase first, as clean_text does (lower() can turn some non-ASCII characters into ASCII)
+        cleaned = text.lower().strip()
+        cleaned = _NON_ASCII_OR_DROPPED.sub(_replace_non_ascii, cleaned)
+        cleaned = _WHITESPACE_OR_PERIODS.sub(_collapse_runs, cleaned)
+
+        stop_words = self.stop_words
+        lemmatize = self._lemmatize
+        cleaned = ' '.join([lemmatize(word) for word in word_tokenize(cleaned) if word not in stop_words])
+
+        if cacheable:
+            self.text_cache.put(text, cleaned)
+        return cleaned
+
+    # Normalize a whole list/Series of reviews, returning a list in input order
+    def normalize_many(self, texts):
+        normalize = self.normalize
+        return [normalize(text) for text in texts]
+
+    # Hit/miss counters and sizes of the lemma and whole-review caches
+    def cache_stats(self):
+        return {'lemma': self.lemma_cache.stats(), 'text': self.text_cache.stats()}
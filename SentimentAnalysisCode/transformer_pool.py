@@ -0,0 +1,91 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from transformer_scoring import DEFAULT_MODEL_NAME, DEFAULT_BATCH_SIZE, DEFAULT_WINDOW_OVERLAP, model_identifier, long_review_suffix, check_long_review_options
+
+# Scorer loaded once per worker process by the pool initializer
+_worker_scorer = None
+
+
+# Load the model once in each worker and cap torch threads so that
+# workers x threads does not exceed the number of cores
+def _init_worker(model_name, batch_size, num_threads, long_reviews, window_overlap):
+    global _worker_scorer
+    import torch
+    from transformer_scoring import TransformerScorer
+
+    torch.set_num_threads(num_threads)
+    torch.set_num_interop_threads(1)
+    _worker_scorer = TransformerScorer(model_name, batch_size=batch_size, long_reviews=long_reviews, window_overlap=window_overlap)
+
+
+# Score one shard inside a worker and report how long it took
+def _score_shard(shard_index, texts, score_kwargs):
+    start = time.perf_counter()
+    scores, labels = _worker_scorer.score(texts, **score_kwargs)
+    return shard_index, os.getpid(), scores, labels, time.perf_counter() - start
+
+
+# Drop-in replacement for TransformerScorer that shards the review column
+# across a pool of worker processes
+class ParallelTransformerScorer:
+    def __init__(self, num_workers, model_name=DEFAULT_MODEL_NAME, batch_size=DEFAULT_BATCH_SIZE, shards_per_worker=2,
+                 long_reviews='truncate', window_overlap=DEFAULT_WINDOW_OVERLAP):
+        # Checked here, before the workers load the model
+        check_long_review_options(long_reviews, window_overlap)
+        self.num_workers = num_workers
+        self.model_name = model_name
+        self.model_id = model_identifier(model_name) + long_review_suffix(long_reviews, 512, window_overlap)
+        self.batch_size = batch_size
+        self.long_reviews = long_reviews
+        self.window_overlap = window_overlap
+        self.shards_per_worker = shards_per_worker
+        self.threads_per_worker = max(1, (os.cpu_count() or 1) // num_workers)
+        self._pool = None
+
+    # Start the pool on first use. Workers are spawned, not forked: the caller may already
+    # run threads (the Splash fetcher's event loop, the scoring daemon's request threads)
+    # and a forked child can deadlock on a lock one of them held. Spawned workers import
+    # the calling script again, so scripts using the pool keep their work under a
+    # __name__ == '__main__' guard.
+    def _get_pool(self):
+        if self._pool is None:
+            context = multiprocessing.get_context('spawn')
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.model_name, self.batch_size, self.threads_per_worker, self.long_reviews, self.window_overlap),
+            )
+        return self._pool
+
+    # Shard the texts into contiguous slices, score them in parallel and merge the
+    # results back in shard order, so the output does not depend on scheduling
+    def score(self, texts, **score_kwargs):
+        texts = list(texts)
+        num_shards = max(1, min(len(texts), self.num_workers * self.shards_per_worker))
+        bounds = np.linspace(0, len(texts), num_shards + 1).astype(int)
+
+        pool = self._get_pool()
+        futures = [pool.submit(_score_shard, i, texts[bounds[i]:bounds[i + 1]], score_kwargs) for i in range(num_shards)]
+        results = sorted((future.result() for future in futures), key=lambda result: result[0])
+
+        scores = np.concatenate([result[2] for result in results]) if results else np.zeros(0)
+        labels = [label for result in results for label in result[3]]
+
+        # Report throughput per worker process
+        worker_stats = {}
+        for shard_index, pid, shard_scores, _, elapsed in results:
+            count, busy = worker_stats.get(pid, (0, 0.0))
+            worker_stats[pid] = (count + len(shard_scores), busy + elapsed)
+        for worker, (pid, (count, busy)) in enumerate(sorted(worker_stats.items())):
+            print(f'Worker {worker + 1} (pid {pid}): {count} reviews in {busy:.2f} s, {count / busy if busy else 0:.1f} reviews/sec')
+
+        return scores, labels
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,186 @@
+import os
+import numpy as np
+import transformers
+from transformers import AutoTokenizer
+
+# Checkpoint used by pipeline("sentiment-analysis") and the Apple script
+DEFAULT_MODEL_NAME = "distilbert-base-uncased-finetuned-sst-2-english"
+
+# Upper bounds for one forward pass: number of reviews and number of padded tokens
+DEFAULT_BATCH_SIZE = 32
+DEFAULT_MAX_BATCH_TOKENS = 8192
+
+# Tokens shared by consecutive windows of a long review in window mode
+DEFAULT_WINDOW_OVERLAP = 128
+
+LONG_REVIEW_MODES = ['truncate', 'window']
+
+# [CLS] and [SEP] added to every input by the distilbert tokenizer
+DEFAULT_SPECIAL_TOKENS = 2
+
+
+# Identifier of a checkpoint and runtime, used to key cached results
+def model_identifier(model_name, runtime='torch'):
+    return f'{model_name}@{runtime}-transformers-{transformers.__version__}'
+
+
+# Identifier suffix for how reviews longer than max_length are handled
+def long_review_suffix(long_reviews, max_length, window_overlap):
+    return f'+window{max_length}/{window_overlap}' if long_reviews == 'window' else ''
+
+
+# Raise ValueError for an unknown mode, or a window overlap that leaves no room for new
+# tokens in a window of max_length tokens
+def check_long_review_options(long_reviews, window_overlap, max_length=512, special_tokens=DEFAULT_SPECIAL_TOKENS):
+    if long_reviews not in LONG_REVIEW_MODES:
+        raise ValueError(f"Unknown long review mode {long_reviews!r}, expected one of {', '.join(LONG_REVIEW_MODES)}")
+    window_tokens = max_length - special_tokens
+    if long_reviews == 'window' and not 0 <= window_overlap < window_tokens:
+        raise ValueError(f'Window overlap must be between 0 and {window_tokens - 1} tokens '
+                         f'for {max_length}-token windows, got {window_overlap}')
+
+
+# Long-review handling from the environment: TRANSFORMER_LONG_REVIEWS=window scores reviews
+# longer than the model's 512 tokens as overlapping windows (TRANSFORMER_WINDOW_OVERLAP
+# tokens of overlap) instead of truncating them. Invalid settings fail here, at startup.
+def long_review_options():
+    options = {
+        'long_reviews': os.environ.get('TRANSFORMER_LONG_REVIEWS', 'truncate'),
+        'window_overlap': int(os.environ.get('TRANSFORMER_WINDOW_OVERLAP', DEFAULT_WINDOW_OVERLAP)),
+    }
+    try:
+        check_long_review_options(**options)
+    except ValueError as e:
+        raise ValueError(f'TRANSFORMER_LONG_REVIEWS / TRANSFORMER_WINDOW_OVERLAP: {e}') from None
+    return options
+
+
+# Scores a whole column of reviews in micro-batches instead of one review per forward pass.
+# Reviews longer than max_length tokens are truncated, or with long_reviews='window'
+# split into max_length-token windows overlapping by window_overlap tokens; see score().
+class TransformerScorer:
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, tokenizer=None, model=None,
+                 batch_size=DEFAULT_BATCH_SIZE, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, max_length=512,
+                 long_reviews='truncate', window_overlap=DEFAULT_WINDOW_OVERLAP):
+        self._init_scoring(model_name, model_identifier(model_name), tokenizer, batch_size, max_batch_tokens,
+                           max_length, long_reviews, window_overlap)
+        if model is None:
+            # Imported here: resolving the model class loads the torch modeling code
+            from transformers import AutoModelForSequenceClassification
+            model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        self.model = model
+        self.model.eval()
+        self.id2label = self.model.config.id2label
+
+    # Tokenizer, batching and long-review settings, shared with the ONNX subclass
+    def _init_scoring(self, model_name, model_id, tokenizer, batch_size, max_batch_tokens, max_length,
+                      long_reviews, window_overlap):
+        self.model_name = model_name
+        self.model_id = model_id + long_review_suffix(long_reviews, max_length, window_overlap)
+        self.tokenizer = tokenizer if tokenizer is not None else AutoTokenizer.from_pretrained(model_name)
+        check_long_review_options(long_reviews, window_overlap, max_length, self.tokenizer.num_special_tokens_to_add())
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_length = max_length
+        self.long_reviews = long_reviews
+        self.window_overlap = window_overlap
+        self.windowed_reviews = 0
+        self.windows = 0
+
+    # Group consecutive reviews so that each micro-batch stays within both the
+    # review count and the padded token budget
+    def _micro_batches(self, lengths, batch_size, padding):
+        batch = []
+        longest = 0
+        for i, length in enumerate(lengths):
+            padded = self.max_length if padding == 'max_length' else max(longest, length)
+            if batch and (len(batch) >= batch_size or padded * (len(batch) + 1) > self.max_batch_tokens):
+                yield batch
+                batch = []
+                padded = self.max_length if padding == 'max_length' else length
+            batch.append(i)
+            longest = padded
+        if batch:
+            yield batch
+
+    # Run one padded micro-batch through the model and return its class probabilities.
+    # torch is imported here so that the ONNX subclass never loads it.
+    def _forward_probs(self, encodings, padding):
+        import torch
+        inputs = self.tokenizer.pad(encodings, padding=padding, max_length=self.max_length, return_tensors="pt")
+        with torch.inference_mode():
+            probs = self.model(**inputs).logits.softmax(dim=1)
+        return probs.numpy()
+
+    # Tokenize the reviews into model inputs. Returns the encodings and, per input, the
+    # position of the review it belongs to and its weight. Truncation gives one input per
+    # review; window mode gives reviews that fit in max_length the same single input and
+    # splits longer ones into overlapping windows (the tokenizer's overflowing tokens),
+    # each weighted by its number of review tokens.
+    def _encode(self, texts):
+        if self.long_reviews != 'window':
+            encoded = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+            return encoded, list(range(len(texts))), [1] * len(texts)
+
+        encoded = self.tokenizer(texts, truncation=True, max_length=self.max_length, stride=self.window_overlap,
+                                 return_overflowing_tokens=True)
+        owners = list(encoded.pop('overflow_to_sample_mapping'))
+        special_tokens = self.tokenizer.num_special_tokens_to_add()
+        weights = [max(len(ids) - special_tokens, 1) for ids in encoded['input_ids']]
+        self.windows += len(owners)
+        self.windowed_reviews += int((np.bincount(owners) > 1).sum())
+        return encoded, owners, weights
+
+    # Score a list/Series of texts; returns a float score array and a label list in input order.
+    # Non-string entries (e.g. NaN reviews) get a score of 0 and the label 'Neutral'.
+    # With bucket_by_length, inputs are sorted by token count before batching so each
+    # micro-batch is padded only to its own longest member, then scattered back. In window
+    # mode the windows of all reviews are batched together, and each review's class
+    # probabilities are the length-weighted mean over its windows.
+    def score(self, texts, batch_size=None, padding='longest', bucket_by_length=True):
+        texts = list(texts)
+        batch_size = batch_size or self.batch_size
+        scores = np.zeros(len(texts), dtype=np.float64)
+        labels = ['Neutral'] * len(texts)
+
+        rows = [i for i, text in enumerate(texts) if isinstance(text, str)]
+        if not rows:
+            return scores, labels
+
+        encoded, owners, weights = self._encode([texts[i] for i in rows])
+        lengths = [len(ids) for ids in encoded['input_ids']]
+        prob_sums = np.zeros((len(rows), len(self.id2label)), dtype=np.float64)
+        weight_sums = np.zeros(len(rows), dtype=np.float64)
+
+        if bucket_by_length and padding != 'max_length':
+            order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        else:
+            order = list(range(len(lengths)))
+
+        for bucket in self._micro_batches([lengths[j] for j in order], batch_size, padding):
+            batch = [order[k] for k in bucket]
+            encodings = [{key: encoded[key][j] for key in encoded.keys()} for j in batch]
+            for j, probs in zip(batch, self._forward_probs(encodings, padding)):
+                prob_sums[owners[j]] += weights[j] * probs
+                weight_sums[owners[j]] += weights[j]
+
+        probs = prob_sums / weight_sums[:, None]
+        best = probs.argmax(axis=1)
+        for j, i in enumerate(rows):
+            scores[i] = probs[j, best[j]]
+            labels[i] = self.id2label[int(best[j])]
+        return scores, labels
+
+
+# Score texts through the persistent result cache (see result_cache.py): only reviews
+# without a cached result for this model are passed to the scorer. Works with any
+# scorer exposing model_id and score(); returns (scores, labels) like score().
+def score_with_cache(scorer, texts, cache, **score_kwargs):
+    def score_pending(pending):
+        scores, labels = scorer.score(pending, **score_kwargs)
+        return [[score, label] for score, label in zip(scores.tolist(), labels)]
+
+    results = cache.score('transformer', scorer.model_id, texts, score_pending)
+    scores = np.array([result[0] for result in results], dtype=np.float64)
+    labels = [result[1] for result in results]
+    return scores, labels
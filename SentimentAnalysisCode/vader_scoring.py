@@ -0,0 +1,119 @@
+import string
+import hashlib
+import nltk
+from types import SimpleNamespace
+import numpy as np
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+
+# Same thresholds as categorize_sentiment in the VADER scripts
+POSITIVE_THRESHOLD = 0.05
+NEGATIVE_THRESHOLD = -0.05
+
+_PUNCTUATION = frozenset(string.punctuation)
+
+
+# Vectorized categorize_sentiment for a whole array of compound scores
+def categorize_sentiment_array(scores):
+    scores = np.asarray(scores)
+    return np.select(
+        [scores > POSITIVE_THRESHOLD, scores < NEGATIVE_THRESHOLD],
+        ['Positive', 'Negative'],
+        default='Neutral',
+    )
+
+
+# Bulk VADER scorer. Produces the same value as sia.polarity_scores(text)['compound']
+# but skips the pos/neg/neu breakdown, scores each distinct text once, and writes the
+# results into a float32 array.
+class VaderBulkScorer:
+    def __init__(self, lexicon_file=None, analyzer=None):
+        if analyzer is None:
+            analyzer = SentimentIntensityAnalyzer(lexicon_file=lexicon_file)
+        self.analyzer = analyzer
+        constants = analyzer.constants
+        # Compact lookup structures built once from the loaded lexicon and constants
+        self.lexicon_words = frozenset(analyzer.lexicon)
+        self.boosters = frozenset(constants.BOOSTER_DICT)
+        self.punctuation_marks = frozenset(constants.PUNC_LIST)
+        self.remove_punctuation = constants.REGEX_REMOVE_PUNCTUATION
+        # Identifies the NLTK version and lexicon content, used to key cached results
+        lexicon_digest = hashlib.sha1(repr(sorted(analyzer.lexicon.items())).encode('utf-8')).hexdigest()[:12]
+        self.model_id = f'vader-nltk-{nltk.__version__}-{lexicon_digest}'
+
+    # Equivalent of SentiText.words_and_emoticons: whitespace tokens longer than one
+    # character, with a leading or trailing PUNC_LIST mark stripped when the remaining
+    # word also occurs (punctuation-free) in the text. SentiText builds the full
+    # PUNC_LIST x words product for this; checking each token directly is much cheaper.
+    def _words_and_emoticons(self, text):
+        words_only = {word for word in self.remove_punctuation.sub('', text).split() if len(word) > 1}
+        tokens = []
+        for token in text.split():
+            if len(token) <= 1:
+                continue
+            start = 0
+            while start < len(token) and token[start] in _PUNCTUATION:
+                start += 1
+            end = len(token)
+            while end > start and token[end - 1] in _PUNCTUATION:
+                end -= 1
+            if start and end == len(token):
+                if token[:start] in self.punctuation_marks and token[start:] in words_only:
+                    token = token[start:]
+            elif not start and end < len(token):
+                if token[end:] in self.punctuation_marks and token[:end] in words_only:
+                    token = token[:end]
+            tokens.append(token)
+        return tokens
+
+    # Compound score of one text, following polarity_scores step by step
+    def compound(self, text):
+        analyzer = self.analyzer
+        words = self._words_and_emoticons(text)
+        lowered = [word.lower() for word in words]
+
+        # Without a single lexicon word every valence is 0, and so is the compound score
+        if self.lexicon_words.isdisjoint(lowered):
+            return 0.0
+
+        allcaps = sum(1 for word in words if word.isupper())
+        sentitext = SimpleNamespace(words_and_emoticons=words, is_cap_diff=0 < len(words) - allcaps < len(words))
+
+        first_index = {}
+        for i, word in enumerate(words):
+            first_index.setdefault(word, i)
+
+        sentiments = []
+        for word in words:
+            i = first_index[word]
+            if (i < len(words) - 1 and lowered[i] == 'kind' and lowered[i + 1] == 'of') or lowered[i] in self.boosters:
+                sentiments.append(0)
+                continue
+            sentiments = analyzer.sentiment_valence(0, sentitext, word, i, sentiments)
+        sentiments = analyzer._but_check(words, sentiments)
+
+        sum_s = float(sum(sentiments))
+        punct_emph_amplifier = analyzer._punctuation_emphasis(sum_s, text)
+        if sum_s > 0:
+            sum_s += punct_emph_amplifier
+        elif sum_s < 0:
+            sum_s -= punct_emph_amplifier
+        return round(analyzer.constants.normalize(sum_s), 4)
+
+    # Score a list/Series of texts into a float32 array of compound scores
+    def score_many(self, texts):
+        texts = list(texts)
+        scores = np.empty(len(texts), dtype=np.float32)
+        memo = {}
+        for i, text in enumerate(texts):
+            score = memo.get(text)
+            if score is None:
+                score = memo[text] = self.compound(text)
+            scores[i] = score
+        return scores
+
+
+# Score texts through the persistent result cache (see result_cache.py): only reviews
+# without a cached compound score for this lexicon are passed to the scorer
+def score_with_cache(scorer, texts, cache):
+    scores = cache.score('vader', scorer.model_id, texts, lambda pending: scorer.score_many(pending).tolist())
+    return np.asarray(scores, dtype=np.float32)